@@ -13,7 +13,7 @@ from reportlab.lib.units import inch
 from reportlab.lib import colors
 import tempfile
 import os
-from openai import OpenAI
+from openai import OpenAI, APIConnectionError, APITimeoutError
 from typing import Dict, List, Optional
 import plotly.express as px
 import plotly.graph_objects as go
@@ -25,6 +25,11 @@ import numpy as np
 import json
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
+from retry_policy import RetryPolicy
+from folder_spec import (
+    campaign_folder_spec, plan_folder_tree, apply_folder_plan, project_folder_name, campaign_folder_name,
+    REG_DOC_FOLDER_NAME
+)
 
 # Page configuration
 st.set_page_config(
@@ -118,6 +123,42 @@ DRUG_DATABASE = {
     }
 }
 
+# Shared retry policies (see retry_policy.py); the OpenAI SDK's own retries are disabled
+DRIVE_RATE_LIMIT_REASONS = frozenset({'rateLimitExceeded', 'userRateLimitExceeded'})
+
+def _drive_error_reasons(outcome):
+    """The error.errors[].reason values of a Drive HttpError body (empty if it is not that JSON)"""
+    content = getattr(outcome, 'content', None)
+    if not content:
+        return set()
+    try:
+        error = json.loads(content.decode('utf-8') if isinstance(content, bytes) else content).get('error') or {}
+        return {item.get('reason') for item in error.get('errors') or [] if isinstance(item, dict)}
+    except (ValueError, AttributeError, UnicodeDecodeError):
+        return set()
+
+def _drive_is_retryable(outcome, status, headers):
+    """Drive reports per-user throttling as a 403 with a rate limit reason; 429 and every 5xx are retried too"""
+    if status == 429 or (status is not None and 500 <= status < 600):
+        return True
+    if status == 403 and _drive_error_reasons(outcome) & DRIVE_RATE_LIMIT_REASONS:
+        return True
+    return None
+
+drive_retry_policy = RetryPolicy(
+    "google_drive", max_attempts=5, base_delay=1.0, max_delay=32.0, deadline=120.0,
+    retry_exceptions=(ConnectionError, TimeoutError), is_retryable=_drive_is_retryable
+)
+openai_retry_policy = RetryPolicy(
+    "openai", max_attempts=4, base_delay=1.0, max_delay=30.0, deadline=300.0,
+    retry_exceptions=(APIConnectionError, APITimeoutError),
+    is_retryable=lambda outcome, status, headers: False if getattr(outcome, 'code', None) == 'insufficient_quota' else None
+)
+
+def execute_drive_request(drive_request):
+    """Execute a Google Drive API request under the Drive retry policy"""
+    return drive_retry_policy.call(drive_request.execute)
+
 def load_openai_api_key():
     """Load OpenAI API key from Streamlit secrets"""
     # Try to load from credentials.py first
@@ -176,7 +217,7 @@ def get_shared_drive_id(service):
     """Get the first available shared drive ID"""
     try:
         # List shared drives
-        drives = service.drives().list(pageSize=10).execute()
+        drives = execute_drive_request(service.drives().list(pageSize=10))
         shared_drives = drives.get('drives', [])
         
         if shared_drives:
@@ -211,7 +252,7 @@ def list_google_drive_folders(service, parent_folder_id: str = None):
         else:
             query = "mimeType = 'application/vnd.google-apps.folder' and trashed = false"
         
-        results = service.files().list(q=query, fields="files(id, name, createdTime, trashed)").execute()
+        results = execute_drive_request(service.files().list(q=query, fields="files(id, name, createdTime, trashed)"))
         folders = results.get('files', [])
         
         # Filter out trashed folders
@@ -234,14 +275,14 @@ def create_google_drive_folder(service, folder_name: str, parent_folder_id: str
         
         # If using shared drive, specify the drive ID
         if shared_drive_id:
-            folder = service.files().create(
+            folder = execute_drive_request(service.files().create(
                 body=folder_metadata, 
                 fields='id, name',
                 supportsAllDrives=True,
                 supportsTeamDrives=True
-            ).execute()
+            ))
         else:
-            folder = service.files().create(body=folder_metadata, fields='id, name').execute()
+            folder = execute_drive_request(service.files().create(body=folder_metadata, fields='id, name'))
         
         return folder
     except Exception as e:
@@ -256,7 +297,7 @@ def get_folder_structure(service, parent_folder_id: str = None, max_depth: int =
         else:
             query = "mimeType = 'application/vnd.google-apps.folder' and trashed = false"
         
-        results = service.files().list(q=query, fields="files(id, name, parents, trashed)").execute()
+        results = execute_drive_request(service.files().list(q=query, fields="files(id, name, parents, trashed)"))
         folders = results.get('files', [])
         
         # Filter out folders that are trashed
@@ -274,7 +315,7 @@ def get_folder_structure(service, parent_folder_id: str = None, max_depth: int =
             # Get second level
             if max_depth > 1:
                 level2_query = f"'{folder['id']}' in parents and mimeType = 'application/vnd.google-apps.folder' and trashed = false"
-                level2_results = service.files().list(q=level2_query, fields="files(id, name, parents, trashed)").execute()
+                level2_results = execute_drive_request(service.files().list(q=level2_query, fields="files(id, name, parents, trashed)"))
                 level2_folders = level2_results.get('files', [])
                 
                 # Filter level 2 folders
@@ -291,7 +332,7 @@ def get_folder_structure(service, parent_folder_id: str = None, max_depth: int =
                     # Get third level
                     if max_depth > 2:
                         level3_query = f"'{level2_folder['id']}' in parents and mimeType = 'application/vnd.google-apps.folder' and trashed = false"
-                        level3_results = service.files().list(q=level3_query, fields="files(id, name, parents, trashed)").execute()
+                        level3_results = execute_drive_request(service.files().list(q=level3_query, fields="files(id, name, parents, trashed)"))
                         level3_folders = level3_results.get('files', [])
                         
                         # Filter level 3 folders
@@ -328,13 +369,13 @@ def get_folder_structure_recursive(service, parent_folder_id: str = None, max_de
         
         # For shared drives, we need to include the shared drive parameters
         # Always use shared drive parameters when we're in a shared drive context
-        results = service.files().list(
+        results = execute_drive_request(service.files().list(
             q=query, 
             fields="files(id, name, parents, trashed, createdTime, modifiedTime, owners, webViewLink)",
             supportsAllDrives=True,
             supportsTeamDrives=True,
             includeItemsFromAllDrives=True
-        ).execute()
+        ))
         folders = results.get('files', [])
         
         # Simplified filtering - just check if not trashed
@@ -450,19 +491,19 @@ def upload_file_to_google_drive(service, file_data: bytes, file_name: str, mime_
         
         # Upload file with shared drive support if needed
         if shared_drive_id:
-            file = service.files().create(
+            file = execute_drive_request(service.files().create(
                 body=file_metadata,
                 media_body=media,
                 fields='id, name, webViewLink',
                 supportsAllDrives=True,
                 supportsTeamDrives=True
-            ).execute()
+            ))
         else:
-            file = service.files().create(
+            file = execute_drive_request(service.files().create(
                 body=file_metadata,
                 media_body=media,
                 fields='id, name, webViewLink'
-            ).execute()
+            ))
         
         return file
     except Exception as e:
@@ -480,13 +521,13 @@ def check_existing_project_folder(service, molecule_code: str, parent_folder_id:
             query = f"'{parent_folder_id or '0ALsvNdCE73XrUk9PVA'}' in parents and name = '{project_folder_name}' and mimeType = 'application/vnd.google-apps.folder' and trashed = false"
         
         # Use shared drive parameters for all queries
-        results = service.files().list(
+        results = execute_drive_request(service.files().list(
             q=query, 
             fields="files(id, name)",
             supportsAllDrives=True,
             supportsTeamDrives=True,
             includeItemsFromAllDrives=True
-        ).execute()
+        ))
         existing_folders = results.get('files', [])
         
         return existing_folders[0] if existing_folders else None
@@ -505,13 +546,13 @@ def find_target_folder(service, molecule_code: str, campaign_number: str = None)
         
         # Find Draft AI Reg Document folder
         reg_doc_query = f"'{project_folder['id']}' in parents and name = 'Draft AI Reg Document' and mimeType = 'application/vnd.google-apps.folder' and trashed = false"
-        reg_doc_results = service.files().list(
+        reg_doc_results = execute_drive_request(service.files().list(
             q=reg_doc_query, 
             fields="files(id, name)",
             supportsAllDrives=True,
             supportsTeamDrives=True,
             includeItemsFromAllDrives=True
-        ).execute()
+        ))
         reg_doc_folders = reg_doc_results.get('files', [])
         
         if not reg_doc_folders:
@@ -522,13 +563,13 @@ def find_target_folder(service, molecule_code: str, campaign_number: str = None)
         
         # Find IND folder
         ind_query = f"'{reg_doc_folder['id']}' in parents and name = 'IND' and mimeType = 'application/vnd.google-apps.folder' and trashed = false"
-        ind_results = service.files().list(
+        ind_results = execute_drive_request(service.files().list(
             q=ind_query, 
             fields="files(id, name)",
             supportsAllDrives=True,
             supportsTeamDrives=True,
             includeItemsFromAllDrives=True
-        ).execute()
+        ))
         ind_folders = ind_results.get('files', [])
         
         if not ind_folders:
@@ -539,13 +580,13 @@ def find_target_folder(service, molecule_code: str, campaign_number: str = None)
         
         # Find Draft folder
         draft_query = f"'{ind_folder['id']}' in parents and name = 'Draft' and mimeType = 'application/vnd.google-apps.folder' and trashed = false"
-        draft_results = service.files().list(
+        draft_results = execute_drive_request(service.files().list(
             q=draft_query, 
             fields="files(id, name)",
             supportsAllDrives=True,
             supportsTeamDrives=True,
             includeItemsFromAllDrives=True
-        ).execute()
+        ))
         draft_folders = draft_results.get('files', [])
         
         if not draft_folders:
@@ -563,124 +604,82 @@ def find_target_folder(service, molecule_code: str, campaign_number: str = None)
         st.error(f"Error finding target folder: {e}")
         return None, None
 
+def list_google_drive_subfolders(service, parent_folder_id: str):
+    """Map sub-folder name -> folder for one Google Drive folder (None on failure)"""
+    try:
+        query = f"'{parent_folder_id}' in parents and mimeType = 'application/vnd.google-apps.folder' and trashed = false"
+        subfolders = {}
+        page_token = None
+        while True:
+            results = execute_drive_request(service.files().list(
+                q=query,
+                fields="nextPageToken, files(id, name)",
+                pageSize=1000,
+                pageToken=page_token,
+                supportsAllDrives=True,
+                supportsTeamDrives=True,
+                includeItemsFromAllDrives=True
+            ))
+            for folder in results.get('files', []):
+                subfolders.setdefault(folder['name'], folder)
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return subfolders
+    except Exception as e:
+        st.error(f"Error listing folders: {e}")
+        return None
+
 def create_campaign_folder_structure(service, campaign_name: str, molecule_code: str, parent_folder_id: str = None, shared_drive_id: str = None):
-    """Create the complete campaign folder structure as shown in the image"""
+    """Create the complete campaign folder structure as shown in the image, adding only missing folders"""
     try:
         # Set default parent folder ID if not provided
         if not parent_folder_id:
             parent_folder_id = '0ALsvNdCE73XrUk9PVA'  # New shared drive root folder
         
-        # Check if project folder already exists
-        existing_project = check_existing_project_folder(service, molecule_code, parent_folder_id)
+        # Diff the declarative tree against Drive: one listing per existing folder, nothing below missing ones
+        spec = campaign_folder_spec(molecule_code, campaign_name)
+        plan = plan_folder_tree(
+            parent_folder_id, spec,
+            lambda folder_id: list_google_drive_subfolders(service, folder_id),
+            'id'
+        )
         
-        if existing_project:
-            # Use existing project folder
-            project_folder = existing_project
-            st.info(f"✅ Using existing project folder: {project_folder['name']}")
-        else:
-            # Create new project folder
-            project_folder_name = f"Project; Molecule {molecule_code}"
-            project_folder = create_google_drive_folder(service, project_folder_name, parent_folder_id, shared_drive_id)
-            if not project_folder:
-                return None
-            st.success(f"✅ Created new project folder: {project_folder['name']}")
-        
-        # Check if campaign folder already exists
-        campaign_folder_name = f"Project {molecule_code} (Campaign #{campaign_name})"
-        campaign_query = f"'{project_folder['id']}' in parents and name = '{campaign_folder_name}' and mimeType = 'application/vnd.google-apps.folder' and trashed = false"
-        campaign_results = service.files().list(
-            q=campaign_query,
-            fields="files(id, name)",
-            supportsAllDrives=True,
-            supportsTeamDrives=True,
-            includeItemsFromAllDrives=True
-        ).execute()
-        existing_campaigns = campaign_results.get('files', [])
+        project_path = project_folder_name(molecule_code)
+        campaign_path = f"{project_path}/{campaign_folder_name(molecule_code, campaign_name)}"
+        reg_doc_path = f"{project_path}/{REG_DOC_FOLDER_NAME}"
         
-        if existing_campaigns:
-            st.warning(f"⚠️ Campaign folder '{campaign_folder_name}' already exists!")
-            return None
+        if project_path in plan['existing']:
+            st.info(f"✅ Using existing project folder: {plan['existing'][project_path]['name']}")
         
-        # Create campaign folder
-        campaign_folder = create_google_drive_folder(service, campaign_folder_name, project_folder['id'], shared_drive_id)
-        if not campaign_folder:
+        if not plan['missing']:
+            st.warning(f"⚠️ Campaign folder '{campaign_folder_name(molecule_code, campaign_name)}' already exists!")
             return None
         
-        # Check if Draft AI Reg Document folder exists, create if not
-        reg_doc_query = f"'{project_folder['id']}' in parents and name = 'Draft AI Reg Document' and mimeType = 'application/vnd.google-apps.folder' and trashed = false"
-        reg_doc_results = service.files().list(
-            q=reg_doc_query,
-            fields="files(id, name)",
-            supportsAllDrives=True,
-            supportsTeamDrives=True,
-            includeItemsFromAllDrives=True
-        ).execute()
-        existing_reg_docs = reg_doc_results.get('files', [])
+        if campaign_path in plan['existing']:
+            st.info(f"✅ Campaign folder exists, creating {len(plan['missing'])} missing folders")
+        
+        # The Drive client is not thread-safe, so levels are created sequentially
+        result = apply_folder_plan(
+            parent_folder_id, plan,
+            lambda parent_id, name: create_google_drive_folder(service, name, parent_id, shared_drive_id),
+            'id'
+        )
+        folders = result['folders']
         
-        if existing_reg_docs:
-            reg_doc_folder = existing_reg_docs[0]
+        if project_path not in plan['existing'] and project_path in folders:
+            st.success(f"✅ Created new project folder: {folders[project_path]['name']}")
+        if reg_doc_path in plan['existing']:
             st.info(f"✅ Using existing Draft AI Reg Document folder")
-        else:
-            reg_doc_folder = create_google_drive_folder(service, "Draft AI Reg Document", project_folder['id'], shared_drive_id)
-            if not reg_doc_folder:
-                return None
+        elif reg_doc_path in folders:
             st.success(f"✅ Created new Draft AI Reg Document folder")
         
-        # Create Pre and Post folders under campaign
-        pre_folder = create_google_drive_folder(service, "Pre", campaign_folder['id'], shared_drive_id)
-        post_folder = create_google_drive_folder(service, "Post", campaign_folder['id'], shared_drive_id)
-        
-        # Create department folders under Pre and Post
-        departments = ["mfg", "Anal", "Stability", "CTM"]
-        statuses = ["Draft", "Review", "Approved"]
-        
-        for phase_folder in [pre_folder, post_folder]:
-            if phase_folder:
-                for dept in departments:
-                    dept_folder = create_google_drive_folder(service, dept, phase_folder['id'], shared_drive_id)
-                    if dept_folder:
-                        for status in statuses:
-                            create_google_drive_folder(service, status, dept_folder['id'], shared_drive_id)
-        
-        # Create regulatory document folders (only if they don't exist)
-        reg_types = ["IND", "IMPD", "Canada"]
-        for reg_type in reg_types:
-            # Check if reg type folder exists
-            reg_type_query = f"'{reg_doc_folder['id']}' in parents and name = '{reg_type}' and mimeType = 'application/vnd.google-apps.folder' and trashed = false"
-            reg_type_results = service.files().list(
-                q=reg_type_query,
-                fields="files(id, name)",
-                supportsAllDrives=True,
-                supportsTeamDrives=True,
-                includeItemsFromAllDrives=True
-            ).execute()
-            existing_reg_types = reg_type_results.get('files', [])
-            
-            if existing_reg_types:
-                reg_type_folder = existing_reg_types[0]
-            else:
-                reg_type_folder = create_google_drive_folder(service, reg_type, reg_doc_folder['id'], shared_drive_id)
-            
-            if reg_type_folder:
-                # Create status folders only if they don't exist
-                for status in statuses:
-                    status_query = f"'{reg_type_folder['id']}' in parents and name = '{status}' and mimeType = 'application/vnd.google-apps.folder' and trashed = false"
-                    status_results = service.files().list(
-                        q=status_query,
-                        fields="files(id, name)",
-                        supportsAllDrives=True,
-                        supportsTeamDrives=True,
-                        includeItemsFromAllDrives=True
-                    ).execute()
-                    existing_statuses = status_results.get('files', [])
-                    
-                    if not existing_statuses:
-                        create_google_drive_folder(service, status, reg_type_folder['id'], shared_drive_id)
+        if not all(path in folders for path in (project_path, campaign_path, reg_doc_path)):
+            return None
         
         return {
-            'project_folder': project_folder,
-            'campaign_folder': campaign_folder,
-            'reg_doc_folder': reg_doc_folder
+            'project_folder': folders[project_path],
+            'campaign_folder': folders[campaign_path],
+            'reg_doc_folder': folders[reg_doc_path]
         }
         
     except Exception as e:
@@ -692,7 +691,7 @@ def initialize_openai():
     api_key = load_openai_api_key()
     if api_key and api_key != "your-openai-api-key-here":
         try:
-            client = OpenAI(api_key=api_key)
+            client = OpenAI(api_key=api_key, max_retries=0)
             return client
         except Exception as e:
             return None
@@ -865,7 +864,7 @@ Required Output Structure:
 
 Please provide the text in a structured format suitable for regulatory submission.
 """
-        response = client.chat.completions.create(
+        response = openai_retry_policy.call(client.chat.completions.create,
             model="gpt-4",
             messages=[
                 {"role": "system", "content": "You are a pharmaceutical regulatory writing expert with deep knowledge of FDA and ICH guidelines for IND submissions."},
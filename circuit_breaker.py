@@ -0,0 +1,180 @@
+"""
+Per-backend circuit breakers (closed -> open -> half-open -> closed).
+
+After failure_threshold consecutive failures a breaker opens and calls fail fast with
+CircuitOpenError instead of waiting on a backend that is throttling or down. Once the recovery
+timeout (or a longer Retry-After the backend asked for) has passed, a limited number of probe
+calls are let through (half-open); a success closes the breaker, a failure opens it again.
+RetryPolicy reports each logical call's outcome to its breaker, so retries within one call
+count once.
+
+before_call() returns a token naming the state generation the call was admitted under; every
+state change starts a new generation. An outcome reported with a token from an earlier
+generation (e.g. a slow call admitted while closed that returns after the breaker opened or
+went half-open) is counted in the stats but cannot change the state or take a probe's slot.
+"""
+
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a backend whose breaker is open"""
+
+    def __init__(self, backend, retry_in):
+        self.backend = backend
+        self.retry_in = retry_in
+        super().__init__(f"{backend} is unavailable (circuit open), retry in {retry_in:.0f}s")
+
+
+class CircuitBreaker:
+    """Thread-safe circuit breaker for one backend"""
+
+    def __init__(self, name, failure_threshold=5, recovery_timeout=60.0, half_open_max_calls=1, max_open_seconds=3600.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.max_open_seconds = max_open_seconds
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+        self._half_open_in_flight = 0
+        self._generation = 0
+        self._stats = {"successes": 0, "failures": 0, "rejected": 0, "times_opened": 0, "stale_outcomes": 0}
+        self._last_failure = None
+        with _breakers_lock:
+            _breakers[name] = self
+
+    def _set_state(self, state):
+        if state != self._state:
+            self._state = state
+            self._generation += 1
+
+    def _refresh_state(self, now):
+        if self._state == OPEN and now >= self._open_until:
+            self._set_state(HALF_OPEN)
+            self._half_open_in_flight = 0
+
+    def _is_stale(self, token):
+        """Whether an outcome comes from a call admitted under an earlier state (None: unknown, not stale)"""
+        if token is not None and token != self._generation:
+            self._stats["stale_outcomes"] += 1
+            return True
+        return False
+
+    def before_call(self):
+        """Admit a call or raise CircuitOpenError. Returns the admission token to pass to
+        record_success/record_failure/release, one of which must follow"""
+        with self._lock:
+            now = time.monotonic()
+            self._refresh_state(now)
+            if self._state == OPEN:
+                self._stats["rejected"] += 1
+                raise CircuitOpenError(self.name, self._open_until - now)
+            if self._state == HALF_OPEN:
+                if self._half_open_in_flight >= self.half_open_max_calls:
+                    self._stats["rejected"] += 1
+                    raise CircuitOpenError(self.name, 0.0)
+                self._half_open_in_flight += 1
+            return self._generation
+
+    def record_success(self, token=None):
+        """Count a successful call: resets the failure count when closed, closes a half-open breaker.
+        A success from a call admitted under an earlier state says nothing about the backend now and
+        changes nothing; without a token, a success reported while open is ignored the same way."""
+        with self._lock:
+            self._stats["successes"] += 1
+            self._refresh_state(time.monotonic())
+            if self._is_stale(token) or self._state == OPEN:
+                return
+            if self._state == HALF_OPEN:
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+            self._consecutive_failures = 0
+            self._set_state(CLOSED)
+
+    def record_failure(self, reason=None, retry_after=None, token=None):
+        """Count a failed call; retry_after (seconds the backend asked us to wait) can extend the open period"""
+        with self._lock:
+            now = time.monotonic()
+            self._stats["failures"] += 1
+            self._last_failure = {"reason": reason, "at": time.time()}
+            self._refresh_state(now)
+            if self._is_stale(token):
+                return
+            self._consecutive_failures += 1
+            if self._state == HALF_OPEN:
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+            if self._state == HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                open_for = max(self.recovery_timeout, min(retry_after or 0.0, self.max_open_seconds))
+                if self._state != OPEN:
+                    self._stats["times_opened"] += 1
+                self._set_state(OPEN)
+                self._open_until = now + open_for
+
+    def release(self, token=None):
+        """Give back a half-open slot for a call whose outcome says nothing about backend health"""
+        with self._lock:
+            self._refresh_state(time.monotonic())
+            if token is not None and token != self._generation:
+                return
+            if self._state == HALF_OPEN:
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+
+    def state(self):
+        with self._lock:
+            self._refresh_state(time.monotonic())
+            return self._state
+
+    def is_open(self):
+        return self.state() == OPEN
+
+    def retry_in(self):
+        """Seconds until an open breaker lets a probe through (0 when not open)"""
+        with self._lock:
+            now = time.monotonic()
+            self._refresh_state(now)
+            return max(0.0, self._open_until - now) if self._state == OPEN else 0.0
+
+    def reset(self):
+        """Force the breaker closed (e.g. after fixing credentials)"""
+        with self._lock:
+            self._set_state(CLOSED)
+            self._consecutive_failures = 0
+            self._half_open_in_flight = 0
+
+    def stats(self):
+        """Return a snapshot of breaker state and counters"""
+        with self._lock:
+            now = time.monotonic()
+            self._refresh_state(now)
+            stats = dict(self._stats)
+            stats.update({
+                "state": self._state,
+                "consecutive_failures": self._consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "recovery_timeout_seconds": self.recovery_timeout,
+                "retry_in_seconds": round(max(0.0, self._open_until - now), 1) if self._state == OPEN else 0.0,
+                "last_failure": self._last_failure
+            })
+            return stats
+
+
+def get_breaker(name):
+    with _breakers_lock:
+        return _breakers.get(name)
+
+
+def breaker_states():
+    """Stats for every breaker in this process, keyed by backend name"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.stats() for breaker in breakers}
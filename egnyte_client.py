@@ -8,6 +8,13 @@ from credentials import DOMAIN, CLIENT_ID, CLIENT_SECRET, USERNAME, PASSWORD, RO
 # Egnyte limits: 2 calls per second, 1,000 calls per day
 RATE_LIMIT_DELAY = 0.6  # Wait 0.6 seconds between calls (allows ~1.67 calls/sec, safely under 2/sec)
 
+# Shared keep-alive session so repeated calls reuse one TCP+TLS connection
+POOL_SIZE = 10
+REQUEST_TIMEOUT = (10, 120)  # (connect, read) seconds
+
+session = requests.Session()
+session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE))
+
 def rate_limit_delay():
     """Add delay to respect rate limits"""
     time.sleep(RATE_LIMIT_DELAY)
@@ -25,7 +32,7 @@ def get_token():
     }
     
     print("🔐 Getting access token...")
-    response = requests.post(url, data=data, headers=headers)
+    response = session.post(url, data=data, headers=headers, timeout=REQUEST_TIMEOUT)
     
     if response.status_code == 200:
         token_data = response.json()
@@ -49,7 +56,7 @@ def get_folder_details(access_token, folder_id):
     try:
         # Add rate limiting delay
         rate_limit_delay()
-        response = requests.get(url, headers=headers)
+        response = session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
         
         data = response.json()
@@ -65,7 +72,7 @@ def get_folder_details(access_token, folder_id):
             time.sleep(3)  # Longer wait for rate limit recovery
             try:
                 rate_limit_delay()  # Add rate limiting before retry
-                response = requests.get(url, headers=headers)
+                response = session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
                 response.raise_for_status()
                 
                 data = response.json()
@@ -103,7 +110,7 @@ def list_folder_contents(access_token, folder_id):
     try:
         # Add rate limiting delay
         rate_limit_delay()
-        response = requests.get(url, headers=headers, params=params)
+        response = session.get(url, headers=headers, params=params, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
         
         data = response.json()
@@ -150,7 +157,7 @@ def list_folder_contents(access_token, folder_id):
             time.sleep(3)  # Longer wait for rate limit recovery
             try:
                 rate_limit_delay()  # Add rate limiting before retry
-                response = requests.get(url, headers=headers, params=params)
+                response = session.get(url, headers=headers, params=params, timeout=REQUEST_TIMEOUT)
                 response.raise_for_status()
                 
                 data = response.json()
@@ -218,7 +225,7 @@ def create_folder(access_token, parent_folder_id, folder_name):
     try:
         # Add rate limiting delay
         rate_limit_delay()
-        response = requests.post(url, headers=headers, json=data)
+        response = session.post(url, headers=headers, json=data, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
         
         result = response.json()
@@ -235,7 +242,7 @@ def create_folder(access_token, parent_folder_id, folder_name):
             time.sleep(3)  # Longer wait for rate limit recovery
             try:
                 rate_limit_delay()  # Add rate limiting before retry
-                response = requests.post(url, headers=headers, json=data)
+                response = session.post(url, headers=headers, json=data, timeout=REQUEST_TIMEOUT)
                 response.raise_for_status()
                 
                 result = response.json()
@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify, send_file 
+from flask import Flask, request, jsonify, send_file, Response, stream_with_context, g
 import pandas as pd
 import io
 import base64
@@ -13,7 +13,7 @@ from reportlab.lib.units import inch
 from reportlab.lib import colors
 import tempfile
 import os
-from openai import OpenAI, AzureOpenAI
+from openai import OpenAI, AzureOpenAI, APIConnectionError, APITimeoutError
 from typing import Dict, List, Optional
 import plotly.express as px
 import plotly.graph_objects as go
@@ -32,6 +32,40 @@ import requests
 import urllib.parse
 import tempfile
 import os
+import copy
+import hashlib
+import shutil
+import sqlite3
+import socket
+import contextvars
+import uuid
+from contextlib import contextmanager
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from retry_policy import RetryPolicy, parse_retry_after, retry_stats, status_and_headers
+from circuit_breaker import CircuitBreaker, CircuitOpenError, breaker_states
+from structured_logging import (
+    configure_logging,
+    debug_enabled,
+    debug_event,
+    logging_stats,
+    reset_request_debug,
+    sampled_event,
+    set_request_debug
+)
+from name_index import NameIndex, listing_fingerprint
+from reg_doc_versions import parse_version_columns
+from pipeline import StagedPipeline, documents_per_minute
+from llm_dispatcher import LLMDispatcher
+from folder_spec import (
+    PROJECT_NODE, CAMPAIGN_NODE, REG_DOC_NODE, campaign_folder_spec, count_folder_spec,
+    plan_folder_tree, apply_folder_plan, iter_indexed_folders, project_folder_name, campaign_folder_name,
+    REG_DOC_FOLDER_NAME
+)
+try:
+    import fcntl
+except ImportError:  # Windows dev machines
+    fcntl = None
 from bs4 import BeautifulSoup
 from flask_cors import CORS
 
@@ -65,7 +99,376 @@ except Exception:
 
 # Rate limiting configuration for Egnyte
 # Egnyte limits: 2 calls per second, 1,000 calls per day
-RATE_LIMIT_DELAY = 1.0  # Wait 1.0 seconds between calls (allows 1 call/sec, safely under 2/sec)
+EGNYTE_QPS = float(os.getenv('EGNYTE_QPS', '2.0'))        # Sustained calls per second shared by the whole process
+EGNYTE_BURST = float(os.getenv('EGNYTE_BURST', '2'))      # Calls allowed back-to-back when the bucket is full
+
+class TokenBucketRateLimiter:
+    """Thread-safe token bucket shared by every Egnyte call in the process"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+        self._total_calls = 0
+        self._throttled_calls = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def acquire(self):
+        """Take one token, blocking only if the bucket is empty. Returns seconds waited."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            # Reserve the token up front; a negative balance is the queue of callers ahead of us
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+            self._total_calls += 1
+            if wait > 0:
+                self._throttled_calls += 1
+                self._total_wait += wait
+                self._max_wait = max(self._max_wait, wait)
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def stats(self):
+        """Return a snapshot of limiter usage"""
+        with self._lock:
+            return {
+                "rate_per_second": self.rate,
+                "burst_capacity": self.capacity,
+                "total_calls": self._total_calls,
+                "throttled_calls": self._throttled_calls,
+                "total_wait_seconds": round(self._total_wait, 3),
+                "max_wait_seconds": round(self._max_wait, 3),
+                "avg_wait_seconds": round(self._total_wait / self._total_calls, 3) if self._total_calls else 0.0
+            }
+
+egnyte_rate_limiter = TokenBucketRateLimiter(EGNYTE_QPS, EGNYTE_BURST)
+
+# Persistent per-day ledger of Egnyte calls so the 1,000 calls/day quota is visible and enforced
+EGNYTE_DAILY_QUOTA = int(os.getenv('EGNYTE_DAILY_QUOTA', '1000'))                 # Calls Egnyte allows per (UTC) day
+EGNYTE_QUOTA_RESERVE = int(os.getenv('EGNYTE_QUOTA_RESERVE', '50'))               # Calls bulk jobs may not use, kept for interactive requests and
+                                                                                   # for bulk calls the estimate cannot foresee (chunked uploads)
+EGNYTE_QUOTA_LEDGER_DB = os.getenv('EGNYTE_QUOTA_LEDGER_DB', 'egnyte_quota_ledger.db')
+
+class EgnyteQuotaLedger:
+    """SQLite-backed daily call counter shared by every worker process"""
+
+    def __init__(self, db_path, daily_quota, reserve):
+        self.db_path = db_path
+        self.daily_quota = daily_quota
+        self.reserve = reserve
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def today():
+        return datetime.utcnow().strftime('%Y-%m-%d')
+
+    @staticmethod
+    def seconds_until_reset():
+        """Seconds until the ledger rolls over at UTC midnight"""
+        now = datetime.utcnow()
+        return int(86400 - (now.hour * 3600 + now.minute * 60 + now.second))
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS egnyte_call_ledger (
+                day TEXT PRIMARY KEY,
+                calls INTEGER NOT NULL DEFAULT 0,
+                exhausted INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        return conn
+
+    def record(self, calls=1, exhausted=False):
+        """Add calls to today's count; exhausted marks the day as used up after Egnyte refuses us"""
+        try:
+            with self._lock:
+                conn = self._connect()
+                try:
+                    with conn:
+                        conn.execute(
+                            "INSERT INTO egnyte_call_ledger (day, calls, exhausted) VALUES (?, ?, ?) "
+                            "ON CONFLICT(day) DO UPDATE SET calls = calls + excluded.calls, "
+                            "exhausted = MAX(exhausted, excluded.exhausted)",
+                            (self.today(), calls, int(exhausted))
+                        )
+                finally:
+                    conn.close()
+        except Exception as e:
+            logger.warning(f"Could not update Egnyte quota ledger: {e}")
+
+    def usage(self):
+        """Return (calls used today, whether Egnyte reported the quota exhausted)"""
+        try:
+            with self._lock:
+                conn = self._connect()
+                try:
+                    row = conn.execute(
+                        "SELECT calls, exhausted FROM egnyte_call_ledger WHERE day = ?", (self.today(),)
+                    ).fetchone()
+                finally:
+                    conn.close()
+            return (row[0], bool(row[1])) if row else (0, False)
+        except Exception as e:
+            logger.warning(f"Could not read Egnyte quota ledger: {e}")
+            return 0, False
+
+    def remaining(self):
+        """Calls left today (0 once Egnyte has told us the quota is gone)"""
+        used, exhausted = self.usage()
+        return 0 if exhausted else max(0, self.daily_quota - used)
+
+    def admit(self, estimated_calls):
+        """Check whether a bulk job costing estimated_calls fits today's quota minus the reserve"""
+        available = max(0, self.remaining() - self.reserve)
+        return estimated_calls <= available, available
+
+    def stats(self):
+        """Return today's quota snapshot"""
+        used, exhausted = self.usage()
+        remaining = 0 if exhausted else max(0, self.daily_quota - used)
+        return {
+            "day": self.today(),
+            "daily_quota": self.daily_quota,
+            "used": used,
+            "remaining": remaining,
+            "reserve": self.reserve,
+            "available_for_bulk": max(0, remaining - self.reserve),
+            "exhausted": exhausted,
+            "resets_in_seconds": self.seconds_until_reset()
+        }
+
+egnyte_quota_ledger = EgnyteQuotaLedger(EGNYTE_QUOTA_LEDGER_DB, EGNYTE_DAILY_QUOTA, EGNYTE_QUOTA_RESERVE)
+
+# HTTP connection pooling for Egnyte
+EGNYTE_POOL_SIZE = int(os.getenv('EGNYTE_POOL_SIZE', '10'))                 # Keep-alive connections kept per host
+EGNYTE_CONNECT_TIMEOUT = float(os.getenv('EGNYTE_CONNECT_TIMEOUT', '10'))    # Seconds to establish a connection
+EGNYTE_READ_TIMEOUT = float(os.getenv('EGNYTE_READ_TIMEOUT', '120'))         # Seconds to wait for response data
+EGNYTE_SCHEME = os.getenv('EGNYTE_SCHEME', 'https')                          # 'http' to point DOMAIN at local_tests/fake_egnyte_server.py
+
+# Retries for every Egnyte call (shared policy; see retry_policy.py)
+EGNYTE_RETRY_ATTEMPTS = int(os.getenv('EGNYTE_RETRY_ATTEMPTS', '4'))            # Attempts per call, including the first
+EGNYTE_RETRY_DEADLINE = float(os.getenv('EGNYTE_RETRY_DEADLINE', '90'))         # Seconds a call may spend retrying in total
+EGNYTE_MAX_RETRY_AFTER = float(os.getenv('EGNYTE_MAX_RETRY_AFTER', '60'))       # Longer Retry-After waits fail fast instead of sleeping
+
+# Circuit breakers: after this many consecutive failed calls a backend is skipped (fail fast) for a while
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5'))
+CIRCUIT_RECOVERY_TIMEOUT = float(os.getenv('CIRCUIT_RECOVERY_TIMEOUT', '60'))   # Seconds before a probe call is let through
+
+egnyte_auth_breaker = CircuitBreaker("egnyte_auth", CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RECOVERY_TIMEOUT)
+egnyte_fs_breaker = CircuitBreaker("egnyte_fs", CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RECOVERY_TIMEOUT)
+openai_breaker = CircuitBreaker("openai", CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RECOVERY_TIMEOUT)
+azure_openai_breaker = CircuitBreaker("azure_openai", CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RECOVERY_TIMEOUT)
+
+def _egnyte_quota_exhausted(outcome, status, headers):
+    """Egnyte's daily quota error is not retried but still means the backend is unusable"""
+    return headers is not None and headers.get('X-Mashery-Error-Code') == 'ERR_403_DEVELOPER_OVER_RATE'
+
+def _egnyte_is_retryable(outcome, status, headers):
+    """Egnyte reports throttling as 403s tagged with a Mashery error code"""
+    error_code = headers.get('X-Mashery-Error-Code') if headers is not None else None
+    if error_code == 'ERR_403_DEVELOPER_OVER_QPS':
+        return True
+    if error_code == 'ERR_403_DEVELOPER_OVER_RATE':
+        return False   # daily quota is gone; retrying today cannot succeed
+    return None
+
+egnyte_retry_policy = RetryPolicy(
+    "egnyte",
+    max_attempts=EGNYTE_RETRY_ATTEMPTS,
+    base_delay=0.5,
+    max_delay=20.0,
+    deadline=EGNYTE_RETRY_DEADLINE,
+    max_retry_after=EGNYTE_MAX_RETRY_AFTER,
+    retry_exceptions=(requests.exceptions.ConnectionError, requests.exceptions.Timeout),
+    is_retryable=_egnyte_is_retryable,
+    breaker=egnyte_fs_breaker,
+    trips_breaker=_egnyte_quota_exhausted
+)
+# Same rules for /puboauth/token, tracked separately so auth trouble is visible on its own
+egnyte_auth_retry_policy = RetryPolicy(
+    "egnyte_auth",
+    max_attempts=EGNYTE_RETRY_ATTEMPTS,
+    base_delay=0.5,
+    max_delay=20.0,
+    deadline=EGNYTE_RETRY_DEADLINE,
+    max_retry_after=EGNYTE_MAX_RETRY_AFTER,
+    retry_exceptions=(requests.exceptions.ConnectionError, requests.exceptions.Timeout),
+    is_retryable=_egnyte_is_retryable,
+    breaker=egnyte_auth_breaker,
+    trips_breaker=_egnyte_quota_exhausted
+)
+
+def _request_body_positions(kwargs):
+    """Remember where seekable upload bodies start so a retried request can resend them"""
+    bodies = [kwargs.get('data'), kwargs.get('file')]
+    files = kwargs.get('files')
+    if isinstance(files, dict):
+        for value in files.values():
+            bodies.append(value[1] if isinstance(value, (tuple, list)) and len(value) > 1 else value)
+    return [(body, body.tell()) for body in bodies if hasattr(body, 'seek') and hasattr(body, 'tell')]
+
+class EgnyteClient:
+    """Pooled keep-alive HTTP session used by every Egnyte helper"""
+
+    def __init__(self, domain, pool_size=EGNYTE_POOL_SIZE, timeout=(EGNYTE_CONNECT_TIMEOUT, EGNYTE_READ_TIMEOUT)):
+        self.domain = domain
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @property
+    def base_url(self):
+        return f"{EGNYTE_SCHEME}://{self.domain}"
+
+    def request(self, method, path, access_token=None, timeout=None, authenticated=True, **kwargs):
+        """Send a rate-limited, retried request, injecting the Bearer token from the cache when not given"""
+        headers = dict(kwargs.pop('headers', None) or {})
+        if authenticated:
+            token = access_token or _egnyte_token_cache.get('token')
+            if token:
+                headers.setdefault("Authorization", f"Bearer {token}")
+
+        body_positions = _request_body_positions(kwargs)
+        
+        def attempt():
+            rate_limit_delay()
+            response = self.session.request(
+                method,
+                f"{self.base_url}{path}",
+                headers=headers,
+                timeout=timeout or self.timeout,
+                **kwargs
+            )
+            # Egnyte signals a spent daily quota with this Mashery error code
+            exhausted = response.headers.get('X-Mashery-Error-Code') == 'ERR_403_DEVELOPER_OVER_RATE'
+            if exhausted:
+                logger.error("🚫 Egnyte reports the daily API quota is exhausted")
+            egnyte_quota_ledger.record(exhausted=exhausted)
+            return response
+        
+        def before_retry(outcome):
+            if isinstance(outcome, requests.Response):
+                outcome.close()
+            for body, position in body_positions:
+                body.seek(position)
+        
+        policy = egnyte_retry_policy if authenticated else egnyte_auth_retry_policy
+        return policy.run(attempt, before_retry)
+
+    def get(self, path, access_token=None, **kwargs):
+        return self.request('GET', path, access_token=access_token, **kwargs)
+
+    def post(self, path, access_token=None, **kwargs):
+        return self.request('POST', path, access_token=access_token, **kwargs)
+
+egnyte_api = EgnyteClient(DOMAIN)
+
+# Folder listing cache to save Egnyte quota on repeated listings
+EGNYTE_LISTING_CACHE_TTL = float(os.getenv('EGNYTE_LISTING_CACHE_TTL', '300'))   # Seconds a listing stays fresh
+EGNYTE_LISTING_CACHE_SIZE = int(os.getenv('EGNYTE_LISTING_CACHE_SIZE', '256'))   # Max cached listings (LRU evicted)
+
+class FolderListingCache:
+    """Thread-safe TTL + LRU cache of Egnyte folder listings keyed by folder id or path"""
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # key -> (stored_at, folder_data)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    @staticmethod
+    def id_key(folder_id):
+        return ('id', folder_id)
+
+    @staticmethod
+    def path_key(folder_path):
+        return ('path', '/' + (folder_path or '').strip('/'))
+
+    def get(self, key):
+        """Return a copy of a fresh cached listing, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            folder_data = entry[1]
+        # Callers annotate listings in place (e.g. file_link), so never hand out the cached object
+        return copy.deepcopy(folder_data)
+
+    def put(self, key, folder_data):
+        """Cache a listing under its lookup key and under its id/path aliases"""
+        keys = {key}
+        if isinstance(folder_data, dict):
+            if folder_data.get('folder_id'):
+                keys.add(self.id_key(folder_data['folder_id']))
+            if folder_data.get('path'):
+                keys.add(self.path_key(folder_data['path']))
+        
+        stored = copy.deepcopy(folder_data)
+        now = time.monotonic()
+        with self._lock:
+            for k in keys:
+                self._entries[k] = (now, stored)
+                self._entries.move_to_end(k)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, folder_id=None, folder_path=None):
+        """Drop every cached listing for a folder after we change its contents"""
+        with self._lock:
+            stale = [
+                k for k, (_, data) in self._entries.items()
+                if (folder_id and (k == self.id_key(folder_id) or (isinstance(data, dict) and data.get('folder_id') == folder_id)))
+                or (folder_path and k == self.path_key(folder_path))
+            ]
+            for k in stale:
+                del self._entries[k]
+            self._invalidations += len(stale)
+        return len(stale)
+
+    def clear(self):
+        """Flush the whole cache and return how many entries were dropped"""
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+        return count
+
+    def stats(self):
+        """Return a snapshot of cache usage"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "ttl_seconds": self.ttl,
+                "max_entries": self.max_entries,
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations
+            }
+
+egnyte_listing_cache = FolderListingCache(EGNYTE_LISTING_CACHE_TTL, EGNYTE_LISTING_CACHE_SIZE)
 
 # Token caching to reduce authentication requests
 _egnyte_token_cache = {
@@ -73,18 +476,43 @@ _egnyte_token_cache = {
     'expires_at': None
 }
 
-# Persistent token storage file
-TOKEN_CACHE_FILE = 'egnyte_token_cache.json'
+# Persistent token storage file, shared by every worker process on the host
+TOKEN_CACHE_FILE = os.getenv('EGNYTE_TOKEN_CACHE_FILE', 'egnyte_token_cache.json')
+TOKEN_LOCK_FILE = f"{TOKEN_CACHE_FILE}.lock"
 
 def rate_limit_delay():
-    """Add delay to respect rate limits"""
-    time.sleep(RATE_LIMIT_DELAY)
+    """Wait for a slot in the shared Egnyte rate budget and return the seconds waited"""
+    waited = egnyte_rate_limiter.acquire()
+    if waited > 0:
+        logger.debug(f"⏳ Egnyte rate limiter delayed call by {waited:.2f}s")
+    return waited
+
+@contextmanager
+def token_file_lock():
+    """Exclusive cross-process lock around token refresh so N workers do one refresh"""
+    if fcntl is None:
+        # No flock on this platform: fall back to per-process single-flight only
+        yield
+        return
+    with open(TOKEN_LOCK_FILE, 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
 
 def save_token_to_file(token_data):
-    """Save token to persistent file"""
+    """Save token to persistent file (atomic replace, so readers never see a partial write)"""
     try:
-        with open(TOKEN_CACHE_FILE, 'w') as f:
-            json.dump(token_data, f)
+        directory = os.path.dirname(os.path.abspath(TOKEN_CACHE_FILE))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.egnyte_token_', suffix='.json')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'token': token_data.get('token'), 'expires_at': token_data.get('expires_at')}, f)
+            os.replace(temp_path, TOKEN_CACHE_FILE)
+        finally:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
         logger.info(f"💾 Token saved to {TOKEN_CACHE_FILE}")
     except Exception as e:
         logger.warning(f"Could not save token to file: {e}")
@@ -118,46 +546,152 @@ def clear_egnyte_token_cache():
     logger.info("🗑️ Cleared Egnyte token cache")
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()               # Root log level
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')                      # 'text' or 'json' (one JSON object per line)
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))        # Records buffered for the writer thread; overflow is dropped and counted
+BULK_ROW_LOG_RATE = float(os.getenv('BULK_ROW_LOG_RATE', '20'))   # Max per-row summary lines per second in bulk matching
+configure_logging(level=getattr(logging, LOG_LEVEL, logging.INFO), fmt=LOG_FORMAT, queue_size=LOG_QUEUE_SIZE)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 CORS(app) 
 
+@app.before_request
+def enable_request_debug_logging():
+    """Turn on verbose diagnostics for this request only (X-Debug-Log: 1 header or ?debug_log=1)"""
+    flag = request.headers.get('X-Debug-Log') or request.args.get('debug_log')
+    if flag and flag.lower() in ('1', 'true', 'yes'):
+        g.debug_log_token = set_request_debug(True)
+
+@app.teardown_request
+def reset_request_debug_logging(exc=None):
+    # Worker threads are reused across requests, so the switch must not leak into the next one
+    token = g.pop('debug_log_token', None)
+    if token is not None:
+        reset_request_debug(token)
+
 # In-memory storage for job results
 job_results = {}
 job_status = {}
 
 # Egnyte API Functions
-def get_egnyte_token():
+
+# Token refresh is single-flight: one thread (in one worker) talks to /puboauth/token while the others wait for its result
+EGNYTE_TOKEN_REFRESH_MARGIN = float(os.getenv('EGNYTE_TOKEN_REFRESH_MARGIN', '600'))   # Refresh this many seconds before expiry
+_egnyte_token_lock = threading.Lock()
+_egnyte_token_refresher = None
+_egnyte_token_stats = {'refresh_attempts': 0, 'refreshes': 0, 'proactive_refreshes': 0, 'waited_for_refresh': 0,
+                       'shared_token_reused': 0}
+_egnyte_token_stats_lock = threading.Lock()   # separate from _egnyte_token_lock, which is held for a whole refresh
+_egnyte_token_generation = 0   # bumped after every refresh attempt so waiters can tell one finished
+
+def _cached_egnyte_token(current_time):
+    """Return the in-memory token if it is still valid"""
+    if (_egnyte_token_cache['token'] and 
+        _egnyte_token_cache['expires_at'] and 
+        current_time < _egnyte_token_cache['expires_at']):
+        return _egnyte_token_cache['token']
+    return None
+
+def _count_token_event(name):
+    """Increment one of the token refresh counters"""
+    with _egnyte_token_stats_lock:
+        _egnyte_token_stats[name] += 1
+
+def get_egnyte_token(force_refresh=False):
     """Get Egnyte access token with rate limiting and retry logic"""
+    global _egnyte_token_generation
     if not EGNYTE_AVAILABLE:
         logger.error("Egnyte credentials not available")
         return None
     
     # Check if we have a cached token that's still valid
-    current_time = time.time()
-    if (_egnyte_token_cache['token'] and 
-        _egnyte_token_cache['expires_at'] and 
-        current_time < _egnyte_token_cache['expires_at']):
-        logger.info("✅ Using cached Egnyte token")
-        return _egnyte_token_cache['token']
+    if not force_refresh:
+        token = _cached_egnyte_token(time.time())
+        if token:
+            logger.info("✅ Using cached Egnyte token")
+            return token
     
-    # Try to load from persistent file
-    if not _egnyte_token_cache['token']:
-        persistent_token = load_token_from_file()
-        if persistent_token:
-            _egnyte_token_cache.update(persistent_token)
-            # Check if the loaded token is still valid
-            if (_egnyte_token_cache['token'] and 
-                _egnyte_token_cache['expires_at'] and 
-                current_time < _egnyte_token_cache['expires_at']):
-                logger.info("✅ Using persistent Egnyte token")
-                return _egnyte_token_cache['token']
-            else:
-                logger.info("📂 Persistent token expired, will request new one")
+    generation = _egnyte_token_generation
+    if _egnyte_token_lock.locked():
+        _count_token_event('waited_for_refresh')
+        logger.info("⏳ Waiting for another thread's Egnyte token refresh")
     
+    with _egnyte_token_lock:
+        # Another thread refreshed (or failed to) while we waited: share its outcome
+        if _egnyte_token_generation != generation:
+            return _cached_egnyte_token(time.time())
+        
+        # Other workers share the token file; holding its lock makes the refresh single-flight across processes
+        with token_file_lock():
+            # Another worker may already have written a fresh token; adopt it instead of authenticating
+            persistent_token = load_token_from_file()
+            if persistent_token and persistent_token.get('token'):
+                current_time = time.time()
+                expires_at = persistent_token.get('expires_at') or 0
+                fresh_enough = expires_at - EGNYTE_TOKEN_REFRESH_MARGIN > current_time if force_refresh else expires_at > current_time
+                if fresh_enough and (not force_refresh or persistent_token['token'] != _egnyte_token_cache['token']):
+                    _egnyte_token_cache.update(persistent_token)
+                    _count_token_event('shared_token_reused')
+                    logger.info("✅ Using persistent Egnyte token")
+                    _egnyte_token_generation += 1
+                    _start_egnyte_token_refresher()
+                    return persistent_token['token']
+                if not force_refresh:
+                    logger.info("📂 Persistent token expired, will request new one")
+            
+            _count_token_event('refresh_attempts')
+            try:
+                token = _request_new_egnyte_token()
+            finally:
+                _egnyte_token_generation += 1
+        if token:
+            _count_token_event('refreshes')
+            _start_egnyte_token_refresher()
+        return token
+
+def _egnyte_token_refresh_loop():
+    """Background loop that renews the token before it expires so request threads never wait on auth"""
+    while True:
+        expires_at = _egnyte_token_cache.get('expires_at')
+        if not expires_at:
+            time.sleep(60)
+            continue
+        
+        wait = expires_at - EGNYTE_TOKEN_REFRESH_MARGIN - time.time()
+        if wait > 0:
+            # Wake up periodically in case the cache was cleared or refreshed elsewhere
+            time.sleep(min(wait, 300))
+            continue
+        
+        logger.info("🔄 Proactively refreshing Egnyte token before it expires")
+        if get_egnyte_token(force_refresh=True):
+            _count_token_event('proactive_refreshes')
+        else:
+            # The current token stays in use until it actually expires; try again shortly
+            time.sleep(60)
+
+def _start_egnyte_token_refresher():
+    """Start the proactive refresh thread once per process"""
+    global _egnyte_token_refresher
+    if _egnyte_token_refresher is None or not _egnyte_token_refresher.is_alive():
+        _egnyte_token_refresher = threading.Thread(target=_egnyte_token_refresh_loop, name="egnyte-token-refresher", daemon=True)
+        _egnyte_token_refresher.start()
+
+def egnyte_token_stats():
+    """Return token refresh counters and the current token's expiry"""
+    with _egnyte_token_stats_lock:
+        stats = dict(_egnyte_token_stats)
+    expires_at = _egnyte_token_cache.get('expires_at')
+    stats['token_cached'] = bool(_egnyte_token_cache.get('token'))
+    stats['expires_in_seconds'] = round(expires_at - time.time()) if expires_at else None
+    stats['refresher_running'] = bool(_egnyte_token_refresher and _egnyte_token_refresher.is_alive())
+    return stats
+
+def _request_new_egnyte_token():
+    """Authenticate against /puboauth/token and cache the new token (call with _egnyte_token_lock held)"""
+    current_time = time.time()
     logger.info(f"🔐 Attempting Egnyte authentication...")
     logger.info(f"   Domain: {DOMAIN}")
     logger.info(f"   Username: {USERNAME}")
@@ -165,7 +699,7 @@ def get_egnyte_token():
     logger.info(f"   Client Secret: {'*' * len(CLIENT_SECRET) if CLIENT_SECRET else 'None'}")
     logger.info(f"   Password: {'*' * len(PASSWORD) if PASSWORD else 'None'}")
         
-    url = f"https://{DOMAIN}/puboauth/token"
+    url = f"{egnyte_api.base_url}/puboauth/token"
     headers = {"Content-Type": "application/x-www-form-urlencoded"}
     data = {
         "grant_type": "password",
@@ -178,130 +712,108 @@ def get_egnyte_token():
     logger.info(f"🌐 Making request to: {url}")
     logger.info(f"📋 Request data: grant_type=password, username={USERNAME}, client_id={CLIENT_ID}, client_secret={'*' * len(CLIENT_SECRET) if CLIENT_SECRET else 'None'}")
     
-    max_retries = 3
-    retry_count = 0
-    
-    while retry_count < max_retries:
-        try:
-            # Add rate limiting delay before each attempt
-            rate_limit_delay()
+    try:
+        # Use urllib.parse.urlencode to properly encode form data
+        encoded_data = urllib.parse.urlencode(data)
+        logger.info(f"🔧 Encoded data: {encoded_data.replace(PASSWORD, '*' * len(PASSWORD)).replace(CLIENT_SECRET, '*' * len(CLIENT_SECRET))}")
+        
+        # Rate limited through the shared Egnyte client; no Bearer header on the auth call
+        response = egnyte_api.post("/puboauth/token", data=encoded_data, headers=headers, authenticated=False)
+        
+        logger.info(f"📊 Response Status: {response.status_code}")
+        # Never log the body of a successful response: it carries the access token
+        debug_event(logger, "egnyte_auth_response", status=response.status_code,
+                    content_type=response.headers.get('Content-Type'),
+                    body=lambda: response.text[:500] if response.status_code != 200 else "<redacted>")
+        
+        if response.status_code == 200:
+            token_data = response.json()
+            access_token = token_data["access_token"]
+            expires_in = token_data.get("expires_in", 3600)  # Default to 1 hour
+            token_type = token_data.get("token_type", "unknown")
             
-            # Use urllib.parse.urlencode to properly encode form data
-            encoded_data = urllib.parse.urlencode(data)
-            logger.info(f"🔧 Encoded data: {encoded_data.replace(PASSWORD, '*' * len(PASSWORD)).replace(CLIENT_SECRET, '*' * len(CLIENT_SECRET))}")
+            # Handle token expiration
+            if expires_in == -1:
+                # Token never expires, set expiration to a very far future date (10 years)
+                _egnyte_token_cache['expires_at'] = current_time + (10 * 365 * 24 * 3600)  # 10 years from now
+                logger.info(f"   Token never expires (expires_in: -1), setting cache to 10 years")
+            else:
+                # Token expires, set expiration 5 minutes early
+                _egnyte_token_cache['expires_at'] = current_time + expires_in - 300
             
-            response = requests.post(url, data=encoded_data, headers=headers)
+            # Cache the token with expiration
+            _egnyte_token_cache['token'] = access_token
             
-            logger.info(f"📊 Response Status: {response.status_code}")
-            logger.info(f"📋 Response Headers: {dict(response.headers)}")
-            logger.info(f"📄 Response Body: {response.text}")
+            # Save token persistently
+            save_token_to_file(_egnyte_token_cache)
             
-            if response.status_code == 200:
-                token_data = response.json()
-                access_token = token_data["access_token"]
-                expires_in = token_data.get("expires_in", 3600)  # Default to 1 hour
-                token_type = token_data.get("token_type", "unknown")
-                
-                # Handle token expiration
-                if expires_in == -1:
-                    # Token never expires, set expiration to a very far future date (10 years)
-                    _egnyte_token_cache['expires_at'] = current_time + (10 * 365 * 24 * 3600)  # 10 years from now
-                    logger.info(f"   Token never expires (expires_in: -1), setting cache to 10 years")
-                else:
-                    # Token expires, set expiration 5 minutes early
-                    _egnyte_token_cache['expires_at'] = current_time + expires_in - 300
-                
-                # Cache the token with expiration
-                _egnyte_token_cache['token'] = access_token
-                
-                # Save token persistently
-                save_token_to_file(_egnyte_token_cache)
-                
-                logger.info(f"✅ Authentication successful!")
-                logger.info(f"   Token Type: {token_type}")
-                logger.info(f"   Expires In: {expires_in} seconds")
-                logger.info(f"   Access Token: {access_token[:20]}...")
-                logger.info(f"   Token cached until: {datetime.fromtimestamp(_egnyte_token_cache['expires_at'])}")
-                
-                return access_token
-            elif response.status_code == 429:
-                # Handle rate limiting
-                retry_after = response.headers.get('Retry-After', '30')
-                try:
-                    retry_seconds = int(retry_after.split(',')[0])  # Handle "2665, 30" format
-                except (ValueError, IndexError):
-                    retry_seconds = 30
-                
-                logger.warning(f"XX Rate limit hit! Retry-After: {retry_seconds} seconds")
-                logger.warning(f"   Retry-After header: {retry_after}")
-                
-                # If retry time is too long (>60 seconds), fail immediately to avoid worker timeout
-                if retry_seconds > 60:
-                    logger.error(f"XX Rate limit retry time ({retry_seconds}s) exceeds worker timeout. Failing immediately.")
-                    logger.error("💡 Consider implementing background job processing for bulk requests.")
-                    return None
-                
-                # Only wait for short delays
-                logger.warning(f"⚠️ Waiting {retry_seconds} seconds before retry {retry_count + 1}/{max_retries}")
-                time.sleep(retry_seconds)
-                retry_count += 1
-                continue
-            else:
-                logger.error(f"XX Authentication failed!")
-                logger.error(f"   Status Code: {response.status_code}")
-                logger.error(f"   Response Text: {response.text}")
-                
-                # Check for specific error types
-                error_text = response.text.lower()
-                if "invalid username" in error_text or "invalid password" in error_text:
-                    logger.error(f"   Error Type: Invalid credentials")
-                elif "rate limit" in error_text or "qps" in error_text:
-                    logger.error(f"   Error Type: Rate limiting")
-                elif "ip" in error_text or "restricted" in error_text:
-                    logger.error(f"   Error Type: IP restriction")
-                elif "locked" in error_text or "suspended" in error_text:
-                    logger.error(f"   Error Type: Account locked/suspended")
-                else:
-                    logger.error(f"   Error Type: Unknown")
-                
-                # Check for specific headers that might indicate the issue
-                if 'X-Mashery-Error-Code' in response.headers:
-                    error_code = response.headers['X-Mashery-Error-Code']
-                    logger.error(f"   Mashery Error Code: {error_code}")
-                
-                if 'Retry-After' in response.headers:
-                    retry_after = response.headers['Retry-After']
-                    logger.error(f"   Retry After: {retry_after} seconds")
-                
-                # For non-429 errors, don't retry
-                return None
-                
-        except requests.exceptions.ConnectionError as e:
-            logger.error(f"XX Connection error: {e}")
-            logger.error(f"   This might indicate network issues or domain problems")
-            return None
-        except requests.exceptions.Timeout as e:
-            logger.error(f"XX Timeout error: {e}")
-            logger.error(f"   Request timed out - server might be slow or unreachable")
-            return None
-        except requests.exceptions.RequestException as e:
-            logger.error(f"XX Request error: {e}")
-            logger.error(f"   General request failure")
+            logger.info(f"✅ Authentication successful!")
+            logger.info(f"   Token Type: {token_type}")
+            logger.info(f"   Expires In: {expires_in} seconds")
+            logger.info(f"   Access Token: {access_token[:20]}...")
+            logger.info(f"   Token cached until: {datetime.fromtimestamp(_egnyte_token_cache['expires_at'])}")
+            
+            return access_token
+        elif response.status_code == 429:
+            # The shared retry policy already backed off; a 429 here means the wait was too long or retries ran out
+            retry_after = response.headers.get('Retry-After', '')
+            logger.error(f"XX Rate limit hit and retries exhausted! Retry-After header: {retry_after}")
+            logger.error("💡 Consider implementing background job processing for bulk requests.")
             return None
-        except Exception as e:
-            logger.error(f"XX Unexpected error getting Egnyte token: {e}")
-            logger.error(f"   Error type: {type(e).__name__}")
+        else:
+            logger.error(f"XX Authentication failed!")
+            logger.error(f"   Status Code: {response.status_code}")
+            logger.error(f"   Response Text: {response.text}")
+            
+            # Check for specific error types
+            error_text = response.text.lower()
+            if "invalid username" in error_text or "invalid password" in error_text:
+                logger.error(f"   Error Type: Invalid credentials")
+            elif "rate limit" in error_text or "qps" in error_text:
+                logger.error(f"   Error Type: Rate limiting")
+            elif "ip" in error_text or "restricted" in error_text:
+                logger.error(f"   Error Type: IP restriction")
+            elif "locked" in error_text or "suspended" in error_text:
+                logger.error(f"   Error Type: Account locked/suspended")
+            else:
+                logger.error(f"   Error Type: Unknown")
+            
+            # Check for specific headers that might indicate the issue
+            if 'X-Mashery-Error-Code' in response.headers:
+                error_code = response.headers['X-Mashery-Error-Code']
+                logger.error(f"   Mashery Error Code: {error_code}")
+            
+            if 'Retry-After' in response.headers:
+                retry_after = response.headers['Retry-After']
+                logger.error(f"   Retry After: {retry_after} seconds")
+            
+            # For non-429 errors, don't retry
             return None
-    
-    # If we've exhausted all retries
-    logger.error(f"XX Authentication failed after {max_retries} retries due to rate limiting")
-    return None
+            
+    except CircuitOpenError as e:
+        logger.error(f"XX Egnyte auth skipped: {e}")
+        return None
+    except requests.exceptions.ConnectionError as e:
+        logger.error(f"XX Connection error: {e}")
+        logger.error(f"   This might indicate network issues or domain problems")
+        return None
+    except requests.exceptions.Timeout as e:
+        logger.error(f"XX Timeout error: {e}")
+        logger.error(f"   Request timed out - server might be slow or unreachable")
+        return None
+    except requests.exceptions.RequestException as e:
+        logger.error(f"XX Request error: {e}")
+        logger.error(f"   General request failure")
+        return None
+    except Exception as e:
+        logger.error(f"XX Unexpected error getting Egnyte token: {e}")
+        logger.error(f"   Error type: {type(e).__name__}")
+        return None
 
 def create_egnyte_folder(access_token, parent_folder_id, folder_name):
     """Create a new folder in Egnyte"""
-    url = f"https://{DOMAIN}/pubapi/v1/fs/ids/folder/{parent_folder_id}"
+    path = f"/pubapi/v1/fs/ids/folder/{parent_folder_id}"
     headers = {
-        "Authorization": f"Bearer {access_token}",
         "Content-Type": "application/json"
     }
     
@@ -311,10 +823,10 @@ def create_egnyte_folder(access_token, parent_folder_id, folder_name):
     }
     
     try:
-        # Add rate limiting delay
-        rate_limit_delay()
-        response = requests.post(url, headers=headers, json=data)
+        response = egnyte_api.post(path, access_token, headers=headers, json=data)
         response.raise_for_status()
+        egnyte_listing_cache.invalidate(folder_id=parent_folder_id)
+        egnyte_folder_mirror.mark_dirty(parent_folder_id)
         return response.json()
     except requests.HTTPError as e:
         error_text = e.response.text.lower()
@@ -322,8 +834,10 @@ def create_egnyte_folder(access_token, parent_folder_id, folder_name):
         # Check for folder already exists error
         if "already exists" in error_text or "duplicate" in error_text or "exists" in error_text:
             logger.info(f"Folder '{folder_name}' already exists, checking for existing folder...")
-            # Try to find the existing folder
+            # Try to find the existing folder, re-listing if our cached listing predates it
             existing_folder = find_existing_folder(access_token, parent_folder_id, folder_name)
+            if not existing_folder and egnyte_listing_cache.invalidate(folder_id=parent_folder_id):
+                existing_folder = find_existing_folder(access_token, parent_folder_id, folder_name)
             if existing_folder:
                 logger.info(f"Found existing folder: {existing_folder.get('name')}")
                 return existing_folder
@@ -331,19 +845,6 @@ def create_egnyte_folder(access_token, parent_folder_id, folder_name):
                 logger.error(f"Folder '{folder_name}' already exists but couldn't find it")
                 return None
         
-        # Check for rate limiting
-        elif "developer over qps" in error_text or "rate limit" in error_text or "qps" in error_text:
-            logger.warning(f"Rate limit hit, waiting 3 seconds before retry...")
-            time.sleep(3)  # Longer wait for rate limit recovery
-            try:
-                rate_limit_delay()  # Add rate limiting before retry
-                response = requests.post(url, headers=headers, json=data)
-                response.raise_for_status()
-                return response.json()
-            except requests.HTTPError as retry_e:
-                logger.error(f"Failed to create folder on retry: {retry_e}")
-                return None
-        
         # Check for permission errors
         elif e.response.status_code == 403:
             logger.error(f"Permission denied creating folder '{folder_name}': {e.response.text}")
@@ -359,281 +860,741 @@ def create_egnyte_folder(access_token, parent_folder_id, folder_name):
 def find_existing_folder(access_token, parent_folder_id, folder_name):
     """Find an existing folder by name in the parent folder"""
     try:
-        folder_data = list_egnyte_folder_contents(access_token, parent_folder_id)
-        if folder_data and isinstance(folder_data, dict):
-            folders = folder_data.get("folders", [])
-            for folder in folders:
-                if folder.get('name') == folder_name:
-                    return folder
-        return None
+        return find_egnyte_subfolder(access_token, parent_folder_id, folder_name)
     except Exception as e:
         logger.error(f"Error finding existing folder: {e}")
         return None
 
 def get_egnyte_folder_details(access_token, folder_id):
     """Get folder details"""
-    url = f"https://{DOMAIN}/pubapi/v1/fs/ids/folder/{folder_id}"
+    path = f"/pubapi/v1/fs/ids/folder/{folder_id}"
     headers = {
-        "Authorization": f"Bearer {access_token}",
         "Content-Type": "application/json"
     }
     
     try:
-        # Add rate limiting delay
-        rate_limit_delay()
-        response = requests.get(url, headers=headers)
+        response = egnyte_api.get(path, access_token, headers=headers)
         response.raise_for_status()
         return response.json()
     except requests.HTTPError as e:
-        if "Developer Over Qps" in e.response.text:
-            logger.warning(f"Rate limit hit, waiting 3 seconds before retry...")
-            time.sleep(3)  # Longer wait for rate limit recovery
-            try:
-                rate_limit_delay()  # Add rate limiting before retry
-                response = requests.get(url, headers=headers)
-                response.raise_for_status()
-                return response.json()
-            except requests.HTTPError as retry_e:
-                logger.error(f"Failed to get folder details on retry: {retry_e}")
-                return None
-        else:
-            logger.error(f"Failed to get folder details: {e}")
-            return None
+        # Throttling was already retried by the shared Egnyte retry policy
+        logger.error(f"Failed to get folder details: {e}")
+        return None
     except Exception as e:
         logger.error(f"Error getting Egnyte folder details: {e}")
         return None
 
-def list_egnyte_folder_contents_path(access_token, folder_path):
-    """List folder contents given a folder path"""
-    url = f"https://{DOMAIN}/pubapi/v1/fs/{urllib.parse.quote(folder_path)}"
+# Egnyte returns folder contents in pages of at most this many entries
+EGNYTE_LIST_PAGE_SIZE = int(os.getenv('EGNYTE_LIST_PAGE_SIZE', '100'))
+# Folder paths listed in parallel by /egnyte-list-docs-multi-folder (calls are still paced by the rate limiter)
+EGNYTE_LIST_CONCURRENCY = int(os.getenv('EGNYTE_LIST_CONCURRENCY', '4'))
+
+def _egnyte_folder_api_path(folder_id=None, folder_path=None):
+    """Build the fs API path for a folder given its id or its path"""
+    if folder_id:
+        return f"/pubapi/v1/fs/ids/folder/{folder_id}"
+    return f"/pubapi/v1/fs/{urllib.parse.quote(folder_path)}"
+
+def _fetch_egnyte_folder_listing(access_token, path, offset=0, count=EGNYTE_LIST_PAGE_SIZE):
+    """Request one page of a folder listing from Egnyte, bypassing the listing cache"""
     headers = {
-        "Authorization": f"Bearer {access_token}",
         "Content-Type": "application/json"
     }
     
     params = {
         "list_content": "true",
-        "count": "100"
+        "offset": str(offset),
+        "count": str(count)
     }
-
+    
     try:
-        # Add rate limiting delay
-        rate_limit_delay()
-        response = requests.get(url, headers=headers, params=params)
+        response = egnyte_api.get(path, access_token, headers=headers, params=params)
         response.raise_for_status()
         return response.json()
     except requests.HTTPError as e:
-        if "Developer Over Qps" in e.response.text:
-            logger.warning(f"Rate limit hit, waiting 3 seconds before retry...")
-            time.sleep(3)  # Longer wait for rate limit recovery
-            try:
-                rate_limit_delay()  # Add rate limiting before retry
-                response = requests.get(url, headers=headers, params=params)
-                response.raise_for_status()
-                return response.json()
-            except requests.HTTPError as retry_e:
-                logger.error(f"Failed to list folder contents on retry: {retry_e}")
-                return None
-        else:
-            logger.error(f"Failed to list folder contents: {e}")
-            return None
+        # Throttling was already retried by the shared Egnyte retry policy
+        logger.error(f"Failed to list folder contents: {e}")
+        return None
     except Exception as e:
         logger.error(f"Error listing Egnyte folder contents: {e}")
         return None
 
+def _egnyte_page_has_more(page, offset, page_size):
+    """Decide from a listing page whether another page follows it"""
+    entries = len(page.get("folders", [])) + len(page.get("files", []))
+    if entries == 0:
+        # An empty page ends the listing even if total_count (stale after concurrent deletes) says
+        # otherwise; the offset would not advance and the same page would be fetched forever
+        return False
+    total_count = page.get("total_count")
+    if total_count is not None:
+        return offset + entries < total_count
+    return entries >= page_size
 
+def iter_egnyte_folder_pages(access_token, folder_id=None, folder_path=None, offset=0,
+                             page_size=EGNYTE_LIST_PAGE_SIZE, prefetch=False):
+    """
+    Yield a folder listing page by page using Egnyte's offset/count parameters.
+    
+    Stop iterating to stop paging. With prefetch=True the next page is requested in the
+    background while the caller works on the current one (at most one page is wasted if
+    the caller stops early). Raises RuntimeError if a page cannot be fetched, so a
+    partial listing is never mistaken for a complete one.
+    """
+    path = _egnyte_folder_api_path(folder_id, folder_path)
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    pending = None
+    
+    try:
+        while True:
+            if pending is not None:
+                page = pending.result()
+                pending = None
+            else:
+                page = _fetch_egnyte_folder_listing(access_token, path, offset, page_size)
+            
+            if page is None:
+                raise RuntimeError(f"Failed to list Egnyte folder {folder_id or folder_path} at offset {offset}")
+            
+            has_more = _egnyte_page_has_more(page, offset, page_size)
+            page_offset = offset
+            offset += len(page.get("folders", [])) + len(page.get("files", []))
+            
+            if has_more and executor:
+                pending = executor.submit(_fetch_egnyte_folder_listing, access_token, path, offset, page_size)
+            
+            page["offset"] = page_offset
+            page["has_more"] = has_more
+            page["next_offset"] = offset if has_more else None
+            yield page
+            
+            if not has_more:
+                return
+    finally:
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+def iter_egnyte_folder_entries(access_token, folder_id=None, folder_path=None, prefetch=True):
+    """Yield the folders and then files of each listing page, one entry at a time"""
+    for page in iter_egnyte_folder_pages(access_token, folder_id, folder_path, prefetch=prefetch):
+        for folder in page.get("folders", []):
+            yield folder
+        for file in page.get("files", []):
+            yield file
 
-def list_egnyte_folder_contents(access_token, folder_id):
+def _collect_egnyte_folder_listing(access_token, folder_id=None, folder_path=None):
+    """Fetch every page of a folder listing and merge them into one listing dict"""
+    try:
+        folder_data = None
+        for page in iter_egnyte_folder_pages(access_token, folder_id, folder_path, prefetch=True):
+            if folder_data is None:
+                folder_data = page
+                folder_data["folders"] = list(page.get("folders", []))
+                folder_data["files"] = list(page.get("files", []))
+            else:
+                folder_data["folders"].extend(page.get("folders", []))
+                folder_data["files"].extend(page.get("files", []))
+        
+        if folder_data is not None:
+            for key in ("offset", "has_more", "next_offset"):
+                folder_data.pop(key, None)
+        return folder_data
+    except Exception as e:
+        logger.error(f"Error listing Egnyte folder contents: {e}")
+        return None
+
+def list_egnyte_folder_contents_path(access_token, folder_path, use_cache=True):
+    """List folder contents given a folder path"""
+    cache_key = FolderListingCache.path_key(folder_path)
+    if use_cache:
+        cached = egnyte_listing_cache.get(cache_key)
+        if cached is not None:
+            return cached
+    
+    folder_data = _collect_egnyte_folder_listing(access_token, folder_path=folder_path)
+    if folder_data is not None:
+        egnyte_listing_cache.put(cache_key, folder_data)
+    return folder_data
+
+def list_egnyte_folder_contents(access_token, folder_id, use_cache=True):
     """List folder contents"""
-    url = f"https://{DOMAIN}/pubapi/v1/fs/ids/folder/{folder_id}"
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json"
-    }
+    cache_key = FolderListingCache.id_key(folder_id)
+    if use_cache:
+        cached = egnyte_listing_cache.get(cache_key)
+        if cached is not None:
+            return cached
     
-    params = {
-        "list_content": "true",
-        "count": "100"
-    }
+    folder_data = _collect_egnyte_folder_listing(access_token, folder_id=folder_id)
+    if folder_data is not None:
+        egnyte_listing_cache.put(cache_key, folder_data)
+    return folder_data
+
+def find_egnyte_subfolder(access_token, parent_folder_id, folder_name):
+    """
+    Return the sub-folder called folder_name, or None.
     
+    A cached listing is searched in memory. On a cache miss the listing is paged only until the
+    folder turns up, or until the first file shows that no folders are left (Egnyte lists
+    folders before files), instead of fetching every page first. Raises RuntimeError if a page
+    cannot be fetched.
+    """
+    cached = egnyte_listing_cache.get(FolderListingCache.id_key(parent_folder_id))
+    if cached is not None:
+        return next((folder for folder in cached.get("folders", []) if folder.get('name') == folder_name), None)
+    
+    # No prefetch: the search usually stops on the first page
+    entries = iter_egnyte_folder_entries(access_token, folder_id=parent_folder_id, prefetch=False)
     try:
-        # Add rate limiting delay
-        rate_limit_delay()
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        return response.json()
-    except requests.HTTPError as e:
-        if "Developer Over Qps" in e.response.text:
-            logger.warning(f"Rate limit hit, waiting 3 seconds before retry...")
-            time.sleep(3)  # Longer wait for rate limit recovery
-            try:
-                rate_limit_delay()  # Add rate limiting before retry
-                response = requests.get(url, headers=headers, params=params)
-                response.raise_for_status()
-                return response.json()
-            except requests.HTTPError as retry_e:
-                logger.error(f"Failed to list folder contents on retry: {retry_e}")
+        for entry in entries:
+            if not entry.get('is_folder', True):
                 return None
-        else:
-            logger.error(f"Failed to list folder contents: {e}")
-            return None
-    except Exception as e:
-        logger.error(f"Error listing Egnyte folder contents: {e}")
+            if entry.get('name') == folder_name:
+                return entry
         return None
+    finally:
+        entries.close()
 
-def background_create_egnyte_folders(molecule_code: str, campaign_number: str):
-    """Background function to create Egnyte folder structure"""
-    job_key = f"egnyte_{molecule_code}_{campaign_number}"
+def _encode_list_cursor(offset):
+    """Encode a listing offset as an opaque pagination cursor"""
+    return base64.urlsafe_b64encode(json.dumps({"offset": offset}).encode('utf-8')).decode('ascii')
+
+def _decode_list_cursor(cursor):
+    """Decode a pagination cursor back to an offset (ValueError if malformed)"""
+    if not cursor:
+        return 0
+    try:
+        offset = int(json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))["offset"])
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if offset < 0:
+        raise ValueError("Invalid cursor")
+    return offset
+
+def get_egnyte_folder_page(access_token, folder_id=None, folder_path=None, cursor=None, limit=None):
+    """
+    Return (page, next_cursor) for cursor-based pagination of a folder listing.
     
-    logger.info(f"BACKGROUND: Starting Egnyte folder creation for {job_key}")
+    Folders come before files, matching Egnyte's own ordering. A fresh cached listing is
+    sliced locally; otherwise only the requested page is fetched from Egnyte.
+    """
+    offset = _decode_list_cursor(cursor)
+    limit = max(1, min(int(limit or EGNYTE_LIST_PAGE_SIZE), EGNYTE_LIST_PAGE_SIZE))
+    
+    cache_key = FolderListingCache.id_key(folder_id) if folder_id else FolderListingCache.path_key(folder_path)
+    cached = egnyte_listing_cache.get(cache_key)
+    if cached is not None:
+        folders = cached.get("folders", [])
+        files = cached.get("files", [])
+        end = offset + limit
+        page = dict(cached)
+        page["folders"] = folders[offset:end]
+        page["files"] = files[max(0, offset - len(folders)):max(0, end - len(folders))]
+        total = len(folders) + len(files)
+        return page, (_encode_list_cursor(end) if end < total else None)
     
+    pages = iter_egnyte_folder_pages(access_token, folder_id, folder_path, offset=offset, page_size=limit)
     try:
-        # Update status to running
-        job_status[job_key] = {
-            "status": "running",
-            "message": "Creating Egnyte folder structure...",
-            "started_at": datetime.now().isoformat(),
-            "progress": 0
-        }
-        
-        # Get access token
+        page = next(pages)
+    finally:
+        pages.close()
+    next_cursor = _encode_list_cursor(page["next_offset"]) if page.get("has_more") else None
+    for key in ("offset", "has_more", "next_offset"):
+        page.pop(key, None)
+    return page, next_cursor
+
+# Persistent index of campaign folder ids so target lookups skip the ROOT -> project -> campaign walk
+EGNYTE_FOLDER_INDEX_DB = os.getenv('EGNYTE_FOLDER_INDEX_DB', 'egnyte_folder_index.db')
+# Node names (PROJECT_NODE, CAMPAIGN_NODE, REG_DOC_NODE) come from folder_spec
+
+_folder_index_lock = threading.Lock()
+_folder_index_stats = {'hits': 0, 'misses': 0, 'writes': 0}
+
+def _folder_index_connect():
+    """Open the folder index database, creating the table on first use"""
+    conn = sqlite3.connect(EGNYTE_FOLDER_INDEX_DB, timeout=30)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS folder_index (
+            molecule_code TEXT NOT NULL,
+            campaign_number TEXT NOT NULL,
+            node TEXT NOT NULL,
+            folder_id TEXT NOT NULL,
+            path TEXT,
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY (molecule_code, campaign_number, node)
+        )
+    """)
+    return conn
+
+def index_egnyte_folder(molecule_code, campaign_number, node, folder):
+    """Record the Egnyte folder for a logical campaign node (no-op for missing folders)"""
+    if not folder or not isinstance(folder, dict) or not folder.get('folder_id'):
+        return
+    try:
+        with _folder_index_lock:
+            conn = _folder_index_connect()
+            try:
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO folder_index VALUES (?, ?, ?, ?, ?, ?)",
+                        (str(molecule_code), str(campaign_number or ''), node,
+                         folder['folder_id'], folder.get('path'), datetime.now().isoformat())
+                    )
+            finally:
+                conn.close()
+            _folder_index_stats['writes'] += 1
+    except Exception as e:
+        logger.warning(f"Could not update folder index for {molecule_code}/{campaign_number}/{node}: {e}")
+
+def lookup_indexed_folder(molecule_code, campaign_number, node):
+    """Return the indexed folder id for a logical campaign node, or None"""
+    try:
+        with _folder_index_lock:
+            conn = _folder_index_connect()
+            try:
+                row = conn.execute(
+                    "SELECT folder_id FROM folder_index WHERE molecule_code = ? AND campaign_number = ? AND node = ?",
+                    (str(molecule_code), str(campaign_number or ''), node)
+                ).fetchone()
+            finally:
+                conn.close()
+            _folder_index_stats['hits' if row else 'misses'] += 1
+        return row[0] if row else None
+    except Exception as e:
+        logger.warning(f"Could not read folder index for {molecule_code}/{campaign_number}/{node}: {e}")
+        return None
+
+def remove_indexed_folder(molecule_code, campaign_number, node):
+    """Forget an indexed node, e.g. after Egnyte reports the folder is gone"""
+    try:
+        with _folder_index_lock:
+            conn = _folder_index_connect()
+            try:
+                with conn:
+                    conn.execute(
+                        "DELETE FROM folder_index WHERE molecule_code = ? AND campaign_number = ? AND node = ?",
+                        (str(molecule_code), str(campaign_number or ''), node)
+                    )
+            finally:
+                conn.close()
+    except Exception as e:
+        logger.warning(f"Could not remove folder index entry for {molecule_code}/{campaign_number}/{node}: {e}")
+
+def folder_index_stats():
+    """Return index size and lookup counters"""
+    stats = dict(_folder_index_stats)
+    try:
+        with _folder_index_lock:
+            conn = _folder_index_connect()
+            try:
+                stats['entries'] = conn.execute("SELECT COUNT(*) FROM folder_index").fetchone()[0]
+            finally:
+                conn.close()
+    except Exception as e:
+        stats['error'] = str(e)
+    stats['database'] = EGNYTE_FOLDER_INDEX_DB
+    return stats
+
+# Folders read by every bulk request; overridable so a test tenant (or the fake server) can be used
+EGNYTE_TEMPLATES_FOLDER_ID = os.getenv('EGNYTE_TEMPLATES_FOLDER_ID', '966281ab-54c3-47ea-b20f-b38ed2ef9b30')
+EGNYTE_SOURCE_DOCS_FOLDER_ID = os.getenv('EGNYTE_SOURCE_DOCS_FOLDER_ID', '56545792-6b5d-4fc3-8e78-31d401bd7088')
+
+# Local metadata mirror of hot folders, kept current from Egnyte's events cursor instead of re-listing
+EGNYTE_MIRROR_ENABLED = os.getenv('EGNYTE_MIRROR_ENABLED', 'true').lower() == 'true'
+EGNYTE_MIRROR_DB = os.getenv('EGNYTE_MIRROR_DB', 'egnyte_mirror.db')
+EGNYTE_MIRROR_SYNC_INTERVAL = float(os.getenv('EGNYTE_MIRROR_SYNC_INTERVAL', '600'))    # Seconds between events polls (1 call each)
+EGNYTE_MIRROR_MAX_LAG = float(os.getenv('EGNYTE_MIRROR_MAX_LAG', '1800'))               # Older than this, requests list live instead
+EGNYTE_MIRROR_EVENTS_PAGE = int(os.getenv('EGNYTE_MIRROR_EVENTS_PAGE', '100'))          # Events fetched per call
+EGNYTE_MIRROR_MAX_EVENT_PAGES = int(os.getenv('EGNYTE_MIRROR_MAX_EVENT_PAGES', '10'))   # Event pages read per poll
+# Extra folders to mirror, e.g. hot campaign folders (comma-separated folder ids)
+EGNYTE_MIRROR_FOLDER_IDS = [f.strip() for f in os.getenv('EGNYTE_MIRROR_FOLDER_IDS', '').split(',') if f.strip()]
+
+class EgnyteFolderMirror:
+    """
+    SQLite mirror of a few folder listings shared by every worker process.
+    
+    One worker at a time (the holder of an flock on <db>.lock) polls /pubapi/v2/events from a
+    stored cursor and re-lists only the mirrored folders that events touched; every worker
+    reads listings straight from the database. Events carry no size or checksum, so a touched
+    folder is re-listed rather than patched.
+    """
+
+    def __init__(self, db_path, folder_ids):
+        self.db_path = db_path
+        self.folder_ids = list(dict.fromkeys(folder_ids))
+        self._lock = threading.Lock()
+        self._lock_file = None
+        self._thread = None
+        self._stats = {'hits': 0, 'misses': 0, 'polls': 0, 'events_seen': 0, 'relists': 0, 'resyncs': 0, 'errors': 0}
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS egnyte_mirror_folders (
+                folder_id TEXT PRIMARY KEY,
+                path TEXT,
+                listing TEXT,
+                listed_at REAL,
+                dirty INTEGER NOT NULL DEFAULT 1
+            )
+        """)
+        conn.execute("CREATE TABLE IF NOT EXISTS egnyte_mirror_state (key TEXT PRIMARY KEY, value TEXT)")
+        return conn
+
+    def _execute(self, sql, params=(), fetch=None):
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    cursor = conn.execute(sql, params)
+                    if fetch == 'one':
+                        return cursor.fetchone()
+                    if fetch == 'all':
+                        return cursor.fetchall()
+            finally:
+                conn.close()
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def _get_state(self, key):
+        row = self._execute("SELECT value FROM egnyte_mirror_state WHERE key = ?", (key,), fetch='one')
+        return row[0] if row else None
+
+    def _set_state(self, key, value):
+        self._execute("INSERT OR REPLACE INTO egnyte_mirror_state VALUES (?, ?)", (key, None if value is None else str(value)))
+
+    def lag_seconds(self):
+        """Seconds since the last completed events poll (None before the first one)"""
+        try:
+            synced_at = self._get_state('synced_at')
+        except Exception:
+            return None
+        return max(0.0, time.time() - float(synced_at)) if synced_at else None
+
+    def listing(self, folder_id):
+        """Mirrored listing for a folder, or None if it is not mirrored, stale, or changed since it was listed"""
+        if folder_id not in self.folder_ids:
+            return None
+        try:
+            lag = self.lag_seconds()
+            row = self._execute(
+                "SELECT listing, dirty FROM egnyte_mirror_folders WHERE folder_id = ?", (folder_id,), fetch='one')
+        except Exception as e:
+            logger.warning(f"Could not read Egnyte mirror: {e}")
+            return None
+        if row and row[0] and not row[1] and lag is not None and lag <= EGNYTE_MIRROR_MAX_LAG:
+            self._count('hits')
+            return json.loads(row[0])
+        self._count('misses')
+        return None
+
+    def find_file(self, file_id):
+        """Listing entry for a file (by entry_id or group_id) in a fresh, clean mirrored folder, or None"""
+        lag = self.lag_seconds()
+        if not EGNYTE_MIRROR_ENABLED or lag is None or lag > EGNYTE_MIRROR_MAX_LAG:
+            return None
+        try:
+            rows = self._execute(
+                "SELECT listing FROM egnyte_mirror_folders WHERE dirty = 0 AND listing IS NOT NULL", fetch='all')
+        except Exception as e:
+            logger.warning(f"Could not read Egnyte mirror: {e}")
+            return None
+        for (listing,) in rows:
+            for entry in json.loads(listing).get('files', []):
+                if file_id in (entry.get('entry_id'), entry.get('group_id')):
+                    return entry
+        return None
+
+    def store_listing(self, folder_id, folder_data):
+        """Save a fresh listing of a mirrored folder (from the sync loop or a live request fallback)"""
+        if folder_id not in self.folder_ids or not folder_data:
+            return
+        try:
+            self._execute(
+                "INSERT OR REPLACE INTO egnyte_mirror_folders VALUES (?, ?, ?, ?, 0)",
+                (folder_id, folder_data.get('path'), json.dumps(folder_data), time.time()))
+        except Exception as e:
+            logger.warning(f"Could not update Egnyte mirror for {folder_id}: {e}")
+
+    def mark_dirty(self, folder_id=None):
+        """Flag one mirrored folder (or all of them) for re-listing"""
+        if folder_id is not None and folder_id not in self.folder_ids:
+            return
+        try:
+            for fid in ([folder_id] if folder_id else self.folder_ids):
+                self._execute(
+                    "INSERT INTO egnyte_mirror_folders (folder_id, dirty) VALUES (?, 1) "
+                    "ON CONFLICT(folder_id) DO UPDATE SET dirty = 1", (fid,))
+        except Exception as e:
+            logger.warning(f"Could not mark Egnyte mirror folder dirty: {e}")
+
+    def _touched_folders(self, events):
+        """Mirrored folder ids whose direct children (or themselves) appear in a batch of events"""
+        rows = self._execute("SELECT folder_id, path FROM egnyte_mirror_folders WHERE path IS NOT NULL", fetch='all')
+        by_path = {path.rstrip('/').lower(): folder_id for folder_id, path in rows}
+        touched = set()
+        for event in events:
+            data = event.get('data') or {}
+            for key in ('target_path', 'source_path'):
+                path = (data.get(key) or '').rstrip('/').lower()
+                if not path:
+                    continue
+                for candidate in (path.rsplit('/', 1)[0], path):
+                    if candidate in by_path:
+                        touched.add(by_path[candidate])
+        return touched
+
+    def _poll_events(self, access_token, cursor):
+        """Read events after cursor; returns (new cursor, events) or raises on a dead cursor"""
+        events = []
+        for _ in range(EGNYTE_MIRROR_MAX_EVENT_PAGES):
+            response = egnyte_api.get("/pubapi/v2/events", access_token,
+                                      params={"id": cursor, "count": EGNYTE_MIRROR_EVENTS_PAGE})
+            if response.status_code == 204:
+                break
+            response.raise_for_status()
+            page = response.json()
+            batch = [e for e in page.get('events', []) if int(e.get('id', 0)) > int(cursor)]
+            events.extend(batch)
+            cursor = max([int(page.get('latest_id') or cursor)] + [int(e['id']) for e in batch])
+            if len(page.get('events', [])) < EGNYTE_MIRROR_EVENTS_PAGE:
+                break
+        return cursor, events
+
+    def sync_once(self):
+        """Advance the events cursor and re-list touched or dirty folders; returns True on success"""
         access_token = get_egnyte_token()
         if not access_token:
-            job_status[job_key] = {
-                "status": "failed",
-                "message": "Failed to get Egnyte access token",
-                "started_at": job_status[job_key]["started_at"],
-                "completed_at": datetime.now().isoformat()
-            }
-            return
-        
-        # Update progress
-        job_status[job_key]["progress"] = 20
-        job_status[job_key]["message"] = "Creating project folder..."
-        
-        # Check if project folder already exists
-        project_folder_name = f"Project; Molecule {molecule_code}"
-        
-        # First, try to list existing folders to check for duplicates
-        existing_folders_data = list_egnyte_folder_contents(access_token, ROOT_FOLDER)
-        if existing_folders_data and isinstance(existing_folders_data, dict):
-            existing_folders = existing_folders_data.get("folders", [])
-            for folder in existing_folders:
-                if folder.get('name') == project_folder_name:
-                    # Check if campaign folder already exists
-                    campaign_folder_name = f"Project {molecule_code} (Campaign #{campaign_number})"
-                    campaign_contents_data = list_egnyte_folder_contents(access_token, folder.get('folder_id'))
-                    if campaign_contents_data and isinstance(campaign_contents_data, dict):
-                        campaign_folders = campaign_contents_data.get("folders", [])
-                        for campaign_folder in campaign_folders:
-                            if campaign_folder.get('name') == campaign_folder_name:
-                                job_status[job_key] = {
-                                    "status": "failed",
-                                    "message": f"Project {molecule_code} Campaign {campaign_number} already exists",
-                                    "started_at": job_status[job_key]["started_at"],
-                                    "completed_at": datetime.now().isoformat()
-                                }
-                                return
-        
-        # Create project folder
-        project_folder = create_egnyte_folder(access_token, ROOT_FOLDER, project_folder_name)
-        
-        if not project_folder or not isinstance(project_folder, dict):
-            job_status[job_key] = {
-                "status": "failed",
-                "message": "Failed to create project folder",
-                "started_at": job_status[job_key]["started_at"],
-                "completed_at": datetime.now().isoformat()
-            }
+            return False
+        started = time.time()
+        try:
+            cursor = self._get_state('cursor')
+            if cursor is None:
+                # Take the cursor before listing so nothing that happens during the bootstrap is missed
+                response = egnyte_api.get("/pubapi/v2/events/cursor", access_token)
+                response.raise_for_status()
+                cursor = int(response.json().get('latest_event_id') or 0)
+                self.mark_dirty()
+                self._count('resyncs')
+                logger.info(f"🪞 Egnyte mirror bootstrapping at event {cursor}")
+            else:
+                try:
+                    cursor, events = self._poll_events(access_token, int(cursor))
+                except requests.HTTPError as e:
+                    if e.response is None or e.response.status_code not in (400, 404, 410):
+                        raise
+                    # Egnyte only keeps a window of events; an expired cursor means a full resync
+                    logger.warning(f"🪞 Egnyte events cursor rejected ({e}), resyncing mirror")
+                    self._set_state('cursor', None)
+                    return False
+                self._count('events_seen', len(events))
+                for folder_id in self._touched_folders(events):
+                    self.mark_dirty(folder_id)
+            
+            self._count('polls')
+            rows = self._execute("SELECT folder_id FROM egnyte_mirror_folders WHERE dirty = 1", fetch='all')
+            for (folder_id,) in rows:
+                folder_data = _collect_egnyte_folder_listing(access_token, folder_id=folder_id)
+                if folder_data is None:
+                    raise RuntimeError(f"Could not list mirrored folder {folder_id}")
+                self.store_listing(folder_id, folder_data)
+                egnyte_listing_cache.invalidate(folder_id=folder_id)
+                self._count('relists')
+            
+            self._set_state('cursor', cursor)
+            self._set_state('synced_at', started)
+            return True
+        except Exception as e:
+            self._count('errors')
+            logger.warning(f"🪞 Egnyte mirror sync failed: {e}")
+            return False
+
+    def _acquire_leadership(self):
+        """Hold the sync lock for this process's lifetime; only the holder polls Egnyte"""
+        if self._lock_file is not None:
+            return True
+        if fcntl is None:
+            return True
+        lock_file = open(f"{self.db_path}.lock", 'a+')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def _sync_loop(self):
+        while True:
+            try:
+                admitted, _ = egnyte_quota_ledger.admit(1)
+                if self._acquire_leadership() and admitted:
+                    self.sync_once()
+            except Exception as e:
+                logger.warning(f"🪞 Egnyte mirror loop error: {e}")
+            time.sleep(EGNYTE_MIRROR_SYNC_INTERVAL)
+
+    def start(self):
+        """Start the background sync thread once per process"""
+        if not (EGNYTE_MIRROR_ENABLED and EGNYTE_AVAILABLE and self.folder_ids):
             return
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._sync_loop, name="egnyte-mirror-sync", daemon=True)
+            self._thread.start()
+
+    def stats(self):
+        """Return mirror freshness, cursor and counters"""
+        with self._lock:
+            stats = dict(self._stats)
+        try:
+            lag = self.lag_seconds()
+            rows = self._execute(
+                "SELECT folder_id, path, listed_at, dirty FROM egnyte_mirror_folders", fetch='all')
+            stats.update({
+                "cursor": self._get_state('cursor'),
+                "lag_seconds": round(lag, 1) if lag is not None else None,
+                "fresh": lag is not None and lag <= EGNYTE_MIRROR_MAX_LAG,
+                "folders": [
+                    {"folder_id": fid, "path": path, "dirty": bool(dirty),
+                     "listed_seconds_ago": round(time.time() - listed_at, 1) if listed_at else None}
+                    for fid, path, listed_at, dirty in rows if fid in self.folder_ids
+                ]
+            })
+        except Exception as e:
+            stats['error'] = str(e)
+        stats.update({
+            "enabled": EGNYTE_MIRROR_ENABLED,
+            "sync_leader": self._lock_file is not None,
+            "sync_running": bool(self._thread and self._thread.is_alive()),
+            "sync_interval_seconds": EGNYTE_MIRROR_SYNC_INTERVAL,
+            "max_lag_seconds": EGNYTE_MIRROR_MAX_LAG
+        })
+        return stats
+
+egnyte_folder_mirror = EgnyteFolderMirror(
+    EGNYTE_MIRROR_DB, [EGNYTE_TEMPLATES_FOLDER_ID, EGNYTE_SOURCE_DOCS_FOLDER_ID] + EGNYTE_MIRROR_FOLDER_IDS)
+
+def list_mirrored_egnyte_folder(access_token, folder_id):
+    """
+    List a folder from the local mirror, falling back to a live listing.
+    
+    Returns (folder_data, source) where source is 'mirror' or 'live'. A live listing of a
+    mirrored folder refreshes the mirror so the next request is served locally.
+    """
+    if EGNYTE_MIRROR_ENABLED:
+        egnyte_folder_mirror.start()
+        folder_data = egnyte_folder_mirror.listing(folder_id)
+        if folder_data is not None:
+            return folder_data, 'mirror'
+    # Mirrored folders skip the listing cache so an older cached copy never lands in the mirror
+    mirrored = EGNYTE_MIRROR_ENABLED and folder_id in egnyte_folder_mirror.folder_ids
+    folder_data = list_egnyte_folder_contents(access_token, folder_id, use_cache=not mirrored)
+    if mirrored and folder_data:
+        egnyte_folder_mirror.store_listing(folder_id, folder_data)
+    return folder_data, 'live'
+
+# Folders created in parallel per tree level (calls are still paced by the rate limiter)
+EGNYTE_FOLDER_CREATE_CONCURRENCY = int(os.getenv('EGNYTE_FOLDER_CREATE_CONCURRENCY', '4'))
+
+def _egnyte_subfolders(access_token, folder_id):
+    """Map sub-folder name -> folder for one Egnyte folder, or None if it cannot be listed"""
+    folder_data = list_egnyte_folder_contents(access_token, folder_id)
+    if not folder_data or not isinstance(folder_data, dict):
+        return None
+    return {folder.get('name'): folder for folder in folder_data.get("folders", [])}
+
+def background_create_egnyte_folders(molecule_code: str, campaign_number: str):
+    """Background function to create Egnyte folder structure"""
+    job_key = f"egnyte_{molecule_code}_{campaign_number}"
+    
+    logger.info(f"BACKGROUND: Starting Egnyte folder creation for {job_key}")
+    
+    try:
+        # Update status to running
+        job_status[job_key] = {
+            "status": "running",
+            "message": "Creating Egnyte folder structure...",
+            "started_at": datetime.now().isoformat(),
+            "progress": 0
+        }
         
-        project_folder_id = project_folder.get('folder_id')
-        
-        # Update progress
-        job_status[job_key]["progress"] = 40
-        job_status[job_key]["message"] = "Creating campaign folder..."
-        
-        # Create campaign folder
-        campaign_folder_name = f"Project {molecule_code} (Campaign #{campaign_number})"
-        campaign_folder = create_egnyte_folder(access_token, project_folder_id, campaign_folder_name)
-        
-        if not campaign_folder or not isinstance(campaign_folder, dict):
+        # Get access token
+        access_token = get_egnyte_token()
+        if not access_token:
             job_status[job_key] = {
                 "status": "failed",
-                "message": "Failed to create campaign folder",
+                "message": "Failed to get Egnyte access token",
                 "started_at": job_status[job_key]["started_at"],
                 "completed_at": datetime.now().isoformat()
             }
             return
         
-        campaign_folder_id = campaign_folder.get('folder_id')
-        
         # Update progress
-        job_status[job_key]["progress"] = 60
-        job_status[job_key]["message"] = "Creating Pre and Post folders..."
+        job_status[job_key]["progress"] = 20
+        job_status[job_key]["message"] = "Checking existing folders..."
+        
+        # Diff the declarative tree against Egnyte: only folders that already exist get listed
+        spec = campaign_folder_spec(molecule_code, campaign_number)
+        plan = plan_folder_tree(
+            ROOT_FOLDER, spec,
+            lambda folder_id: _egnyte_subfolders(access_token, folder_id),
+            'folder_id', max_workers=EGNYTE_LIST_CONCURRENCY
+        )
         
-        # Create Pre and Post folders
-        pre_folder = create_egnyte_folder(access_token, campaign_folder_id, "Pre")
-        post_folder = create_egnyte_folder(access_token, campaign_folder_id, "Post")
+        project_path = project_folder_name(molecule_code)
+        campaign_path = f"{project_path}/{campaign_folder_name(molecule_code, campaign_number)}"
+        reg_doc_path = f"{project_path}/{REG_DOC_FOLDER_NAME}"
+        logger.info(f"Folder plan for {job_key}: {len(plan['existing'])} of {count_folder_spec(spec)} folders exist, "
+                    f"{len(plan['missing'])} to create ({plan['listings']} listings)")
         
-        if not pre_folder or not isinstance(pre_folder, dict) or not post_folder or not isinstance(post_folder, dict):
+        if not plan['missing']:
+            for index_key, folder in iter_indexed_folders(spec, plan['existing']):
+                index_egnyte_folder(molecule_code, index_key[0], index_key[1], folder)
             job_status[job_key] = {
                 "status": "failed",
-                "message": "Failed to create Pre/Post folders",
+                "message": f"Project {molecule_code} Campaign {campaign_number} already exists",
                 "started_at": job_status[job_key]["started_at"],
                 "completed_at": datetime.now().isoformat()
             }
             return
         
-        # Create department folders under Pre and Post
-        departments = ["mfg", "Anal", "Stability", "CTM"]
-        statuses = ["Draft", "Review", "Approved"]
-        
-        job_status[job_key]["progress"] = 65
-        job_status[job_key]["message"] = "Creating department folders..."
-        
-        for phase_name, phase_folder in [("Pre", pre_folder), ("Post", post_folder)]:
-            phase_folder_id = phase_folder.get('folder_id')
-            
-            for dept in departments:
-                dept_folder = create_egnyte_folder(access_token, phase_folder_id, dept)
-                if dept_folder and isinstance(dept_folder, dict):
-                    dept_folder_id = dept_folder.get('folder_id')
-                    
-                    # Create status folders under each department
-                    for status in statuses:
-                        create_egnyte_folder(access_token, dept_folder_id, status)
-        
         # Update progress
-        job_status[job_key]["progress"] = 80
-        job_status[job_key]["message"] = "Creating Draft AI Reg Document folder..."
-        
-        # Create Draft AI Reg Document folder under project
-        reg_doc_folder = create_egnyte_folder(access_token, project_folder_id, "Draft AI Reg Document")
-        if not reg_doc_folder or not isinstance(reg_doc_folder, dict):
-            job_status[job_key] = {
-                "status": "failed",
-                "message": "Failed to create Draft AI Reg Document folder",
-                "started_at": job_status[job_key]["started_at"],
-                "completed_at": datetime.now().isoformat()
-            }
-            return
+        job_status[job_key]["progress"] = 40
+        job_status[job_key]["message"] = f"Creating {len(plan['missing'])} folders..."
         
-        reg_doc_folder_id = reg_doc_folder.get('folder_id')
+        def on_level_done(created, total):
+            job_status[job_key]["progress"] = 40 + int(50 * created / total)
+            job_status[job_key]["message"] = f"Created {created}/{total} folders..."
         
-        # Update progress
-        job_status[job_key]["progress"] = 85
-        job_status[job_key]["message"] = "Creating regulatory document folders..."
-        
-        # Create regulatory document folders under Draft AI Reg Document
-        reg_types = ["IND", "IMPD", "Canada"]
-        for reg_type in reg_types:
-            reg_type_folder = create_egnyte_folder(access_token, reg_doc_folder_id, reg_type)
-            if reg_type_folder and isinstance(reg_type_folder, dict):
-                reg_type_folder_id = reg_type_folder.get('folder_id')
-                
-                for status in statuses:
-                    create_egnyte_folder(access_token, reg_type_folder_id, status)
+        # Create what is missing breadth-first, each level in parallel
+        result = apply_folder_plan(
+            ROOT_FOLDER, plan,
+            lambda parent_id, name: create_egnyte_folder(access_token, parent_id, name),
+            'folder_id', max_workers=EGNYTE_FOLDER_CREATE_CONCURRENCY, on_level_done=on_level_done
+        )
+        folders = result['folders']
+        
+        for index_key, folder in iter_indexed_folders(spec, folders):
+            index_egnyte_folder(molecule_code, index_key[0], index_key[1], folder)
+        
+        project_folder = folders.get(project_path)
+        campaign_folder = folders.get(campaign_path)
+        reg_doc_folder = folders.get(reg_doc_path)
+        
+        if result['failed']:
+            logger.warning(f"Could not create {len(result['failed'])} folders for {job_key}: {result['failed']}")
+        
+        for required_folder, label in [(project_folder, "project"), (campaign_folder, "campaign"),
+                                       (reg_doc_folder, "Draft AI Reg Document")]:
+            if not required_folder or not isinstance(required_folder, dict):
+                job_status[job_key] = {
+                    "status": "failed",
+                    "message": f"Failed to create {label} folder",
+                    "started_at": job_status[job_key]["started_at"],
+                    "completed_at": datetime.now().isoformat()
+                }
+                return
         
         # Store the result with URLs
         job_results[job_key] = {
@@ -664,13 +1625,17 @@ def background_create_egnyte_folders(molecule_code: str, campaign_number: str):
                 "project_url": f"https://{DOMAIN}/app/index.do#storage/files/1{project_folder.get('path', '')}",
                 "campaign_url": f"https://{DOMAIN}/app/index.do#storage/files/1{campaign_folder.get('path', '')}",
                 "reg_doc_url": f"https://{DOMAIN}/app/index.do#storage/files/1{reg_doc_folder.get('path', '')}"
-            }
+            },
+            "folders_existing": len(plan['existing']),
+            "folders_created": len(result['created']),
+            "folders_failed": result['failed']
         }
         
         # Update status to completed
         job_status[job_key] = {
             "status": "completed",
-            "message": "Egnyte folder structure created successfully",
+            "message": "Egnyte folder structure created successfully" if not plan['existing'] else
+                       f"Egnyte folder structure completed ({len(result['created'])} missing folders created)",
             "started_at": job_status[job_key]["started_at"],
             "completed_at": datetime.now().isoformat(),
             "progress": 100
@@ -695,6 +1660,139 @@ def load_azure_openai_api_key():
     """Load Azure AI API key from credentials or environment variable"""
     return AZURE_AI_API_KEY
 
+# Retries for OpenAI and Azure OpenAI calls; the SDKs' own retries are disabled so this policy is the only one
+OPENAI_RETRY_ATTEMPTS = int(os.getenv('OPENAI_RETRY_ATTEMPTS', '4'))
+OPENAI_RETRY_DEADLINE = float(os.getenv('OPENAI_RETRY_DEADLINE', '300'))
+
+def _openai_is_retryable(outcome, status, headers):
+    """A 429 for an exhausted billing quota will not clear by waiting"""
+    if getattr(outcome, 'code', None) == 'insufficient_quota':
+        return False
+    return None
+
+def open_backend_breaker(*breakers):
+    """Return the first of the given breakers that is open (failing fast), or None"""
+    for breaker in breakers:
+        if breaker.is_open():
+            return breaker
+    return None
+
+def generation_breakers():
+    """Breakers a document generation depends on: Egnyte plus the configured LLM backend"""
+    llm_breaker = azure_openai_breaker if MODEL_TYPE == 'azure' else openai_breaker
+    return (egnyte_auth_breaker, egnyte_fs_breaker, llm_breaker)
+
+def _openai_quota_exhausted(outcome, status, headers):
+    return getattr(outcome, 'code', None) == 'insufficient_quota'
+
+openai_retry_policy = RetryPolicy(
+    "openai", max_attempts=OPENAI_RETRY_ATTEMPTS, base_delay=1.0, max_delay=30.0,
+    deadline=OPENAI_RETRY_DEADLINE, retry_exceptions=(APIConnectionError, APITimeoutError),
+    is_retryable=_openai_is_retryable, breaker=openai_breaker, trips_breaker=_openai_quota_exhausted
+)
+azure_openai_retry_policy = RetryPolicy(
+    "azure_openai", max_attempts=OPENAI_RETRY_ATTEMPTS, base_delay=1.0, max_delay=30.0,
+    deadline=OPENAI_RETRY_DEADLINE, retry_exceptions=(APIConnectionError, APITimeoutError),
+    is_retryable=_openai_is_retryable, breaker=azure_openai_breaker, trips_breaker=_openai_quota_exhausted
+)
+
+# Concurrency and rate budgets for model calls, one dispatcher per provider and model/deployment (see llm_dispatcher.py)
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '4'))               # Upper bound for the AIMD concurrency limit
+LLM_QUEUE_TIMEOUT = float(os.getenv('LLM_QUEUE_TIMEOUT', '600'))               # Give up on a call that waited this long for capacity
+LLM_THROTTLE_COOLDOWN = float(os.getenv('LLM_THROTTLE_COOLDOWN', '5'))         # At most one concurrency cut per burst of 429s
+OPENAI_RPM = int(os.getenv('OPENAI_RPM', '500'))                               # Requests per minute per model (0 = no budget)
+OPENAI_TPM = int(os.getenv('OPENAI_TPM', '30000'))                             # Tokens per minute per model (0 = no budget)
+AZURE_OPENAI_RPM = int(os.getenv('AZURE_OPENAI_RPM', '300'))                   # Requests per minute per deployment
+AZURE_OPENAI_TPM = int(os.getenv('AZURE_OPENAI_TPM', '50000'))                 # Tokens per minute per deployment
+LLM_BUDGETS = json.loads(os.getenv('LLM_BUDGETS', '{}'))                       # Overrides, e.g. {"azure_openai:gpt-4.1": {"rpm": 60, "tpm": 80000}}
+LLM_FILE_TOKEN_ESTIMATE = int(os.getenv('LLM_FILE_TOKEN_ESTIMATE', '8000'))     # Assumed input tokens per attached file
+LLM_OUTPUT_TOKEN_ESTIMATE = int(os.getenv('LLM_OUTPUT_TOKEN_ESTIMATE', '4000'))  # Assumed output tokens when the call sets no maximum
+
+llm_dispatchers = {}
+llm_dispatchers_lock = threading.Lock()
+
+def llm_dispatcher_for(provider, model):
+    """The shared dispatcher for one provider and model/deployment, created on first use"""
+    key = f"{provider}:{model}"
+    with llm_dispatchers_lock:
+        dispatcher = llm_dispatchers.get(key)
+        if dispatcher is None:
+            rpm, tpm = (AZURE_OPENAI_RPM, AZURE_OPENAI_TPM) if provider == 'azure_openai' else (OPENAI_RPM, OPENAI_TPM)
+            budget = LLM_BUDGETS.get(key, {})
+            dispatcher = LLMDispatcher(
+                key, max_concurrency=budget.get('concurrency', LLM_MAX_CONCURRENCY),
+                rpm=budget.get('rpm', rpm), tpm=budget.get('tpm', tpm),
+                cooldown=LLM_THROTTLE_COOLDOWN, queue_timeout=LLM_QUEUE_TIMEOUT
+            )
+            llm_dispatchers[key] = dispatcher
+        return dispatcher
+
+def estimate_llm_tokens(kwargs):
+    """Rough token cost of a model call: ~4 characters per input token, a fixed amount per attached
+    file, plus the output allowance"""
+    characters = 0
+    files = 0
+    pending = [kwargs.get('messages'), kwargs.get('input'), kwargs.get('instructions')]
+    while pending:
+        value = pending.pop()
+        if isinstance(value, str):
+            characters += len(value)
+        elif isinstance(value, dict):
+            if value.get('type') == 'input_file':
+                files += 1
+            pending.extend(v for k, v in value.items() if k in ('content', 'text'))
+        elif isinstance(value, (list, tuple)):
+            pending.extend(value)
+    output = kwargs.get('max_output_tokens') or kwargs.get('max_tokens') or LLM_OUTPUT_TOKEN_ESTIMATE
+    return characters // 4 + files * LLM_FILE_TOKEN_ESTIMATE + output
+
+def _llm_tokens_used(response):
+    usage = getattr(response, 'usage', None)
+    return getattr(usage, 'total_tokens', None)
+
+def _llm_failure_info(error):
+    """(throttled, Retry-After seconds, tokens used) for a failed model call. An error response
+    (any HTTP status) or a connection that was never made means the provider generated nothing,
+    so the token estimate is refunded; after a timeout it may have, so the estimate stays charged"""
+    status, headers = status_and_headers(error)
+    if status is None:
+        never_sent = isinstance(error, APIConnectionError) and not isinstance(error, APITimeoutError)
+        return False, None, 0 if never_sent else None
+    if status != 429:
+        return False, None, 0
+    retry_after = parse_retry_after(headers.get('Retry-After') or headers.get('retry-after')) if headers else None
+    return True, retry_after, 0
+
+def openai_call(client, func, *args, **kwargs):
+    """Run an OpenAI/Azure OpenAI SDK call under the matching retry policy. Model calls (those naming
+    a model) also wait for a slot and RPM/TPM budget on their dispatcher, once per attempt, so every
+    429 reaches the dispatcher's AIMD limit"""
+    is_azure = isinstance(client, AzureOpenAI)
+    policy = azure_openai_retry_policy if is_azure else openai_retry_policy
+    body_positions = _request_body_positions(kwargs)
+
+    def before_retry(outcome):
+        for body, position in body_positions:
+            body.seek(position)
+
+    model = kwargs.get('model')
+    if not model:
+        return policy.run(lambda: func(*args, **kwargs), before_retry)
+
+    dispatcher = llm_dispatcher_for('azure_openai' if is_azure else 'openai', model)
+    estimated_tokens = estimate_llm_tokens(kwargs)
+    debug_event(logger, "llm_call_dispatched", dispatcher=dispatcher.name, estimated_tokens=estimated_tokens)
+    return policy.run(
+        lambda: dispatcher.run(lambda: func(*args, **kwargs), estimated_tokens,
+                               tokens_used=_llm_tokens_used, failure_info=_llm_failure_info),
+        before_retry
+    )
+
+def llm_dispatcher_stats():
+    with llm_dispatchers_lock:
+        dispatchers = list(llm_dispatchers.values())
+    return {dispatcher.name: dispatcher.stats() for dispatcher in dispatchers}
+
 def initialize_openai():
     """Initialize OpenAI client"""
     if not OPENAI_AVAILABLE:
@@ -704,7 +1802,7 @@ def initialize_openai():
     api_key = load_openai_api_key()
     if api_key and api_key != "your-openai-api-key-here":
         try:
-            client = OpenAI(api_key=api_key)
+            client = OpenAI(api_key=api_key, max_retries=0)
             return client
         except Exception as e:
             logger.error(f"Error initializing OpenAI client: {e}")
@@ -727,7 +1825,8 @@ def initialize_azure_openai():
             client = AzureOpenAI(
                 api_version = api_version,
                 azure_endpoint = azure_endpoint,
-                api_key=api_key
+                api_key=api_key,
+                max_retries=0
             )
             return client
         except Exception as e:
@@ -1084,12 +2183,19 @@ def egnyte_list_folder():
         
     try:
         folder_id = request.args.get('folder_id', ROOT_FOLDER)
+        cursor = request.args.get('cursor')
+        limit = request.args.get('limit', type=int)
         
         access_token = get_egnyte_token()
         if not access_token:
             return jsonify({"error": "Failed to get Egnyte access token"}), 500
         
-        folder_data = list_egnyte_folder_contents(access_token, folder_id)
+        # Cursor-based pagination when the caller asks for a page, full listing otherwise
+        next_cursor = None
+        if cursor or limit:
+            folder_data, next_cursor = get_egnyte_folder_page(access_token, folder_id=folder_id, cursor=cursor, limit=limit)
+        else:
+            folder_data = list_egnyte_folder_contents(access_token, folder_id)
         if not folder_data:
             return jsonify({"error": "Failed to list folder contents"}), 500
         
@@ -1099,8 +2205,12 @@ def egnyte_list_folder():
             "folders": folder_data.get("folders", []),
             "files": folder_data.get("files", []),
             "total_folders": len(folder_data.get("folders", [])),
-            "total_files": len(folder_data.get("files", []))
+            "total_files": len(folder_data.get("files", [])),
+            "next_cursor": next_cursor
         })
+    
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -1152,13 +2262,19 @@ def egnyte_list_templates():
         return jsonify({"error": "Egnyte integration not available. Please configure Egnyte credentials."}), 503
         
     try:
-        templates_folder_id = "966281ab-54c3-47ea-b20f-b38ed2ef9b30"
+        templates_folder_id = EGNYTE_TEMPLATES_FOLDER_ID
+        cursor = request.args.get('cursor')
+        limit = request.args.get('limit', type=int)
         
         access_token = get_egnyte_token()
         if not access_token:
             return jsonify({"error": "Failed to get Egnyte access token"}), 500
         
-        folder_data = list_egnyte_folder_contents(access_token, templates_folder_id)
+        next_cursor = None
+        if cursor or limit:
+            folder_data, next_cursor = get_egnyte_folder_page(access_token, folder_id=templates_folder_id, cursor=cursor, limit=limit)
+        else:
+            folder_data, _ = list_mirrored_egnyte_folder(access_token, templates_folder_id)
         if not folder_data:
             return jsonify({"error": "Failed to list templates folder contents"}), 500
         
@@ -1168,8 +2284,12 @@ def egnyte_list_templates():
             "templates": folder_data.get("files", []),
             "folders": folder_data.get("folders", []),
             "total_templates": len(folder_data.get("files", [])),
-            "total_folders": len(folder_data.get("folders", []))
+            "total_folders": len(folder_data.get("folders", [])),
+            "next_cursor": next_cursor
         })
+    
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -1181,13 +2301,19 @@ def egnyte_list_source_documents():
         return jsonify({"error": "Egnyte integration not available. Please configure Egnyte credentials."}), 503
         
     try:
-        source_docs_folder_id = "56545792-6b5d-4fc3-8e78-31d401bd7088"
+        source_docs_folder_id = EGNYTE_SOURCE_DOCS_FOLDER_ID
+        cursor = request.args.get('cursor')
+        limit = request.args.get('limit', type=int)
         
         access_token = get_egnyte_token()
         if not access_token:
             return jsonify({"error": "Failed to get Egnyte access token"}), 500
         
-        folder_data = list_egnyte_folder_contents(access_token, source_docs_folder_id)
+        next_cursor = None
+        if cursor or limit:
+            folder_data, next_cursor = get_egnyte_folder_page(access_token, folder_id=source_docs_folder_id, cursor=cursor, limit=limit)
+        else:
+            folder_data, _ = list_mirrored_egnyte_folder(access_token, source_docs_folder_id)
         if not folder_data:
             return jsonify({"error": "Failed to list source documents folder contents"}), 500
         
@@ -1197,8 +2323,12 @@ def egnyte_list_source_documents():
             "documents": folder_data.get("files", []),
             "folders": folder_data.get("folders", []),
             "total_documents": len(folder_data.get("files", [])),
-            "total_folders": len(folder_data.get("folders", []))
+            "total_folders": len(folder_data.get("folders", [])),
+            "next_cursor": next_cursor
         })
+    
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -1213,12 +2343,18 @@ def egnyte_list_docs():
     try:
         data = request.get_json()
         folder_path = data.get('folder_path')
+        cursor = data.get('cursor')
+        limit = data.get('limit')
 
         access_token = get_egnyte_token()
         if not access_token:
             return jsonify({"error": "Failed to get Egnyte access token"}), 500
         
-        folder_data = list_egnyte_folder_contents_path(access_token, folder_path)
+        next_cursor = None
+        if cursor or limit:
+            folder_data, next_cursor = get_egnyte_folder_page(access_token, folder_path=folder_path, cursor=cursor, limit=limit)
+        else:
+            folder_data = list_egnyte_folder_contents_path(access_token, folder_path)
         if not folder_data:
             return jsonify({"error": "Failed to list source documents folder contents"}), 500
         
@@ -1235,9 +2371,12 @@ def egnyte_list_docs():
             "documents": folder_data.get("files", []),
             "folders": folder_data.get("folders", []),
             "total_documents": len(folder_data.get("files", [])),
-            "total_folders": len(folder_data.get("folders", []))
+            "total_folders": len(folder_data.get("folders", [])),
+            "next_cursor": next_cursor
         })
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -1255,16 +2394,36 @@ def egnyte_list_docs_multi_folder():
         if not access_token:
             return jsonify({"error": "Failed to get Egnyte access token"}), 500
         
+        # Identical paths in one request are only listed once
+        unique_paths = list(dict.fromkeys(folder_paths))
+        
+        def list_one_path(folder_path):
+            logger.info(f"Started request for {folder_path}")
+            try:
+                folder_data = list_egnyte_folder_contents_path(access_token, folder_path)
+            except Exception as e:
+                return folder_path, None, str(e)
+            logger.info(f"Finished request for {folder_path}")
+            if not folder_data:
+                return folder_path, None, "Failed to list folder contents"
+            return folder_path, folder_data, None
+        
+        # Paths are listed concurrently; the shared Egnyte rate limiter still paces the calls
+        results = []
+        if unique_paths:
+            max_workers = min(EGNYTE_LIST_CONCURRENCY, len(unique_paths))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(list_one_path, unique_paths))
+        
         full_file_list = []
         full_folder_id_list = []
+        errors = []
 
-        for folder_path in folder_paths:
-            logger.info(f"Started request for {folder_path}")
-            folder_data = list_egnyte_folder_contents_path(access_token, folder_path)
-            if not folder_data:
-                return jsonify({"error": "Failed to list source documents folder contents"}), 500
-            
-            logger.info(f"Finished request for {folder_path}")
+        for folder_path, folder_data, error in results:
+            if error:
+                logger.error(f"Failed to list {folder_path}: {error}")
+                errors.append({"folder_path": folder_path, "error": error})
+                continue
             
             # adds folder id to list
             full_folder_id_list.append(folder_data.get('folder_id'))
@@ -1274,16 +2433,25 @@ def egnyte_list_docs_multi_folder():
 
             for f in file_list:
                 f['file_link'] = f"https://{DOMAIN}/navigate/file/{f.get('group_id')}"
+                f['folder_path'] = folder_path
                 full_file_list.append(f)
             
             logger.info(f"Finished processing for {folder_path}")
 
+        if unique_paths and len(errors) == len(unique_paths):
+            return jsonify({
+                "error": "Failed to list source documents folder contents",
+                "errors": errors
+            }), 500
         
         return jsonify({
-            "status": "success",
+            "status": "partial_success" if errors else "success",
             "folder_ids": full_folder_id_list,
             "documents": full_file_list,
-            "total_documents": len(full_file_list)
+            "total_documents": len(full_file_list),
+            "errors": errors,
+            "total_paths": len(unique_paths),
+            "failed_paths": len(errors)
         })
 
     except Exception as e:
@@ -1312,14 +2480,8 @@ def egnyte_download_file():
             return jsonify({"error": "Failed to get Egnyte access token"}), 500
         
         # Download the file
-        url = f"https://{DOMAIN}/pubapi/v1/fs-content/ids/file/{file_id}"
-        headers = {
-            "Authorization": f"Bearer {access_token}"
-        }
-        
         try:
-            rate_limit_delay()
-            response = requests.get(url, headers=headers)
+            response = egnyte_api.get(f"/pubapi/v1/fs-content/ids/file/{file_id}", access_token)
             response.raise_for_status()
             
             # Return the file content as base64
@@ -1340,6 +2502,120 @@ def egnyte_download_file():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Upstream headers passed through by the streaming download endpoint
+EGNYTE_PROXY_HEADERS = ('Content-Length', 'Content-Range', 'Accept-Ranges', 'ETag', 'Last-Modified')
+
+def _relay_egnyte_download(upstream, file_id, cache_key=None, expected_checksum=None):
+    """Yield an upstream download chunk by chunk, teeing a complete body into the blob cache. The body
+    is only stored when its SHA-512 matches expected_checksum, so an unverified body never lands under
+    a version key"""
+    staging = None
+    hasher = hashlib.sha512()
+    completed = False
+    try:
+        if cache_key and expected_checksum:
+            staging = tempfile.NamedTemporaryFile(delete=False, suffix='.part')
+        for chunk in upstream.iter_content(chunk_size=EGNYTE_DOWNLOAD_CHUNK_SIZE):
+            if not chunk:
+                continue
+            if staging:
+                staging.write(chunk)
+                hasher.update(chunk)
+            yield chunk
+        completed = True
+    finally:
+        # Also runs when the client disconnects mid-download; a partial body is never cached
+        upstream.close()
+        if staging:
+            staging.close()
+            try:
+                if completed and expected_checksum.lower() == hasher.hexdigest():
+                    egnyte_blob_cache.store(cache_key, staging.name)
+                elif completed:
+                    logger.warning(f"Download of {file_id} does not match checksum {expected_checksum[:16]}..., not caching it")
+            except OSError as e:
+                logger.warning(f"Could not add file {file_id} to blob cache: {e}")
+            finally:
+                os.unlink(staging.name)
+
+@app.route('/egnyte-download-file/<file_id>', methods=['GET'])
+def egnyte_stream_file(file_id):
+    """
+    Stream an Egnyte file as raw bytes, with Range and ETag/If-None-Match support.
+    
+    Optional query parameters from a listing (checksum, last_modified, path, name) let the
+    response come from the blob cache, or be a 304, without calling Egnyte; files in the
+    mirrored folders are looked up in the mirror automatically, and the mirror's metadata wins
+    over the query parameters. Only a body whose checksum was verified, fetched by id or by the
+    mirror's path, is written to the blob cache.
+    """
+    if not EGNYTE_AVAILABLE:
+        return jsonify({"error": "Egnyte integration not available. Please configure Egnyte credentials."}), 503
+    
+    try:
+        metadata = egnyte_folder_mirror.find_file(file_id) or {}
+        checksum = metadata.get('checksum') or request.args.get('checksum')
+        last_modified = metadata.get('last_modified') or request.args.get('last_modified')
+        file_path = metadata.get('path') or request.args.get('path')
+        # A client-supplied path may name a different file than file_id
+        client_path = bool(file_path) and not metadata.get('path')
+        download_name = metadata.get('name') or request.args.get('name') or \
+            (file_path.rsplit('/', 1)[-1] if file_path else file_id)
+        mimetype = _upload_content_type(download_name)
+        
+        # The version-specific blob key doubles as a strong ETag
+        cache_key = EgnyteBlobCache.blob_key(metadata.get('entry_id') or file_id, checksum or last_modified)
+        if cache_key:
+            if cache_key in request.if_none_match:
+                return Response(status=304, headers={'ETag': f'"{cache_key}"'})
+            blob = egnyte_blob_cache.open(cache_key)
+            if blob:
+                logger.info(f"Serving {file_id} from blob cache")
+                response = send_file(blob, mimetype=mimetype, as_attachment=True, download_name=download_name,
+                                     conditional=False, etag=cache_key)
+                # File objects carry no size for send_file, so apply Range/If-None-Match here
+                return response.make_conditional(request, accept_ranges=True,
+                                                 complete_length=os.fstat(blob.fileno()).st_size)
+        
+        access_token = get_egnyte_token()
+        if not access_token:
+            return jsonify({"error": "Failed to get Egnyte access token"}), 500
+        
+        upstream_headers = {}
+        if request.headers.get('Range'):
+            upstream_headers['Range'] = request.headers['Range']
+        if not cache_key and request.headers.get('If-None-Match'):
+            upstream_headers['If-None-Match'] = request.headers['If-None-Match']
+        
+        upstream, method = open_egnyte_download(access_token, file_id, file_path, headers=upstream_headers)
+        if upstream.status_code not in (200, 206, 304):
+            status, details = upstream.status_code, upstream.text[:500]
+            upstream.close()
+            logger.error(f"Streaming download of {file_id} failed with status {status}")
+            return jsonify({"error": f"Failed to download file: Egnyte returned {status}", "details": details}), \
+                status if 400 <= status < 500 else 502
+        
+        headers = {name: upstream.headers[name] for name in EGNYTE_PROXY_HEADERS if name in upstream.headers}
+        if cache_key:
+            headers['ETag'] = f'"{cache_key}"'
+        headers['Content-Disposition'] = f"attachment; filename*=UTF-8''{urllib.parse.quote(download_name)}"
+        
+        # Only a complete 200 body can be cached; ranges and 304s are relayed as they are
+        tee_key = cache_key if upstream.status_code == 200 and not (client_path and method == "path-based") else None
+        return Response(
+            stream_with_context(_relay_egnyte_download(upstream, file_id, tee_key, checksum)),
+            status=upstream.status_code,
+            headers=headers,
+            mimetype=upstream.headers.get('Content-Type') or mimetype,
+            direct_passthrough=True
+        )
+    
+    except CircuitOpenError as e:
+        return jsonify({"error": str(e)}), 503
+    except Exception as e:
+        logger.error(f"Error streaming file {file_id}: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/egnyte-generate-document', methods=['POST'])
 def egnyte_generate_document():
     """Generate a new document using OpenAI and save to Egnyte"""
@@ -1570,63 +2846,88 @@ def background_generate_egnyte_document(template_file_id, source_document_ids, m
             "completed_at": datetime.now().isoformat()
         }
 
-def download_egnyte_file(access_token, file_id, file_path=None):
-    """Download a file from Egnyte and return its content"""
-    try:
-        logger.info(f"Downloading Egnyte file: {file_id}")
-        
-        # Try path-based download first if path is available
-        if file_path:
-            logger.info(f"Attempting path-based download: {file_path}")
-            url = f"https://{DOMAIN}/pubapi/v1/fs-content{file_path}"
-            headers = {
-                "Authorization": f"Bearer {access_token}"
-            }
-            
-            logger.info(f"Egnyte URL (path-based): {url}")
-            logger.info(f"Domain: {DOMAIN}")
-            logger.info(f"Access token length: {len(access_token) if access_token else 0}")
-            
-            rate_limit_delay()
-            logger.info("Making path-based request to Egnyte API...")
-            response = requests.get(url, headers=headers)
-            
-            logger.info(f"Path-based response status code: {response.status_code}")
-            
-            if response.status_code == 200:
-                content = response.content
-                logger.info(f"SUCCESS: Downloaded {len(content)} bytes from Egnyte (path-based)")
-                return content
-            else:
-                logger.warning(f"Path-based download failed with status {response.status_code}, trying ID-based download...")
-        
-        # Fall back to ID-based download
-        logger.info(f"Attempting ID-based download: {file_id}")
-        url = f"https://{DOMAIN}/pubapi/v1/fs-content/ids/file/{file_id}"
-        headers = {
-            "Authorization": f"Bearer {access_token}"
-        }
-        
-        logger.info(f"Egnyte URL (ID-based): {url}")
-        logger.info(f"Domain: {DOMAIN}")
-        logger.info(f"Access token length: {len(access_token) if access_token else 0}")
-        
-        rate_limit_delay()
-        logger.info("Making ID-based request to Egnyte API...")
-        response = requests.get(url, headers=headers)
-        
-        logger.info(f"ID-based response status code: {response.status_code}")
-        logger.info(f"Response headers: {dict(response.headers)}")
-        
+# Streaming download settings
+EGNYTE_DOWNLOAD_CHUNK_SIZE = int(os.getenv('EGNYTE_DOWNLOAD_CHUNK_SIZE', str(256 * 1024)))           # Bytes read per chunk
+EGNYTE_MAX_DOWNLOAD_BYTES = int(os.getenv('EGNYTE_MAX_DOWNLOAD_BYTES', str(200 * 1024 * 1024)))     # Refuse files larger than this
+
+def open_egnyte_download(access_token, file_id, file_path=None, headers=None):
+    """
+    Open a streaming download of an Egnyte file; the caller must close the response.
+    
+    Tries the path-based endpoint first when a path is known and falls back to the ID-based one,
+    whose response is returned whatever its status. headers (e.g. Range) are sent upstream.
+    
+    Returns:
+        (response, method) where method is 'path-based' or 'ID-based'
+    """
+    attempts = []
+    if file_path:
+        attempts.append(("path-based", f"/pubapi/v1/fs-content{file_path}"))
+    attempts.append(("ID-based", f"/pubapi/v1/fs-content/ids/file/{file_id}"))
+    
+    for method, path in attempts:
+        response = egnyte_api.get(path, access_token, stream=True, headers=headers)
+        debug_event(logger, "egnyte_download_attempt", method=method, path=path, status=response.status_code,
+                    range=(headers or {}).get('Range'))
+        if method == "path-based" and response.status_code not in (200, 206, 304):
+            logger.warning(f"Path-based download failed with status {response.status_code}, trying ID-based download...")
+            response.close()
+            continue
+        return response, method
+
+def stream_egnyte_file(access_token, file_id, sink, file_path=None, max_bytes=EGNYTE_MAX_DOWNLOAD_BYTES, expected_checksum=None):
+    """
+    Stream an Egnyte file into a writable file-like sink chunk by chunk.
+    
+    Tries the path-based endpoint first when a path is known and falls back to the ID-based one.
+    A SHA-512 checksum (the hash Egnyte reports in listings) is computed while writing.
+    Raises on HTTP errors or when the file exceeds max_bytes.
+    
+    Returns:
+        dict with size, checksum, content_type and the download method used
+    """
+    response, method = open_egnyte_download(access_token, file_id, file_path)
+    with response:
         if response.status_code != 200:
             logger.error(f"Egnyte API returned error status: {response.status_code}")
             logger.error(f"Response text: {response.text}")
             response.raise_for_status()
         
-        content = response.content
-        logger.info(f"SUCCESS: Downloaded {len(content)} bytes from Egnyte (ID-based)")
+        declared_size = int(response.headers.get('Content-Length') or 0)
+        if max_bytes and declared_size > max_bytes:
+            raise ValueError(f"File {file_id} is {declared_size} bytes, above the {max_bytes} byte download limit")
+        
+        hasher = hashlib.sha512()
+        size = 0
+        for chunk in response.iter_content(chunk_size=EGNYTE_DOWNLOAD_CHUNK_SIZE):
+            if not chunk:
+                continue
+            size += len(chunk)
+            if max_bytes and size > max_bytes:
+                raise ValueError(f"File {file_id} exceeded the {max_bytes} byte download limit")
+            hasher.update(chunk)
+            sink.write(chunk)
+        
+        checksum = hasher.hexdigest()
+        if expected_checksum and expected_checksum.lower() != checksum:
+            logger.warning(f"Checksum mismatch for {file_id}: listing says {expected_checksum[:16]}..., downloaded {checksum[:16]}...")
+        
+        logger.info(f"SUCCESS: Streamed {size} bytes from Egnyte ({method})")
+        return {
+            "size": size,
+            "checksum": checksum,
+            "content_type": response.headers.get('content-type', 'application/octet-stream'),
+            "method": method
+        }
+
+def download_egnyte_file(access_token, file_id, file_path=None):
+    """Download a file from Egnyte and return its content"""
+    try:
+        logger.info(f"Downloading Egnyte file: {file_id}")
         
-        return content
+        buffer = io.BytesIO()
+        stream_egnyte_file(access_token, file_id, buffer, file_path)
+        return buffer.getvalue()
         
     except Exception as e:
         logger.error("=" * 50)
@@ -1644,6 +2945,16 @@ def download_egnyte_file(access_token, file_id, file_path=None):
 def find_egnyte_target_folder(access_token, molecule_code, campaign_number):
     """Find the target folder in Egnyte for the generated document"""
     try:
+        # Common case: the folder index already knows the target and no API call is needed
+        indexed_campaign_id = lookup_indexed_folder(molecule_code, campaign_number, CAMPAIGN_NODE)
+        indexed_reg_doc_id = lookup_indexed_folder(molecule_code, '', REG_DOC_NODE)
+        if indexed_campaign_id and indexed_reg_doc_id:
+            logger.info(f"Target folder for {molecule_code} campaign {campaign_number} resolved from folder index")
+            return indexed_reg_doc_id
+        
+        # Index miss: walk the tree and repair the index on the way
+        logger.info(f"Folder index miss for {molecule_code} campaign {campaign_number}, walking Egnyte tree")
+        
         # First, find the project folder
         project_folder_name = f"Project; Molecule {molecule_code}"
         project_folder = find_folder_by_name(access_token, ROOT_FOLDER, project_folder_name)
@@ -1651,6 +2962,7 @@ def find_egnyte_target_folder(access_token, molecule_code, campaign_number):
         if not project_folder:
             logger.error(f"Project folder not found: {project_folder_name}")
             return None
+        index_egnyte_folder(molecule_code, '', PROJECT_NODE, project_folder)
         
         # Find the campaign folder
         campaign_folder_name = f"Project {molecule_code} (Campaign #{campaign_number})"
@@ -1659,6 +2971,7 @@ def find_egnyte_target_folder(access_token, molecule_code, campaign_number):
         if not campaign_folder:
             logger.error(f"Campaign folder not found: {campaign_folder_name}")
             return None
+        index_egnyte_folder(molecule_code, campaign_number, CAMPAIGN_NODE, campaign_folder)
         
         # Find the Draft AI Reg Document folder
         reg_doc_folder = find_folder_by_name(access_token, project_folder.get('folder_id'), "Draft AI Reg Document")
@@ -1666,6 +2979,7 @@ def find_egnyte_target_folder(access_token, molecule_code, campaign_number):
         if not reg_doc_folder:
             logger.error("Draft AI Reg Document folder not found")
             return None
+        index_egnyte_folder(molecule_code, '', REG_DOC_NODE, reg_doc_folder)
         
         return reg_doc_folder.get('folder_id')
         
@@ -1676,53 +2990,173 @@ def find_egnyte_target_folder(access_token, molecule_code, campaign_number):
 def find_folder_by_name(access_token, parent_folder_id, folder_name):
     """Find a folder by name in a parent folder"""
     try:
-        folder_data = list_egnyte_folder_contents(access_token, parent_folder_id)
-        if folder_data and isinstance(folder_data, dict):
-            folders = folder_data.get("folders", [])
-            for folder in folders:
-                if folder.get('name') == folder_name:
-                    return folder
-        return None
+        return find_egnyte_subfolder(access_token, parent_folder_id, folder_name)
     except Exception as e:
         logger.error(f"Error finding folder by name: {e}")
         return None
 
-def upload_file_to_egnyte(access_token, folder_id, file_name, file_content):
-    """Upload a file to Egnyte"""
-    try:
-        url = f"https://{DOMAIN}/pubapi/v1/fs-content/ids/folder/{folder_id}"
-        
-        # Determine content type based on file extension
-        if file_name.lower().endswith('.docx'):
-            content_type = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-        elif file_name.lower().endswith('.pdf'):
-            content_type = "application/pdf"
-        else:
-            content_type = "application/octet-stream"
+# Upload settings: files above the threshold use Egnyte's chunked upload API so memory use
+# is bounded by the chunk size rather than the file size
+EGNYTE_CHUNKED_UPLOAD_THRESHOLD = int(os.getenv('EGNYTE_CHUNKED_UPLOAD_THRESHOLD', str(20 * 1024 * 1024)))
+EGNYTE_UPLOAD_CHUNK_SIZE = int(os.getenv('EGNYTE_UPLOAD_CHUNK_SIZE', str(10 * 1024 * 1024)))
+
+# Unfinished chunked uploads keyed by (folder_id, file_name, size, sha256) so a retried upload of the
+# same content resumes; a different file with the same name and size starts its own session
+_pending_chunked_uploads = {}
+_pending_chunked_uploads_lock = threading.Lock()
+
+def _upload_content_type(file_name):
+    """Determine content type based on file extension"""
+    if file_name.lower().endswith('.docx'):
+        return "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+    elif file_name.lower().endswith('.pdf'):
+        return "application/pdf"
+    return "application/octet-stream"
+
+def _remaining_size(file_obj):
+    """Bytes between the current position of a seekable file object and its end"""
+    position = file_obj.tell()
+    file_obj.seek(0, os.SEEK_END)
+    size = file_obj.tell() - position
+    file_obj.seek(position)
+    return size
+
+def _content_sha256(file_obj, start_position, size):
+    """SHA-256 of size bytes from start_position, read in upload-chunk-sized blocks"""
+    digest = hashlib.sha256()
+    file_obj.seek(start_position)
+    remaining = size
+    while remaining > 0:
+        block = file_obj.read(min(EGNYTE_UPLOAD_CHUNK_SIZE, remaining))
+        if not block:
+            break
+        digest.update(block)
+        remaining -= len(block)
+    file_obj.seek(start_position)
+    return digest.hexdigest()
+
+def _resolve_egnyte_folder_path(access_token, folder_id):
+    """Look up a folder's path (chunked uploads are path-based), preferring the listing cache"""
+    cached = egnyte_listing_cache.get(FolderListingCache.id_key(folder_id))
+    if cached and cached.get('path'):
+        return cached['path']
+    details = get_egnyte_folder_details(access_token, folder_id)
+    return details.get('path') if details else None
+
+def _upload_file_to_egnyte_chunked(access_token, folder_id, file_name, source, size, start_position, upload_key):
+    """Upload size bytes of a seekable file object from start_position with Egnyte's chunked API,
+    resuming from the last acknowledged chunk recorded under upload_key"""
+    folder_path = _resolve_egnyte_folder_path(access_token, folder_id)
+    if not folder_path:
+        raise RuntimeError(f"Could not resolve path for folder {folder_id}")
+    
+    file_path = f"{folder_path.rstrip('/')}/{file_name}"
+    api_path = f"/pubapi/v1/fs-content-chunked{urllib.parse.quote(file_path)}"
+    total_chunks = max(1, -(-size // EGNYTE_UPLOAD_CHUNK_SIZE))
+    
+    with _pending_chunked_uploads_lock:
+        state = dict(_pending_chunked_uploads.get(upload_key) or {'upload_id': None, 'next_chunk': 1})
+    if state['next_chunk'] > 1:
+        logger.info(f"Resuming chunked upload of '{file_name}' at chunk {state['next_chunk']}/{total_chunks}")
+    
+    response = None
+    for chunk_num in range(state['next_chunk'], total_chunks + 1):
+        source.seek(start_position + (chunk_num - 1) * EGNYTE_UPLOAD_CHUNK_SIZE)
+        chunk = source.read(EGNYTE_UPLOAD_CHUNK_SIZE)
         
         headers = {
-            "Authorization": f"Bearer {access_token}"
+            "Content-Type": "application/octet-stream",
+            "X-Egnyte-Chunk-Num": str(chunk_num),
+            "X-Egnyte-Chunk-Sha512-Checksum": hashlib.sha512(chunk).hexdigest()
         }
+        if state['upload_id']:
+            headers["X-Egnyte-Upload-Id"] = state['upload_id']
+        if chunk_num == total_chunks:
+            headers["X-Egnyte-Last-Chunk"] = "true"
         
-        files = {
-            'file': (file_name, file_content, content_type)
-        }
+        # Transient failures are retried per chunk by the shared Egnyte retry policy
+        try:
+            response = egnyte_api.post(api_path, access_token, headers=headers, data=chunk)
+            response.raise_for_status()
+        except requests.RequestException:
+            # Remember progress so the next attempt resumes from this chunk
+            with _pending_chunked_uploads_lock:
+                _pending_chunked_uploads[upload_key] = dict(state)
+            raise
+        
+        state['upload_id'] = response.headers.get('X-Egnyte-Upload-Id', state['upload_id'])
+        state['next_chunk'] = chunk_num + 1
+        logger.info(f"Uploaded chunk {chunk_num}/{total_chunks} of '{file_name}'")
+    
+    with _pending_chunked_uploads_lock:
+        _pending_chunked_uploads.pop(upload_key, None)
+    
+    try:
+        result = response.json() if response is not None and response.content else {}
+    except ValueError:
+        result = {}
+    result.setdefault('path', file_path)
+    result.setdefault('name', file_name)
+    return result
+
+def upload_file_to_egnyte(access_token, folder_id, file_name, file_content):
+    """
+    Upload a file to Egnyte.
+    
+    file_content may be bytes or a seekable binary file object. Files above
+    EGNYTE_CHUNKED_UPLOAD_THRESHOLD go through the chunked upload API.
+    """
+    try:
+        path = f"/pubapi/v1/fs-content/ids/folder/{folder_id}"
+        content_type = _upload_content_type(file_name)
+        
+        if isinstance(file_content, (bytes, bytearray)):
+            file_size = len(file_content)
+        else:
+            file_size = _remaining_size(file_content)
         
-        rate_limit_delay()
         logger.info(f"Uploading file '{file_name}' to folder {folder_id}")
-        logger.info(f"File size: {len(file_content)} bytes")
+        logger.info(f"File size: {file_size} bytes")
         logger.info(f"Content type: {content_type}")
         
-        response = requests.post(url, headers=headers, files=files)
-        
-        logger.info(f"Upload response status: {response.status_code}")
-        if response.status_code != 200:
-            logger.error(f"Upload failed with status {response.status_code}")
-            logger.error(f"Response text: {response.text}")
-        
-        response.raise_for_status()
+        if file_size > EGNYTE_CHUNKED_UPLOAD_THRESHOLD:
+            source = io.BytesIO(file_content) if isinstance(file_content, (bytes, bytearray)) else file_content
+            # Fixed before the first attempt: a failed attempt leaves the file position mid-file
+            start_position = source.tell()
+            upload_key = (folder_id, file_name, file_size, _content_sha256(source, start_position, file_size))
+            
+            try:
+                result = _upload_file_to_egnyte_chunked(access_token, folder_id, file_name, source, file_size,
+                                                        start_position, upload_key)
+            except requests.HTTPError as e:
+                # A resumed session may have expired on Egnyte's side; start over once
+                with _pending_chunked_uploads_lock:
+                    stale = _pending_chunked_uploads.pop(upload_key, None)
+                if not stale or e.response is None or e.response.status_code not in (400, 404, 410):
+                    if stale:
+                        with _pending_chunked_uploads_lock:
+                            _pending_chunked_uploads[upload_key] = stale
+                    raise
+                logger.warning(f"Chunked upload session for '{file_name}' expired, restarting")
+                result = _upload_file_to_egnyte_chunked(access_token, folder_id, file_name, source, file_size,
+                                                        start_position, upload_key)
+        else:
+            files = {
+                'file': (file_name, file_content, content_type)
+            }
+            
+            response = egnyte_api.post(path, access_token, files=files)
+            
+            logger.info(f"Upload response status: {response.status_code}")
+            if response.status_code != 200:
+                logger.error(f"Upload failed with status {response.status_code}")
+                logger.error(f"Response text: {response.text}")
+            
+            response.raise_for_status()
+            result = response.json()
         
-        result = response.json()
+        egnyte_listing_cache.invalidate(folder_id=folder_id)
+        egnyte_folder_mirror.mark_dirty(folder_id)
         logger.info(f"Upload successful for file '{file_name}'")
         return result
         
@@ -1771,7 +3205,7 @@ def generate_document_with_openai(template_content, source_contents, document_na
         """
         
         # Call OpenAI
-        response = client.chat.completions.create(
+        response = openai_call(client, client.chat.completions.create,
             model="gpt-4",
             messages=[
                 {"role": "system", "content": "You are a professional document generation assistant."},
@@ -1817,17 +3251,118 @@ def extract_text_from_docx(docx_content):
                 text.append(paragraph.text.strip())
         return '\n\n'.join(text)
     except Exception as e:
-        logger.error(f"Error extracting text from DOCX: {e}")
-        return ""
+        logger.error(f"Error extracting text from DOCX: {e}")
+        return ""
+
+@app.route('/egnyte-clear-cache', methods=['POST'])
+def egnyte_clear_cache():
+    """Clear the Egnyte token cache"""
+    try:
+        clear_egnyte_token_cache()
+        return jsonify({
+            "status": "success",
+            "message": "Egnyte token cache cleared"
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/egnyte-clear-listing-cache', methods=['POST'])
+def egnyte_clear_listing_cache():
+    """Flush cached Egnyte folder listings (all, or one folder_id / folder_path)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        folder_id = data.get('folder_id')
+        folder_path = data.get('folder_path')
+        
+        if folder_id or folder_path:
+            removed = egnyte_listing_cache.invalidate(folder_id=folder_id, folder_path=folder_path)
+        else:
+            removed = egnyte_listing_cache.clear()
+        
+        logger.info(f"🗑️ Flushed {removed} cached Egnyte listings")
+        return jsonify({
+            "status": "success",
+            "message": "Egnyte listing cache cleared",
+            "entries_removed": removed
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/egnyte-stats', methods=['GET'])
+def egnyte_stats():
+    """Report Egnyte client usage statistics"""
+    try:
+        return jsonify({
+            "status": "success",
+            "rate_limiter": egnyte_rate_limiter.stats(),
+            "listing_cache": egnyte_listing_cache.stats(),
+            "folder_index": folder_index_stats(),
+            "blob_cache": egnyte_blob_cache.stats(),
+            "quota": egnyte_quota_ledger.stats(),
+            "token": egnyte_token_stats(),
+            "mirror": egnyte_folder_mirror.stats(),
+            "breakers": {
+                name: stats for name, stats in breaker_states().items() if name.startswith("egnyte")
+            },
+            "http_pool": {
+                "pool_size": EGNYTE_POOL_SIZE,
+                "connect_timeout_seconds": EGNYTE_CONNECT_TIMEOUT,
+                "read_timeout_seconds": EGNYTE_READ_TIMEOUT
+            }
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/egnyte-mirror', methods=['GET'])
+def egnyte_mirror_status():
+    """Report how far the local template/source mirror lags behind Egnyte"""
+    try:
+        return jsonify({"status": "success", "mirror": egnyte_folder_mirror.stats()})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/logging-stats', methods=['GET'])
+def get_logging_stats():
+    """Report dropped (queue full) and sampled-out log records"""
+    try:
+        return jsonify({"status": "success", "logging": logging_stats()})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/bulk-pipeline-stats', methods=['GET'])
+def get_bulk_pipeline_stats():
+    """Report the bulk generation pipeline: workers, queue depth and time per stage"""
+    try:
+        return jsonify({"status": "success", "pipeline": bulk_generation_pipeline.stats()})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/llm-stats', methods=['GET'])
+def get_llm_stats():
+    """Report each LLM dispatcher: concurrency limit, queue, RPM/TPM budget left and 429s seen"""
+    try:
+        return jsonify({"status": "success", "dispatchers": llm_dispatcher_stats()})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/retry-stats', methods=['GET'])
+def get_retry_stats():
+    """Report per-backend retry counters (attempts, retries, sleeps, give-ups)"""
+    try:
+        return jsonify({"status": "success", "policies": retry_stats()})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-@app.route('/egnyte-clear-cache', methods=['POST'])
-def egnyte_clear_cache():
-    """Clear the Egnyte token cache"""
+@app.route('/health', methods=['GET'])
+def health():
+    """Report whether every backend is usable (ok) or some circuit breaker is not closed (degraded)"""
     try:
-        clear_egnyte_token_cache()
+        breakers = breaker_states()
+        degraded = sorted(name for name, stats in breakers.items() if stats["state"] != "closed")
         return jsonify({
-            "status": "success",
-            "message": "Egnyte token cache cleared"
+            "status": "degraded" if degraded else "ok",
+            "degraded_backends": degraded,
+            "breakers": breakers
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -1919,6 +3454,516 @@ def test_document_generation():
             "error": str(e)
         }), 500
 
+# Egnyte calls per generated document that no cache can save: DOCX + PDF upload. A file above
+# EGNYTE_CHUNKED_UPLOAD_THRESHOLD costs one call per chunk plus a folder path lookup instead, but its
+# size is only known after generation; generated reg docs stay far below the threshold, and
+# EGNYTE_QUOTA_RESERVE absorbs the rare exception
+EGNYTE_UPLOAD_CALLS_PER_DOC = 2
+# Listing calls to walk ROOT -> project -> campaign / reg doc folder when the folder index misses
+EGNYTE_TARGET_LOOKUP_CALLS = 3
+# Calls per uncached download: the path-based endpoint first, then the ID-based one if that fails
+EGNYTE_DOWNLOAD_CALLS_WITH_PATH = 2
+# Token refreshes a bulk job may trigger while it runs (single-flight, so at most one per token lifetime)
+EGNYTE_AUTH_CALLS_PER_JOB = 1
+
+def generation_content_key(matched_row):
+    """
+    Everything a bulk row's generated document depends on: product code, the exact template and
+    source document versions, the prompt backend and the upload target. Rows with the same key
+    produce the same document, so it only needs to be generated once.
+    """
+    row_data = matched_row.get('row_data', {})
+    blobs = []
+    for file_info in (matched_row.get('matching_template'), matched_row.get('matching_source_document')):
+        file_info = file_info or {}
+        blobs.append(EgnyteBlobCache.blob_key(file_info.get('entry_id'), file_info.get('checksum') or file_info.get('last_modified'))
+                     or file_info.get('entry_id'))
+    return (
+        str(row_data.get('product_code')),
+        *blobs,
+        MODEL_TYPE,
+        str(row_data.get('molecule_code', 'THPG001')),
+        str(row_data.get('campaign_number', '4'))
+    )
+
+def group_generation_rows(matched_rows):
+    """Group matched rows by generation_content_key; returns lists of row positions, first-seen order"""
+    groups = OrderedDict()
+    for position, matched_row in enumerate(matched_rows):
+        groups.setdefault(generation_content_key(matched_row), []).append(position)
+    return list(groups.values())
+
+def estimate_bulk_egnyte_calls(matched_rows):
+    """
+    Estimate the Egnyte calls each matched bulk row will cost, in order.
+    
+    Later rows are cheaper when earlier ones already download a shared template or
+    walk (and index) the same campaign's folders, and free when an earlier row
+    generates the very same document (see generation_content_key). Downloads count
+    the path-to-ID fallback, and the first generating row carries the job's possible
+    token refresh. Chunked uploads are not counted (see EGNYTE_UPLOAD_CALLS_PER_DOC).
+    """
+    seen_blobs = set()
+    seen_targets = set()
+    seen_generations = set()
+    costs = []
+    for matched_row in matched_rows:
+        content_key = generation_content_key(matched_row)
+        if content_key in seen_generations:
+            costs.append(0)
+            continue
+        cost = EGNYTE_UPLOAD_CALLS_PER_DOC
+        if not seen_generations:
+            cost += EGNYTE_AUTH_CALLS_PER_JOB
+        seen_generations.add(content_key)
+        
+        row_data = matched_row.get('row_data', {})
+        target = (row_data.get('molecule_code', 'THPG001'), row_data.get('campaign_number', '4'))
+        if target not in seen_targets:
+            seen_targets.add(target)
+            indexed = lookup_indexed_folder(target[0], target[1], CAMPAIGN_NODE) and \
+                lookup_indexed_folder(target[0], '', REG_DOC_NODE)
+            if not indexed:
+                cost += EGNYTE_TARGET_LOOKUP_CALLS
+        
+        for file_info in (matched_row.get('matching_template'), matched_row.get('matching_source_document')):
+            if not file_info:
+                continue
+            key = EgnyteBlobCache.blob_key(file_info.get('entry_id'), file_info.get('checksum') or file_info.get('last_modified'))
+            blob_id = key or file_info.get('entry_id')
+            if blob_id in seen_blobs:
+                continue
+            seen_blobs.add(blob_id)
+            if not egnyte_blob_cache.contains(key):
+                cost += EGNYTE_DOWNLOAD_CALLS_WITH_PATH if file_info.get('path') else 1
+        
+        costs.append(cost)
+    return costs
+
+@app.route('/egnyte-quota', methods=['GET'])
+def egnyte_quota():
+    """Report today's Egnyte call usage and remaining quota"""
+    try:
+        return jsonify({"status": "success", "quota": egnyte_quota_ledger.stats()})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Bulk requests run as background jobs; state lives in SQLite so any gunicorn worker can answer a status poll
+BULK_JOB_DB = os.getenv('BULK_JOB_DB', 'bulk_jobs.db')
+# Workers per generation stage, per process and shared by all jobs (see GENERATION_STAGES)
+BULK_DOWNLOAD_WORKERS = int(os.getenv('BULK_DOWNLOAD_WORKERS', '2'))           # Egnyte token + template/source downloads
+BULK_LLM_WORKERS = int(os.getenv('BULK_LLM_WORKERS', str(LLM_MAX_CONCURRENCY)))  # Documents waiting on the LLM at once (the dispatcher limits actual calls)
+BULK_CONVERT_WORKERS = int(os.getenv('BULK_CONVERT_WORKERS', '1'))             # DOCX write + PDF conversion (CPU bound)
+BULK_UPLOAD_WORKERS = int(os.getenv('BULK_UPLOAD_WORKERS', '2'))               # Target folder lookup + Egnyte uploads
+BULK_PIPELINE_QUEUE_SIZE = int(os.getenv('BULK_PIPELINE_QUEUE_SIZE', '2'))     # Items buffered in front of each stage
+BULK_JOB_RETENTION_DAYS = float(os.getenv('BULK_JOB_RETENTION_DAYS', '7'))     # Finished jobs and their reports are kept this long
+BULK_JOB_HEARTBEAT_INTERVAL = float(os.getenv('BULK_JOB_HEARTBEAT_INTERVAL', '30'))  # How often the owning worker marks its jobs alive
+BULK_JOB_STALE_AFTER = float(os.getenv('BULK_JOB_STALE_AFTER', '180'))          # A job without a heartbeat this long is reported interrupted
+# A job gives up on its unfinished rows when no row has finished for this long: longer than one document can
+# take (waiting for an LLM slot, the LLM call with its retries, and the Egnyte calls around it)
+BULK_JOB_STALL_TIMEOUT = float(os.getenv('BULK_JOB_STALL_TIMEOUT',
+                                         str(LLM_QUEUE_TIMEOUT + OPENAI_RETRY_DEADLINE + 4 * EGNYTE_RETRY_DEADLINE)))
+
+BULK_ROW_STATES = ("queued", "running", "succeeded", "failed", "skipped", "deferred")
+
+class BulkJobStore:
+    """SQLite-backed bulk job state: job status, per-row progress and the final report"""
+
+    def __init__(self, db_path, retention_days, heartbeat_interval, stale_after):
+        self.db_path = db_path
+        self.retention_days = retention_days
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        # The heartbeat, not the pid, says whether the owner is alive: the DB may be shared
+        # across hosts/containers, and a pid can be reused after a restart
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._lock = threading.Lock()
+        self._schema_ready = False
+        self._owned = set()
+        self._heartbeat_thread = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS bulk_jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                message TEXT,
+                worker_pid INTEGER,
+                worker_id TEXT,
+                created_at TEXT NOT NULL,
+                heartbeat_at TEXT,
+                started_at TEXT,
+                completed_at TEXT,
+                total_rows INTEGER NOT NULL DEFAULT 0,
+                report TEXT
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS bulk_job_rows (
+                job_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                row_index INTEGER,
+                product_code TEXT,
+                section TEXT,
+                state TEXT NOT NULL,
+                error TEXT,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (job_id, position)
+            )
+        """)
+        if not self._schema_ready:
+            # Databases created before heartbeats were added lack these columns
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(bulk_jobs)")}
+            for column in ("worker_id", "heartbeat_at"):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE bulk_jobs ADD COLUMN {column} TEXT")
+            conn.commit()
+            self._schema_ready = True
+        return conn
+
+    def _execute(self, statements):
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    for sql, params in statements:
+                        conn.execute(sql, params)
+            finally:
+                conn.close()
+
+    def _heartbeat_loop(self):
+        while True:
+            time.sleep(self.heartbeat_interval)
+            with self._lock:
+                owned = list(self._owned)
+            if not owned:
+                continue
+            try:
+                now = datetime.now().isoformat()
+                self._execute([("UPDATE bulk_jobs SET heartbeat_at = ? WHERE job_id = ?", (now, job_id)) for job_id in owned])
+            except Exception as e:
+                logger.warning(f"Could not record bulk job heartbeat: {e}")
+
+    def create(self, job_id, rows):
+        """Register a queued job owned by this worker; rows are (row_index, product_code, section, state) tuples"""
+        now = datetime.now().isoformat()
+        cutoff = datetime.fromtimestamp(time.time() - self.retention_days * 86400).isoformat()
+        # Finished jobs expire by completion time; jobs whose worker died never complete, so they
+        # expire by their last heartbeat
+        expired = "completed_at < ? OR (completed_at IS NULL AND COALESCE(heartbeat_at, created_at) < ?)"
+        statements = [
+            (f"DELETE FROM bulk_job_rows WHERE job_id IN (SELECT job_id FROM bulk_jobs WHERE {expired})", (cutoff, cutoff)),
+            (f"DELETE FROM bulk_jobs WHERE {expired}", (cutoff, cutoff)),
+            ("INSERT INTO bulk_jobs (job_id, status, message, worker_pid, worker_id, created_at, heartbeat_at, total_rows) "
+             "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+             (job_id, "queued", "Waiting for a worker", os.getpid(), self.worker_id, now, now, len(rows)))
+        ]
+        for position, (row_index, product_code, section, state) in enumerate(rows):
+            statements.append((
+                "INSERT INTO bulk_job_rows VALUES (?, ?, ?, ?, ?, ?, NULL, ?)",
+                (job_id, position, row_index, product_code, section, state, now)
+            ))
+        self._execute(statements)
+        with self._lock:
+            self._owned.add(job_id)
+            if self._heartbeat_thread is None:
+                self._heartbeat_thread = threading.Thread(target=self._heartbeat_loop, name="bulk-job-heartbeat", daemon=True)
+                self._heartbeat_thread.start()
+
+    def update_job(self, job_id, status, message, report=None):
+        now = datetime.now().isoformat()
+        if status == "running":
+            self._execute([("UPDATE bulk_jobs SET status = ?, message = ?, started_at = ?, heartbeat_at = ? WHERE job_id = ?",
+                            (status, message, now, now, job_id))])
+        else:
+            self._execute([("UPDATE bulk_jobs SET status = ?, message = ?, completed_at = ?, heartbeat_at = ?, report = ? WHERE job_id = ?",
+                            (status, message, now, now, json.dumps(report, default=str) if report is not None else None, job_id))])
+            with self._lock:
+                self._owned.discard(job_id)
+
+    def update_row(self, job_id, position, state, error=None):
+        try:
+            self._execute([("UPDATE bulk_job_rows SET state = ?, error = ?, updated_at = ? WHERE job_id = ? AND position = ?",
+                            (state, error, datetime.now().isoformat(), job_id, position))])
+        except Exception as e:
+            logger.warning(f"Could not record bulk job {job_id} row {position} as {state}: {e}")
+
+    def get(self, job_id, include_rows=True):
+        """Return the job with row counts, progress, rows and (when finished) the report, or None"""
+        with self._lock:
+            conn = self._connect()
+            try:
+                job = conn.execute(
+                    "SELECT status, message, worker_id, heartbeat_at, created_at, started_at, completed_at, total_rows, report "
+                    "FROM bulk_jobs WHERE job_id = ?", (job_id,)
+                ).fetchone()
+                rows = conn.execute(
+                    "SELECT position, row_index, product_code, section, state, error, updated_at "
+                    "FROM bulk_job_rows WHERE job_id = ? ORDER BY position", (job_id,)
+                ).fetchall() if job else []
+            finally:
+                conn.close()
+        if not job:
+            return None
+        status, message, worker_id, heartbeat_at, created_at, started_at, completed_at, total_rows, report = job
+        # The worker that owned the job stopped sending heartbeats; its in-flight rows will never finish
+        if status in ("queued", "running"):
+            last_seen = datetime.fromisoformat(heartbeat_at or created_at)
+            if (datetime.now() - last_seen).total_seconds() > self.stale_after:
+                status = "interrupted"
+                message = (f"Worker {worker_id or 'unknown'} stopped reporting at {last_seen.isoformat()} "
+                           f"before the job finished; resubmit the request")
+        counts = {state: 0 for state in BULK_ROW_STATES}
+        for row in rows:
+            counts[row[4]] = counts.get(row[4], 0) + 1
+        finished = total_rows - counts["queued"] - counts["running"]
+        result = {
+            "job_id": job_id,
+            "status": status,
+            "message": message,
+            "created_at": created_at,
+            "started_at": started_at,
+            "completed_at": completed_at,
+            "heartbeat_at": heartbeat_at,
+            "total_rows": total_rows,
+            "progress": round(100 * finished / total_rows) if total_rows else 100,
+            "row_counts": counts
+        }
+        if include_rows:
+            result["rows"] = [{
+                "row_index": row_index, "product_code": product_code, "section": section,
+                "state": state, "error": error, "updated_at": updated_at
+            } for _, row_index, product_code, section, state, error, updated_at in rows]
+        if report:
+            result["total_match_report"] = json.loads(report)
+        return result
+
+bulk_job_store = BulkJobStore(BULK_JOB_DB, BULK_JOB_RETENTION_DAYS, BULK_JOB_HEARTBEAT_INTERVAL, BULK_JOB_STALE_AFTER)
+
+def bulk_row_outcome(matched_row, generation_result):
+    """Shape a generation result into (detailed result entry, generated document entry or None)"""
+    product_code = matched_row['row_data']['product_code']
+    
+    # Extract URLs if generation was successful
+    doc_urls = {}
+    if generation_result.get('success'):
+        upload_result = generation_result.get('upload_result', {})
+        docx_result = upload_result.get('docx_result', {})
+        pdf_result = upload_result.get('pdf_result', {})
+        if docx_result:
+            doc_urls['docx_url'] = f"https://{DOMAIN}/app/index.do#storage/files/1{docx_result.get('path', '')}"
+        if pdf_result:
+            doc_urls['pdf_url'] = f"https://{DOMAIN}/app/index.do#storage/files/1{pdf_result.get('path', '')}"
+    
+    generated_doc = None
+    if doc_urls:
+        generated_doc = {
+            'product_code': product_code,
+            'section': matched_row['row_data']['section'],
+            'docx_filename': generation_result.get('docx_filename'),
+            'pdf_filename': generation_result.get('pdf_filename'),
+            'docx_url': doc_urls.get('docx_url'),
+            'pdf_url': doc_urls.get('pdf_url')
+        }
+    return {
+        'row_index': matched_row['row_index'],
+        'product_code': product_code,
+        'generation_result': generation_result,
+        'doc_urls': doc_urls
+    }, generated_doc
+
+def generate_bulk_row(matched_row, position=None, total=None):
+    """Generate, convert and upload the document for one matched bulk row, all stages inline.
+    
+    Returns:
+        (detailed result entry, generated document entry or None)
+    """
+    label = f"{position + 1}/{total}" if position is not None and total else str(matched_row['row_index'])
+    logger.info(f"📄 Processing document {label}: row {matched_row['row_index']}, "
+                f"product code {matched_row['row_data']['product_code']}")
+    try:
+        generation_result = process_document_generation(matched_row)
+    except Exception as e:
+        logger.error(f"❌ Error processing document {label}: {e}")
+        generation_result = {'success': False, 'error': str(e)}
+    finally:
+        cleanup_memory()
+        cleanup_temp_files()
+    return bulk_row_outcome(matched_row, generation_result)
+
+def _bulk_row_state(detailed_result):
+    generation_result = detailed_result['generation_result']
+    if generation_result.get('success'):
+        return "succeeded", None
+    state = "skipped" if generation_result.get('error_code') == 'BACKEND_UNAVAILABLE' else "failed"
+    return state, generation_result.get('error')
+
+def fan_out_generation(matched_rows, group, detailed, generated_doc):
+    """Copy one generation's result to every row in its group; returns [(position, detailed, generated_doc)]"""
+    primary = matched_rows[group[0]]
+    results = []
+    for position in group:
+        row_data = matched_rows[position]['row_data']
+        row_detailed = dict(detailed, row_index=matched_rows[position]['row_index'], product_code=row_data['product_code'])
+        row_doc = dict(generated_doc, section=row_data['section']) if generated_doc else None
+        if position != group[0]:
+            row_detailed['deduplicated_from_row'] = primary['row_index']
+        results.append((position, row_detailed, row_doc))
+    return results
+
+def generation_dedupe_summary(matched_rows, groups):
+    """What grouping identical rows saved: each duplicate row skips 2 downloads, 1 LLM call and 2 uploads"""
+    duplicates = len(matched_rows) - len(groups)
+    return {
+        'rows': len(matched_rows),
+        'unique_generations': len(groups),
+        'llm_calls_saved': duplicates,
+        'downloads_saved': 2 * duplicates,
+        'uploads_saved': 2 * duplicates
+    }
+
+def build_total_match_report(plan, document_generation_results, generated_docs_urls):
+    """Assemble the bulk report from the matching plan and the per-row generation results"""
+    return {
+        'campaign_summary': {
+            'total_requests': plan['total_requests'],
+            'successful_matches': plan['matched_count'],
+            'unique_product_codes': plan['unique_product_codes'],
+            'processing_timestamp': plan['timestamp']
+        },
+        'status_breakdown': plan['summary_table'],
+        'generated_documents': generated_docs_urls,
+        'detailed_results': document_generation_results,
+        'egnyte_quota': {
+            'estimated_calls': plan['estimated_calls'],
+            'deferred_rows': plan['deferred_rows'],
+            'remaining_after_run': egnyte_quota_ledger.remaining()
+        },
+        'egnyte_mirror': {
+            'templates': plan['templates_source'],
+            'source_documents': plan['source_docs_source'],
+            'lag_seconds': egnyte_folder_mirror.lag_seconds()
+        },
+        'generation_dedupe': generation_dedupe_summary(plan['matched_rows'], plan['generation_groups'])
+    }
+
+def bulk_pipeline_summary(items, elapsed_seconds):
+    """Throughput of one bulk job: documents per minute and average seconds per stage"""
+    documents = sum(1 for item in items if item.get('result', {}).get('success'))
+    stage_seconds = {}
+    for item in items:
+        for stage, seconds in item.get('timings', {}).items():
+            stage_seconds.setdefault(stage, []).append(seconds)
+    return {
+        'documents_generated': documents,
+        'generations': len(items),
+        'elapsed_seconds': round(elapsed_seconds, 2),
+        'documents_per_minute': documents_per_minute(documents, elapsed_seconds),
+        'avg_stage_seconds': {stage: round(sum(values) / len(values), 2) for stage, values in stage_seconds.items()},
+        'workers': {stage.name: stage.workers for stage in bulk_generation_pipeline.stages}
+    }
+
+def run_bulk_job(job_id, plan):
+    """Run a queued bulk job: push each distinct generation through the staged pipeline, then store the report"""
+    rows = plan['matched_rows']
+    try:
+        bulk_job_store.update_job(job_id, "running", f"Generating {len(rows)} documents")
+        log_memory_usage("before bulk job")
+        started = time.monotonic()
+        
+        groups = plan['generation_groups']
+        results = [None] * len(rows)
+        finished_items = []
+        all_done = threading.Event()
+        done_lock = threading.Lock()
+        abandoned = threading.Event()
+        
+        def on_done(item):
+            group = item['group']
+            with done_lock:
+                if abandoned.is_set():
+                    return   # the job already gave up on this row and stored its report
+                try:
+                    generation_result = item.get('result') or {'success': False, 'error': 'Generation did not produce a result'}
+                    detailed, generated_doc = bulk_row_outcome(rows[group[0]], generation_result)
+                    state, error = _bulk_row_state(detailed)
+                    for position, row_detailed, row_doc in fan_out_generation(rows, group, detailed, generated_doc):
+                        results[position] = (row_detailed, row_doc)
+                        bulk_job_store.update_row(job_id, position, state, error)
+                finally:
+                    # Always count the item, or the job would wait forever
+                    finished_items.append(item)
+                    if len(finished_items) == len(groups):
+                        all_done.set()
+        
+        if not groups:
+            all_done.set()
+        for group in groups:
+            for position in group:
+                bulk_job_store.update_row(job_id, position, "running")
+            # Blocks while the download stage's queue is full, so a big job never floods memory
+            bulk_generation_pipeline.submit({'matched_row': rows[group[0]], 'group': group}, on_done)
+        
+        # Wait as long as rows keep finishing; a stuck item must not leave the job running forever
+        finished_count = -1
+        while not all_done.wait(timeout=BULK_JOB_STALL_TIMEOUT):
+            with done_lock:
+                if len(finished_items) == finished_count:
+                    abandoned.set()
+                    break
+                finished_count = len(finished_items)
+        if abandoned.is_set():
+            with done_lock:
+                stalled = [group for group in groups if results[group[0]] is None]
+            logger.error(f"❌ Bulk job {job_id}: no row finished in {BULK_JOB_STALL_TIMEOUT:.0f}s, "
+                         f"giving up on {len(stalled)} generations")
+            for group in stalled:
+                detailed, _ = bulk_row_outcome(rows[group[0]], {
+                    'success': False, 'error': f"Generation did not finish within {BULK_JOB_STALL_TIMEOUT:.0f}s"})
+                state, error = _bulk_row_state(detailed)
+                for position, row_detailed, row_doc in fan_out_generation(rows, group, detailed, None):
+                    results[position] = (row_detailed, row_doc)
+                    bulk_job_store.update_row(job_id, position, state, error)
+        
+        document_generation_results = [detailed for detailed, _ in results]
+        generated_docs_urls = [doc for _, doc in results if doc]
+        report = build_total_match_report(plan, document_generation_results, generated_docs_urls)
+        report['pipeline'] = bulk_pipeline_summary(finished_items, time.monotonic() - started)
+        failed = sum(1 for detailed in document_generation_results if not detailed['generation_result'].get('success'))
+        message = (f"Generated {report['pipeline']['documents_generated']} documents "
+                   f"({report['pipeline']['documents_per_minute']} docs/min)" + (f", {failed} rows failed" if failed else ""))
+        bulk_job_store.update_job(job_id, "completed", message, report)
+        log_memory_usage("after bulk job")
+        logger.info(f"✅ Bulk job {job_id} completed: {message}")
+    except Exception as e:
+        logger.error(f"❌ Bulk job {job_id} failed: {e}")
+        try:
+            bulk_job_store.update_job(job_id, "failed", f"Bulk job failed: {e}")
+        except Exception as store_error:
+            logger.error(f"Could not record failure of bulk job {job_id}: {store_error}")
+
+# Name indexes for the bulk matcher, one per template/source listing snapshot (see name_index.py)
+NAME_INDEX_CACHE_SIZE = int(os.getenv('NAME_INDEX_CACHE_SIZE', '8'))
+_name_index_cache = OrderedDict()
+_name_index_lock = threading.Lock()
+
+def name_match_index(files):
+    """Return the NameIndex for this listing, reusing it while the names are unchanged; resolve its
+    positions against the current files, since checksums and paths may have moved on since it was built"""
+    key = listing_fingerprint(files)
+    with _name_index_lock:
+        index = _name_index_cache.get(key)
+        if index is not None:
+            _name_index_cache.move_to_end(key)
+            return index
+    index = NameIndex(files)
+    with _name_index_lock:
+        _name_index_cache[key] = index
+        while len(_name_index_cache) > NAME_INDEX_CACHE_SIZE:
+            _name_index_cache.popitem(last=False)
+    return index
+
 @app.route('/reg-docs-bulk-request', methods=['POST'])
 def reg_docs_bulk_request():
     """Bulk request for regulatory documents"""
@@ -1940,46 +3985,38 @@ def reg_docs_bulk_request():
         unique_product_codes = request_df['product_code'].unique().tolist()
         print(f"Unique product codes: {unique_product_codes}")
         
-        # Extract root names and latest versions from reg doc versions
-        # Handle null values safely
-        def extract_root_and_latest(version_str):
-            if not version_str or not isinstance(version_str, str):
-                return None, None
-            
-            # Extract root (everything before "v")
-            parts = version_str.split('v')
-            root = parts[0].strip() if parts[0] else None
-            
-            # Find all version numbers in the string (e.g., v1.0, v2.0, v3.1)
-            import re
-            versions = re.findall(r'v(\d+\.?\d*)', version_str)
-            
-            if not versions:
-                return root, None
-            
-            # Convert to float for comparison and find the latest
-            try:
-                latest_version = max(float(v) for v in versions)
-                latest = f"v{latest_version}"
-                return root, latest
-            except ValueError:
-                return root, None
-        
-        # Extract both root and latest version
-        request_df[['reg_doc_version_active_root', 'reg_doc_version_active_latest']] = pd.DataFrame(
-            request_df['reg_doc_version_active'].apply(extract_root_and_latest).tolist(), 
-            index=request_df.index
-        )
-        request_df[['reg_doc_version_placebo_root', 'reg_doc_version_placebo_latest']] = pd.DataFrame(
-            request_df['reg_doc_version_placebo'].apply(extract_root_and_latest).tolist(), 
-            index=request_df.index
-        )
+        # Root, latest version and every version of both reg doc columns, parsed in one pass
+        parse_version_columns(request_df, ['reg_doc_version_active', 'reg_doc_version_placebo'])
         
         print("Active reg doc roots:", request_df['reg_doc_version_active_root'].unique().tolist())
         print("Active reg doc latest versions:", request_df['reg_doc_version_active_latest'].unique().tolist())
         print("Placebo reg doc roots:", request_df['reg_doc_version_placebo_root'].unique().tolist())
         print("Placebo reg doc latest versions:", request_df['reg_doc_version_placebo_latest'].unique().tolist())
         
+        # Fail fast while Egnyte is known to be down instead of queueing work behind it
+        open_breaker = open_backend_breaker(egnyte_auth_breaker, egnyte_fs_breaker)
+        if open_breaker:
+            retry_in = max(1, int(open_breaker.retry_in()))
+            response = jsonify({
+                "status": "error",
+                "message": f"Egnyte is currently unavailable ({open_breaker.name} circuit open). Please try again later.",
+                "error_code": "EGNYTE_UNAVAILABLE",
+                "retry_after_seconds": retry_in
+            })
+            response.headers['Retry-After'] = str(retry_in)
+            return response, 503
+        
+        # Refuse up front when there is not even quota left to list templates and sources
+        admitted, available = egnyte_quota_ledger.admit(2)
+        if not admitted:
+            return jsonify({
+                "status": "error",
+                "message": "Daily Egnyte API quota is used up. Please try again after it resets.",
+                "error_code": "EGNYTE_QUOTA_EXHAUSTED",
+                "quota": egnyte_quota_ledger.stats(),
+                "retry_after_seconds": EgnyteQuotaLedger.seconds_until_reset()
+            }), 429
+        
         # Get Egnyte access token
         access_token = get_egnyte_token()
         if not access_token:
@@ -1991,50 +4028,54 @@ def reg_docs_bulk_request():
             }), 429  # 429 = Too Many Requests
         
         # Get templates from Egnyte
-        templates_folder_id = "966281ab-54c3-47ea-b20f-b38ed2ef9b30"
+        templates_folder_id = EGNYTE_TEMPLATES_FOLDER_ID
         logger.info(f"Fetching templates from folder ID: {templates_folder_id}")
-        templates_data = list_egnyte_folder_contents(access_token, templates_folder_id)
+        templates_data, templates_source = list_mirrored_egnyte_folder(access_token, templates_folder_id)
         if not templates_data:
             logger.error("FAILED: Could not list templates folder contents")
             return jsonify({"error": "Failed to list templates folder contents"}), 500
         
         templates = templates_data.get("files", [])
-        logger.info(f"Found {len(templates)} templates in Egnyte")
-        for i, template in enumerate(templates[:10]):  # Log first 10 templates
-            logger.info(f"Template {i+1}: {template.get('name')} (ID: {template.get('entry_id')})")
+        logger.info(f"Found {len(templates)} templates in Egnyte ({templates_source} listing)")
+        for template in templates[:10]:  # First 10 templates, only when debugging
+            debug_event(logger, "bulk_template", name=template.get('name'), entry_id=template.get('entry_id'))
         
         # Get source documents from Egnyte
-        source_docs_folder_id = "56545792-6b5d-4fc3-8e78-31d401bd7088"
+        source_docs_folder_id = EGNYTE_SOURCE_DOCS_FOLDER_ID
         logger.info(f"Fetching source documents from folder ID: {source_docs_folder_id}")
-        source_docs_data = list_egnyte_folder_contents(access_token, source_docs_folder_id)
+        source_docs_data, source_docs_source = list_mirrored_egnyte_folder(access_token, source_docs_folder_id)
         if not source_docs_data:
             logger.error("FAILED: Could not list source documents folder contents")
             return jsonify({"error": "Failed to list source documents folder contents"}), 500
         
         source_docs = source_docs_data.get("files", [])
-        logger.info(f"Found {len(source_docs)} source documents in Egnyte")
-        for i, doc in enumerate(source_docs[:10]):  # Log first 10 source docs
-            logger.info(f"Source doc {i+1}: {doc.get('name')} (ID: {doc.get('entry_id')})")
+        logger.info(f"Found {len(source_docs)} source documents in Egnyte ({source_docs_source} listing)")
+        for doc in source_docs[:10]:  # First 10 source docs, only when debugging
+            debug_event(logger, "bulk_source_doc", name=doc.get('name'), entry_id=doc.get('entry_id'))
         
         # Filter to only latest versions and process each request row
         latest_version_rows = []
         status_report = []
+        template_index = name_match_index(templates)
+        source_doc_index = name_match_index(source_docs)
+        # Per-pair match diagnostics are only built when debugging (DEBUG level or X-Debug-Log on this request)
+        verbose = debug_enabled(logger)
         
         for idx, row in request_df.iterrows():
-            print(f"\n--- Processing Row {idx + 1} ---")
-            print(f"Product Code: {row['product_code']}")
-            print(f"Active Reg Doc Root: {row['reg_doc_version_active_root']}")
-            print(f"Active Reg Doc Latest: {row['reg_doc_version_active_latest']}")
-            print(f"Placebo Reg Doc Root: {row['reg_doc_version_placebo_root']}")
-            print(f"Placebo Reg Doc Latest: {row['reg_doc_version_placebo_latest']}")
-            print(f"Section: {row['section']}")
+            if verbose:
+                debug_event(logger, "bulk_row", row=idx + 1, product_code=row['product_code'],
+                            active_root=row['reg_doc_version_active_root'],
+                            active_latest=row['reg_doc_version_active_latest'],
+                            placebo_root=row['reg_doc_version_placebo_root'],
+                            placebo_latest=row['reg_doc_version_placebo_latest'], section=row['section'])
             
             # Check if this is the latest version
             active_is_latest = row['reg_doc_version_active_latest'] is not None
             placebo_is_latest = row['reg_doc_version_placebo_latest'] is not None
             
             if not active_is_latest and not placebo_is_latest:
-                print(f"  ⚠️ Skipping - not latest version")
+                if verbose:
+                    debug_event(logger, "bulk_row_skipped", row=idx + 1, reason="not latest version")
                 status_report.append({
                     'row_index': idx,
                     'row_data': row.to_dict(),
@@ -2046,76 +4087,39 @@ def reg_docs_bulk_request():
             
             # Find matching templates
             matching_templates = []
-            logger.info(f"Looking for templates matching active_root: '{row['reg_doc_version_active_root']}' or placebo_root: '{row['reg_doc_version_placebo_root']}'")
+            active_root = row['reg_doc_version_active_root']
+            placebo_root = row['reg_doc_version_placebo_root']
             
-            for template in templates:
-                template_name = template.get('name', '').lower()
-                active_root = row['reg_doc_version_active_root']
-                placebo_root = row['reg_doc_version_placebo_root']
-                
-                # Convert to lowercase only if not None
-                active_root_lower = active_root.lower() if active_root else ""
-                placebo_root_lower = placebo_root.lower() if placebo_root else ""
-                
-                logger.info(f"Checking template: '{template.get('name')}' (ID: {template.get('entry_id')})")
-                logger.info(f"  Template name (lower): '{template_name}'")
-                logger.info(f"  Active root (lower): '{active_root_lower}'")
-                logger.info(f"  Placebo root (lower): '{placebo_root_lower}'")
-                
-                # More specific template matching - check for exact section match
-                template_matches = False
-                if active_root_lower and active_root_lower in template_name:
-                    template_matches = True
-                    logger.info(f"  ✓ Template match (active): {template.get('name')} - matches {active_root_lower}")
-                elif placebo_root_lower and placebo_root_lower in template_name:
-                    template_matches = True
-                    logger.info(f"  ✓ Template match (placebo): {template.get('name')} - matches {placebo_root_lower}")
-                else:
-                    logger.info(f"  ✗ No match for template: {template.get('name')}")
-                
-                if template_matches:
-                    matching_templates.append(template)
+            # Convert to lowercase only if not None
+            active_root_lower = active_root.lower() if active_root else ""
+            placebo_root_lower = placebo_root.lower() if placebo_root else ""
+            
+            # Templates whose name contains the active or placebo root, in listing order
+            active_hits = template_index.positions(active_root_lower) if active_root_lower else ()
+            placebo_hits = template_index.positions(placebo_root_lower) if placebo_root_lower else ()
+            for position in sorted(set(active_hits).union(placebo_hits)):
+                matching_templates.append(templates[position])
+            
+            if verbose:
+                debug_event(logger, "bulk_template_check", row=idx + 1, active_root=active_root_lower,
+                            placebo_root=placebo_root_lower, checked=len(templates),
+                            active_matches=[templates[p].get('name') for p in active_hits],
+                            placebo_matches=[templates[p].get('name') for p in placebo_hits])
             
             # Find matching source documents
             matching_source_docs = []
-            logger.info(f"Looking for source documents matching product_code: '{row['product_code']}'")
+            product_code = row['product_code'].lower()
             
-            for source_doc in source_docs:
-                source_doc_name = source_doc.get('name', '').lower()
-                product_code = row['product_code'].lower()
-                
-                logger.info(f"Checking source doc: '{source_doc.get('name')}' (ID: {source_doc.get('entry_id')})")
-                logger.info(f"  Source doc name (lower): '{source_doc_name}'")
-                logger.info(f"  Product code (lower): '{product_code}'")
-                
-                # Check if source document matches the product code
-                if product_code in source_doc_name:
-                    matching_source_docs.append(source_doc)
-                    logger.info(f"  ✓ Source doc match: {source_doc.get('name')} - matches product code {product_code}")
-                else:
-                    logger.info(f"  ✗ No match for source doc: {source_doc.get('name')}")
+            # Source documents whose name contains the product code, in listing order
+            matching_source_docs.extend(source_docs[position] for position in source_doc_index.positions(product_code))
+            if verbose:
+                debug_event(logger, "bulk_source_check", row=idx + 1, product_code=product_code,
+                            checked=len(source_docs), matches=[doc.get('name') for doc in matching_source_docs])
             
             # Determine status and add to report
             matching_template = matching_templates[0] if matching_templates else None
             matching_source_doc = matching_source_docs[0] if matching_source_docs else None
             
-            # Debug the matched files
-            if matching_template:
-                logger.info(f"MATCHED TEMPLATE DETAILS:")
-                logger.info(f"  Name: {matching_template.get('name')}")
-                logger.info(f"  Entry ID: {matching_template.get('entry_id')}")
-                logger.info(f"  Path: {matching_template.get('path')}")
-                logger.info(f"  Type: {matching_template.get('type')}")
-                logger.info(f"  Size: {matching_template.get('size')}")
-            
-            if matching_source_doc:
-                logger.info(f"MATCHED SOURCE DOC DETAILS:")
-                logger.info(f"  Name: {matching_source_doc.get('name')}")
-                logger.info(f"  Entry ID: {matching_source_doc.get('entry_id')}")
-                logger.info(f"  Path: {matching_source_doc.get('path')}")
-                logger.info(f"  Type: {matching_source_doc.get('type')}")
-                logger.info(f"  Size: {matching_source_doc.get('size')}")
-            
             if matching_template and matching_source_doc:
                 status = "Matched Both Docs in Egnyte"
             elif not matching_source_doc:
@@ -2145,8 +4149,12 @@ def reg_docs_bulk_request():
                     'total_source_docs': len(matching_source_docs)
                 })
             
-            print(f"  Row {idx + 1} Summary: {len(matching_templates)} templates, {len(matching_source_docs)} source docs")
-            print(f"  Status: {status}")
+            # One line per row normally; rate limited so very large requests cannot flood the log
+            sampled_event(logger, logging.INFO, "bulk_row_matched", per_second=BULK_ROW_LOG_RATE, row=idx + 1,
+                          product_code=row['product_code'], templates=len(matching_templates),
+                          source_docs=len(matching_source_docs), status=status,
+                          template=lambda: matching_template.get('name') if matching_template else None,
+                          source_doc=lambda: matching_source_doc.get('name') if matching_source_doc else None)
         
         # Filter status report to only show "Matched Both Docs in Egnyte"
         matched_status_report = [item for item in status_report if item['status'] == "Matched Both Docs in Egnyte"]
@@ -2178,118 +4186,128 @@ def reg_docs_bulk_request():
         for summary in summary_table:
             print(f"{summary['status']}: {summary['count']} rows ({summary['percentage']}%)")
         
-        # Process document generation for matched rows - ONE AT A TIME with memory cleanup
-        document_generation_results = []
-        generated_docs_urls = []
-        
-        logger.info(f"🔄 Starting document generation for {len(matched_status_report)} matched rows")
-        log_memory_usage("before document generation")
-        
-        for i, matched_row in enumerate(matched_status_report):
-            logger.info("=" * 80)
-            logger.info(f"PROCESSING DOCUMENT {i+1}/{len(matched_status_report)}")
-            logger.info("=" * 80)
-            logger.info(f"Row index: {matched_row['row_index']}")
-            logger.info(f"Product code: {matched_row['row_data']['product_code']}")
-            logger.info(f"Status: {matched_row['status']}")
-            
-            # Log memory before processing this document
-            log_memory_usage(f"before document {i+1}")
-            
-            if matched_row['matching_template']:
-                logger.info(f"Template to use: {matched_row['matching_template'].get('name')} (ID: {matched_row['matching_template'].get('entry_id')})")
-            else:
-                logger.info("No template found!")
-                
-            if matched_row['matching_source_document']:
-                logger.info(f"Source doc to use: {matched_row['matching_source_document'].get('name')} (ID: {matched_row['matching_source_document'].get('entry_id')})")
-            else:
-                logger.info("No source document found!")
+        # Admission control: make sure the generation phase fits in today's Egnyte quota.
+        # ?on_quota=partial runs the rows that fit and defers the rest instead of rejecting.
+        matched_count = len(matched_status_report)
+        row_costs = estimate_bulk_egnyte_calls(matched_status_report)
+        estimated_calls = sum(row_costs)
+        admitted, available = egnyte_quota_ledger.admit(estimated_calls)
+        deferred_rows = []
+        logger.info(f"📊 Bulk generation estimated at {estimated_calls} Egnyte calls, {available} available today")
+        if not admitted:
+            if request.args.get('on_quota') != 'partial':
+                return jsonify({
+                    "status": "error",
+                    "message": f"Bulk request needs about {estimated_calls} Egnyte calls but only {available} are available today",
+                    "error_code": "EGNYTE_QUOTA_INSUFFICIENT",
+                    "estimated_calls": estimated_calls,
+                    "quota": egnyte_quota_ledger.stats(),
+                    "retry_after_seconds": EgnyteQuotaLedger.seconds_until_reset()
+                }), 429
             
-            try:
-                # Process this single document
-                generation_result = process_document_generation(matched_row)
-                
-                # Extract URLs if generation was successful
-                doc_urls = {}
-                if generation_result.get('success'):
-                    upload_result = generation_result.get('upload_result', {})
-                    docx_result = upload_result.get('docx_result', {})
-                    pdf_result = upload_result.get('pdf_result', {})
-                    
-                    # Build full URLs
-                    if docx_result:
-                        docx_url = f"https://{DOMAIN}/app/index.do#storage/files/1{docx_result.get('path', '')}"
-                        doc_urls['docx_url'] = docx_url
-                    
-                    if pdf_result:
-                        pdf_url = f"https://{DOMAIN}/app/index.do#storage/files/1{pdf_result.get('path', '')}"
-                        doc_urls['pdf_url'] = pdf_url
-                
-                document_generation_results.append({
-                    'row_index': matched_row['row_index'],
-                    'product_code': matched_row['row_data']['product_code'],
-                    'generation_result': generation_result,
-                    'doc_urls': doc_urls
-                })
-                
-                # Add to generated docs URLs list
-                if doc_urls:
-                    generated_docs_urls.append({
+            budget = available
+            fitting_rows = []
+            deferred_generations = set()
+            for matched_row, cost in zip(matched_status_report, row_costs):
+                # A row that shares its document with a deferred row is deferred with it
+                content_key = generation_content_key(matched_row)
+                if cost <= budget and content_key not in deferred_generations:
+                    budget -= cost
+                    fitting_rows.append(matched_row)
+                else:
+                    deferred_generations.add(content_key)
+                    deferred_rows.append({
+                        'row_index': matched_row['row_index'],
                         'product_code': matched_row['row_data']['product_code'],
                         'section': matched_row['row_data']['section'],
-                        'docx_filename': generation_result.get('docx_filename'),
-                        'pdf_filename': generation_result.get('pdf_filename'),
-                        'docx_url': doc_urls.get('docx_url'),
-                        'pdf_url': doc_urls.get('pdf_url')
+                        'estimated_calls': cost
                     })
-                
-                logger.info(f"✅ Document {i+1} processed successfully")
-                
-            except Exception as e:
-                logger.error(f"❌ Error processing document {i+1}: {e}")
-                # Add error result to maintain consistency
-                document_generation_results.append({
-                    'row_index': matched_row['row_index'],
-                    'product_code': matched_row['row_data']['product_code'],
-                    'generation_result': {'success': False, 'error': str(e)},
-                    'doc_urls': {}
-                })
-            
-            # CRITICAL: Clean up memory after each document
-            logger.info(f"🧹 Cleaning up memory after document {i+1}")
-            cleanup_memory()
-            cleanup_temp_files()
-            
-            # Log memory after cleanup
-            log_memory_usage(f"after document {i+1} cleanup")
-            
-            # Small delay to allow system to stabilize
-            time.sleep(1)
-        
-        # Create total match report
-        total_match_report = {
-            'campaign_summary': {
-                'total_requests': len(request_df),
-                'successful_matches': len(matched_status_report),
-                'unique_product_codes': unique_product_codes,
-                'processing_timestamp': timestamp_clean
-            },
-            'status_breakdown': summary_table,
-            'generated_documents': generated_docs_urls,
-            'detailed_results': document_generation_results
+            logger.warning(f"⏸️ Deferring {len(deferred_rows)} rows that do not fit in today's Egnyte quota")
+            matched_status_report = fitting_rows
+        
+        plan = {
+            'total_requests': len(request_df),
+            'matched_count': matched_count,
+            'unique_product_codes': unique_product_codes,
+            'timestamp': timestamp_clean,
+            'summary_table': summary_table,
+            'estimated_calls': estimated_calls,
+            'deferred_rows': deferred_rows,
+            'templates_source': templates_source,
+            'source_docs_source': source_docs_source,
+            'matched_rows': matched_status_report,
+            'generation_groups': group_generation_rows(matched_status_report)
         }
+        dedupe = generation_dedupe_summary(matched_status_report, plan['generation_groups'])
+        if dedupe['llm_calls_saved']:
+            logger.info(f"♻️ {dedupe['rows']} matched rows need only {dedupe['unique_generations']} generations")
+        
+        # ?mode=sync keeps the old behaviour: generate inline and return the report (small requests only)
+        if request.args.get('mode') == 'sync':
+            logger.info(f"🔄 Starting inline document generation for {len(matched_status_report)} matched rows")
+            results = [None] * len(matched_status_report)
+            for group in plan['generation_groups']:
+                detailed, generated_doc = generate_bulk_row(matched_status_report[group[0]], group[0], len(matched_status_report))
+                for position, row_detailed, row_doc in fan_out_generation(matched_status_report, group, detailed, generated_doc):
+                    results[position] = (row_detailed, row_doc)
+            total_match_report = build_total_match_report(
+                plan, [detailed for detailed, _ in results], [doc for _, doc in results if doc]
+            )
+            return jsonify({
+                "status": "success", 
+                "message": "Bulk request processed successfully",
+                "total_match_report": total_match_report
+            }), 200
+        
+        job_id = uuid.uuid4().hex
+        job_rows = [
+            (matched_row['row_index'], matched_row['row_data']['product_code'], matched_row['row_data']['section'], "queued")
+            for matched_row in matched_status_report
+        ] + [
+            (deferred['row_index'], deferred['product_code'], deferred['section'], "deferred")
+            for deferred in deferred_rows
+        ]
+        bulk_job_store.create(job_id, job_rows)
+        thread = threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(run_bulk_job, job_id, plan),
+            name=f"bulk-job-{job_id[:8]}",
+            daemon=True
+        )
+        thread.start()
+        logger.info(f"🚀 Queued bulk job {job_id} with {len(matched_status_report)} rows to generate")
         
         return jsonify({
-            "status": "success", 
-            "message": "Bulk request processed successfully",
-            "total_match_report": total_match_report
-        }), 200
+            "status": "accepted",
+            "message": f"Bulk job queued: {len(matched_status_report)} documents to generate",
+            "job_id": job_id,
+            "rows_to_generate": len(matched_status_report),
+            "unique_generations": len(plan['generation_groups']),
+            "deferred_rows": len(deferred_rows),
+            "status_breakdown": summary_table,
+            "poll_url": f"/reg-docs-bulk-status/{job_id}"
+        }), 202
         
     except Exception as e:
         logger.error(f"Error in reg_docs_bulk_request: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/reg-docs-bulk-status/<job_id>', methods=['GET'])
+def reg_docs_bulk_status(job_id):
+    """Report a bulk job's status, per-row progress and, once completed, its total_match_report"""
+    try:
+        job = bulk_job_store.get(job_id, include_rows=request.args.get('rows', 'true').lower() != 'false')
+        if job is None:
+            return jsonify({
+                "status": "not_found",
+                "message": "No bulk job found with this id",
+                "job_id": job_id
+            }), 404
+        return jsonify(job)
+    except Exception as e:
+        logger.error(f"Error in reg_docs_bulk_status: {e}")
+        return jsonify({"error": str(e)}), 500
+
 # Modular Functions for Document Processing Workflow
 
 def load_prompt_from_file():
@@ -2386,30 +4404,199 @@ Please draft the section now, substituting the actual composition data in Table
         logger.error(f"Error loading prompt: {e}")
         return None
 
-def download_egnyte_file_to_temp(access_token, file_id, file_extension='.tmp', file_path=None):
-    """Download a file from Egnyte to a temporary file"""
+# On-disk blob cache for downloaded templates and source documents, shared by all workers
+EGNYTE_BLOB_CACHE_DIR = os.getenv('EGNYTE_BLOB_CACHE_DIR', 'egnyte_blob_cache')
+EGNYTE_BLOB_CACHE_MAX_BYTES = int(os.getenv('EGNYTE_BLOB_CACHE_MAX_BYTES', str(1024 * 1024 * 1024)))   # LRU evicted above this
+
+class EgnyteBlobCache:
+    """
+    Content-addressed file cache keyed by Egnyte entry_id plus the listing's checksum or last_modified.
+    
+    A changed file gets a new key, so cached blobs never need invalidating. Blobs are written to a
+    temp name and os.replace()d into place, and recency is the file mtime, so several processes can
+    share one directory.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._evictions = 0
+
+    @staticmethod
+    def blob_key(entry_id, version):
+        """Cache key for one version of an Egnyte file, or None when the version is unknown"""
+        if not entry_id or not version:
+            return None
+        return hashlib.sha256(f"{entry_id}:{version}".encode('utf-8')).hexdigest()
+
+    def _blob_path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def fetch(self, key, destination):
+        """Copy a cached blob to destination (hard link when possible); return True on a hit"""
+        blob_path = self._blob_path(key)
+        try:
+            try:
+                os.link(blob_path, destination)
+            except OSError:
+                if not os.path.exists(blob_path):
+                    raise FileNotFoundError(blob_path)
+                shutil.copyfile(blob_path, destination)
+            os.utime(blob_path)   # mark as recently used
+        except FileNotFoundError:
+            with self._lock:
+                self._misses += 1
+            return False
+        with self._lock:
+            self._hits += 1
+        return True
+
+    def open(self, key):
+        """Open a cached blob for reading (counts as a lookup); None on a miss"""
+        blob_path = self._blob_path(key)
+        try:
+            blob = open(blob_path, 'rb')   # an open handle survives a concurrent eviction
+            os.utime(blob_path)
+        except FileNotFoundError:
+            with self._lock:
+                self._misses += 1
+            return None
+        with self._lock:
+            self._hits += 1
+        return blob
+
+    def contains(self, key):
+        """Whether a blob is cached, without counting a lookup"""
+        return bool(key) and os.path.exists(self._blob_path(key))
+
+    def store(self, key, source_path):
+        """Atomically add a downloaded file to the cache, then evict least recently used blobs"""
+        blob_path = self._blob_path(key)
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        fd, staging_path = tempfile.mkstemp(dir=os.path.dirname(blob_path), suffix='.part')
+        os.close(fd)
+        try:
+            shutil.copyfile(source_path, staging_path)
+            os.replace(staging_path, blob_path)
+        finally:
+            if os.path.exists(staging_path):
+                os.unlink(staging_path)
+        with self._lock:
+            self._stores += 1
+        self.evict()
+
+    def _blobs(self):
+        """(mtime, size, path) for every complete blob in the cache directory"""
+        blobs = []
+        if not os.path.isdir(self.directory):
+            return blobs
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.part'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                blobs.append((st.st_mtime, st.st_size, path))
+        return blobs
+
+    def evict(self):
+        """Delete least recently used blobs until the cache fits in max_bytes"""
+        blobs = sorted(self._blobs())
+        total = sum(size for _, size, _ in blobs)
+        removed = 0
+        for _, size, path in blobs:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+                removed += 1
+            except FileNotFoundError:
+                pass   # another worker evicted it first
+            total -= size
+        with self._lock:
+            self._evictions += removed
+        return removed
+
+    def clear(self):
+        """Remove every cached blob and return how many were deleted"""
+        removed = 0
+        for _, _, path in self._blobs():
+            try:
+                os.unlink(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def stats(self):
+        """Return a snapshot of cache usage"""
+        blobs = self._blobs()
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "directory": self.directory,
+                "max_bytes": self.max_bytes,
+                "blobs": len(blobs),
+                "bytes": sum(size for _, size, _ in blobs),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "stores": self._stores,
+                "evictions": self._evictions
+            }
+
+egnyte_blob_cache = EgnyteBlobCache(EGNYTE_BLOB_CACHE_DIR, EGNYTE_BLOB_CACHE_MAX_BYTES)
+
+def download_egnyte_file_to_temp(access_token, file_id, file_extension='.tmp', file_path=None, expected_checksum=None,
+                                 last_modified=None):
+    """
+    Put an Egnyte file into a temporary file and return its path.
+    
+    Served from the blob cache when the listing's checksum or last_modified is known; otherwise
+    (and on a cache miss) streamed from Egnyte straight to disk.
+    """
+    temp_file = None
     try:
         logger.info(f"Attempting to download file {file_id} with extension {file_extension}")
         if file_path:
             logger.info(f"File path available: {file_path}")
         
-        # Download file content
-        file_content = download_egnyte_file(access_token, file_id, file_path)
-        if not file_content:
-            logger.error(f"download_egnyte_file returned None for file_id: {file_id}")
-            return None
-        
-        logger.info(f"Successfully downloaded {len(file_content)} bytes for file_id: {file_id}")
-        
-        # Create temporary file
+        cache_key = EgnyteBlobCache.blob_key(file_id, expected_checksum or last_modified)
         temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=file_extension)
-        temp_file.write(file_content)
         temp_file.close()
         
+        if cache_key:
+            os.unlink(temp_file.name)
+            if egnyte_blob_cache.fetch(cache_key, temp_file.name):
+                logger.info(f"Blob cache hit for file_id: {file_id}, no download needed")
+                return temp_file.name
+        
+        # Stream to disk so memory use does not grow with the document size
+        with open(temp_file.name, 'wb') as sink:
+            download_info = stream_egnyte_file(access_token, file_id, sink, file_path,
+                                               expected_checksum=expected_checksum)
+        
+        logger.info(f"Successfully downloaded {download_info['size']} bytes for file_id: {file_id}")
         logger.info(f"Created temporary file: {temp_file.name}")
+        
+        # Only cache content that matches the listing it is keyed by
+        if cache_key and (not expected_checksum or expected_checksum.lower() == download_info['checksum']):
+            try:
+                egnyte_blob_cache.store(cache_key, temp_file.name)
+            except OSError as e:
+                logger.warning(f"Could not add file {file_id} to blob cache: {e}")
         return temp_file.name
     except Exception as e:
         logger.error(f"Error downloading file to temp: {e}")
+        if temp_file and os.path.exists(temp_file.name):
+            os.unlink(temp_file.name)
         return None
 
 def upload_files_prompt_to_openai(prompt: str, template_path: str, source_document_path: str) -> str:
@@ -2466,7 +4653,7 @@ def upload_files_prompt_to_openai(prompt: str, template_path: str, source_docume
         # Upload template file
         logger.info("Uploading template file to OpenAI...")
         with open(template_file_path, 'rb') as file:
-            template_file = client.files.create(
+            template_file = openai_call(client, client.files.create,
                 file=file,
                 purpose='user_data'
             )
@@ -2476,7 +4663,7 @@ def upload_files_prompt_to_openai(prompt: str, template_path: str, source_docume
         # Upload source document file
         logger.info("Uploading source document file to OpenAI...")
         with open(source_file_path, 'rb') as file:
-            source_file = client.files.create(
+            source_file = openai_call(client, client.files.create,
                 file=file,
                 purpose='user_data'
             )
@@ -2485,7 +4672,7 @@ def upload_files_prompt_to_openai(prompt: str, template_path: str, source_docume
         
         # Generate document using OpenAI Responses API
         logger.info("Generating document with OpenAI...")
-        response = client.responses.create(
+        response = openai_call(client, client.responses.create,
             model="gpt-4o",
             input=[
                 {
@@ -2561,8 +4748,8 @@ Please generate the complete document content in HTML format based on the templa
         # Clean up uploaded files
         logger.info("Cleaning up uploaded files...")
         try:
-            client.files.delete(template_file_id)
-            client.files.delete(source_file_id)
+            openai_call(client, client.files.delete, template_file_id)
+            openai_call(client, client.files.delete, source_file_id)
             logger.info("SUCCESS: Uploaded files cleaned up")
         except Exception as e:
             logger.warning(f"Warning: Could not delete uploaded files: {e}")
@@ -2645,7 +4832,7 @@ def upload_files_prompt_to_azure_openai(prompt: str, template_path: str, source_
         # Upload template file
         logger.info("Uploading template file to OpenAI...")
         with open(template_file_path, 'rb') as file:
-            template_file = client.files.create(
+            template_file = openai_call(client, client.files.create,
                 file=file,
                 purpose='user_data'
             )
@@ -2655,7 +4842,7 @@ def upload_files_prompt_to_azure_openai(prompt: str, template_path: str, source_
         # Upload source document file
         logger.info("Uploading source document file to Azure OpenAI...")
         with open(source_file_path, 'rb') as file:
-            source_file = client.files.create(
+            source_file = openai_call(client, client.files.create,
                 file=file,
                 purpose='user_data'
             )
@@ -2664,7 +4851,7 @@ def upload_files_prompt_to_azure_openai(prompt: str, template_path: str, source_
         
         # Generate document using Azure OpenAI Responses API
         logger.info("Generating document with Azure OpenAI...")
-        response = client.responses.create(
+        response = openai_call(client, client.responses.create,
             model="gpt-4.1",                                         # May need to modify
             input=[
                 {
@@ -2740,8 +4927,8 @@ Please generate the complete document content in HTML format based on the templa
         # Clean up uploaded files
         logger.info("Cleaning up uploaded files...")
         try:
-            client.files.delete(template_file_id)
-            client.files.delete(source_file_id)
+            openai_call(client, client.files.delete, template_file_id)
+            openai_call(client, client.files.delete, source_file_id)
             logger.info("SUCCESS: Uploaded files cleaned up")
         except Exception as e:
             logger.warning(f"Warning: Could not delete uploaded files: {e}")
@@ -3155,15 +5342,13 @@ def convert_html_to_docx(html_content, output_path):
 def upload_generated_files_to_egnyte(access_token, docx_path, pdf_path, folder_id):
     """Upload generated files to Egnyte"""
     try:
-        # Upload DOCX file
+        # Upload DOCX file, streaming from the open handle
         with open(docx_path, 'rb') as docx_file:
-            docx_content = docx_file.read()
-            docx_result = upload_file_to_egnyte(access_token, folder_id, os.path.basename(docx_path), docx_content)
+            docx_result = upload_file_to_egnyte(access_token, folder_id, os.path.basename(docx_path), docx_file)
         
         # Upload PDF file
         with open(pdf_path, 'rb') as pdf_file:
-            pdf_content = pdf_file.read()
-            pdf_result = upload_file_to_egnyte(access_token, folder_id, os.path.basename(pdf_path), pdf_content)
+            pdf_result = upload_file_to_egnyte(access_token, folder_id, os.path.basename(pdf_path), pdf_file)
         
         return {
             'docx_uploaded': docx_result is not None,
@@ -3176,168 +5361,237 @@ def upload_generated_files_to_egnyte(access_token, docx_path, pdf_path, folder_i
         logger.error(f"Error uploading files to Egnyte: {e}")
         return None
 
-def process_document_generation(matched_row):
-    """Main function to process document generation for a matched row"""
-    try:
-        logger.info("=" * 80)
-        logger.info("STARTING DOCUMENT GENERATION PROCESS")
-        logger.info("=" * 80)
-        logger.info(f"Processing row: {matched_row.get('row_index')}")
-        logger.info(f"Product code: {matched_row.get('row_data', {}).get('product_code')}")
-        logger.info(f"Section: {matched_row.get('row_data', {}).get('section')}")
-        
-        # Get Egnyte access token
-        logger.info("Step 1: Getting Egnyte access token...")
-        access_token = get_egnyte_token()
-        if not access_token:
-            logger.error("FAILED: Could not get Egnyte access token due to rate limiting")
-            return {"error": "Failed to get Egnyte access token - rate limit exceeded. Please try again in 10-15 minutes."}
-        logger.info("SUCCESS: Egnyte access token obtained")
-        
-        # Step 2: Load prompt
-        logger.info("Step 2: Loading prompt from demo_prompt.py...")
-        prompt = load_prompt_from_file()
-        if not prompt:
-            logger.error("FAILED: Could not load prompt from demo_prompt.py")
-            return {"error": "Failed to load prompt"}
-        logger.info(f"SUCCESS: Prompt loaded ({len(prompt)} characters)")
-        
-        # Step 3: Download template and source documents
-        logger.info("Step 3: Downloading template and source documents...")
-        template_file = matched_row['matching_template']
-        source_file = matched_row['matching_source_document']
-        
-        if not template_file:
-            logger.error("FAILED: No template file found in matched_row")
-            return {"error": "No template file found"}
-        
-        if not source_file:
-            logger.error("FAILED: No source document found in matched_row")
-            return {"error": "No source document found"}
-        
-        logger.info(f"Template file: {template_file.get('name')} (ID: {template_file.get('entry_id')})")
-        logger.info(f"Source file: {source_file.get('name')} (ID: {source_file.get('entry_id')})")
-        
-        # Download template file
-        template_temp_path = download_egnyte_file_to_temp(access_token, template_file['entry_id'], '.docx', template_file.get('path'))
-        if not template_temp_path:
-            logger.error("FAILED: Could not download template file to temp location")
-            return {"error": "Failed to download template file"}
-        logger.info(f"SUCCESS: Template downloaded to {template_temp_path}")
-        
-        # Download source document
-        source_temp_path = download_egnyte_file_to_temp(access_token, source_file['entry_id'], '.pdf', source_file.get('path'))
-        if not source_temp_path:
-            logger.error("FAILED: Could not download source document to temp location")
-            return {"error": "Failed to download source document"}
-        logger.info(f"SUCCESS: Source document downloaded to {source_temp_path}")
-        
-        # Step 4: Generate document using the new upload_files_prompt_to_openai function
-        logger.info("Step 4: Generating document with OpenAI file upload...")
-
-        # set the function to upload a prompt based on what deployment of an llm we are using
-        upload_func = upload_files_prompt_to_azure_openai if MODEL_TYPE == 'azure' else upload_files_prompt_to_openai
+# Document generation is split into stages so bulk jobs can pipeline them (see pipeline.py):
+# Egnyte downloads -> LLM -> DOCX/PDF conversion -> Egnyte upload. Each stage reads and writes
+# an item dict; setting item['result'] ends the item early. process_document_generation runs
+# the same stages back to back for a single row.
+_output_names = {}
+_output_names_lock = threading.Lock()
+
+def _claim_output_basename(product_code):
+    """'<product>_regulatory_doc_<timestamp>', suffixed when a concurrent row already took the same second"""
+    base = f"{product_code}_regulatory_doc_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    with _output_names_lock:
+        now = time.time()
+        for name, claimed_at in list(_output_names.items()):
+            if now - claimed_at > 120:
+                del _output_names[name]
+        candidate, n = base, 1
+        while candidate in _output_names:
+            n += 1
+            candidate = f"{base}_{n}"
+        _output_names[candidate] = now
+    return candidate
+
+def generation_stage_download(item):
+    """Stage 1 (Egnyte I/O): token, prompt, and the template and source documents in temp files"""
+    matched_row = item['matched_row']
+    logger.info("=" * 80)
+    logger.info("STARTING DOCUMENT GENERATION PROCESS")
+    logger.info("=" * 80)
+    logger.info(f"Processing row: {matched_row.get('row_index')}")
+    logger.info(f"Product code: {matched_row.get('row_data', {}).get('product_code')}")
+    logger.info(f"Section: {matched_row.get('row_data', {}).get('section')}")
+    
+    # Skip the remaining rows quickly once a backend they need has tripped its breaker
+    open_breaker = open_backend_breaker(*generation_breakers())
+    if open_breaker:
+        logger.warning(f"⚡ Skipping row {matched_row.get('row_index')}: {open_breaker.name} circuit is open")
+        item['result'] = {
+            'success': False,
+            'error': f"{open_breaker.name} unavailable (circuit open), retry in {open_breaker.retry_in():.0f}s",
+            'error_code': 'BACKEND_UNAVAILABLE'
+        }
+        return
+    
+    # Get Egnyte access token
+    logger.info("Step 1: Getting Egnyte access token...")
+    access_token = get_egnyte_token()
+    if not access_token:
+        logger.error("FAILED: Could not get Egnyte access token due to rate limiting")
+        item['result'] = {"error": "Failed to get Egnyte access token - rate limit exceeded. Please try again in 10-15 minutes."}
+        return
+    item['access_token'] = access_token
+    logger.info("SUCCESS: Egnyte access token obtained")
+    
+    # Step 2: Load prompt
+    logger.info("Step 2: Loading prompt from demo_prompt.py...")
+    prompt = load_prompt_from_file()
+    if not prompt:
+        logger.error("FAILED: Could not load prompt from demo_prompt.py")
+        item['result'] = {"error": "Failed to load prompt"}
+        return
+    item['prompt'] = prompt
+    logger.info(f"SUCCESS: Prompt loaded ({len(prompt)} characters)")
+    
+    # Step 3: Download template and source documents
+    logger.info("Step 3: Downloading template and source documents...")
+    template_file = matched_row['matching_template']
+    source_file = matched_row['matching_source_document']
+    
+    if not template_file:
+        logger.error("FAILED: No template file found in matched_row")
+        item['result'] = {"error": "No template file found"}
+        return
+    
+    if not source_file:
+        logger.error("FAILED: No source document found in matched_row")
+        item['result'] = {"error": "No source document found"}
+        return
+    
+    logger.info(f"Template file: {template_file.get('name')} (ID: {template_file.get('entry_id')})")
+    logger.info(f"Source file: {source_file.get('name')} (ID: {source_file.get('entry_id')})")
+    
+    # Temp files are removed by cleanup_generation_files, whatever happens to the item later
+    item['template_temp_path'] = download_egnyte_file_to_temp(access_token, template_file['entry_id'], '.docx', template_file.get('path'),
+                                                              template_file.get('checksum'), template_file.get('last_modified'))
+    if not item['template_temp_path']:
+        logger.error("FAILED: Could not download template file to temp location")
+        item['result'] = {"error": "Failed to download template file"}
+        return
+    logger.info(f"SUCCESS: Template downloaded to {item['template_temp_path']}")
+    
+    item['source_temp_path'] = download_egnyte_file_to_temp(access_token, source_file['entry_id'], '.pdf', source_file.get('path'),
+                                                            source_file.get('checksum'), source_file.get('last_modified'))
+    if not item['source_temp_path']:
+        logger.error("FAILED: Could not download source document to temp location")
+        item['result'] = {"error": "Failed to download source document"}
+        return
+    logger.info(f"SUCCESS: Source document downloaded to {item['source_temp_path']}")
 
+def generation_stage_llm(item):
+    """Stage 2 (LLM): generate the DOCX from the prompt, template and source document"""
+    logger.info("Step 4: Generating document with OpenAI file upload...")
+    
+    # set the function to upload a prompt based on what deployment of an llm we are using
+    upload_func = upload_files_prompt_to_azure_openai if MODEL_TYPE == 'azure' else upload_files_prompt_to_openai
+    
+    try:
         docx_content = upload_func(
-            prompt=prompt,
-            template_path=template_temp_path,
-            source_document_path=source_temp_path
+            prompt=item['prompt'],
+            template_path=item['template_temp_path'],
+            source_document_path=item['source_temp_path']
         )
-        
-        # Clean up downloaded temp files
-        logger.info("Cleaning up downloaded temp files...")
-        os.unlink(template_temp_path)
-        os.unlink(source_temp_path)
+    finally:
+        # The downloads are not needed after this point
+        _remove_generation_downloads(item)
         logger.info("Downloaded temp files cleaned up")
-        
-        # Memory cleanup after OpenAI processing
-        logger.info("🧹 Cleaning up memory after OpenAI processing...")
-        cleanup_memory()
-        
-        if not docx_content:
-            logger.error("FAILED: Could not generate document with OpenAI")
-            return {"error": "Failed to generate document"}
-        logger.info(f"SUCCESS: Document generated ({len(docx_content)} bytes)")
-        
-        # Step 5: Create output files
-        logger.info("Step 5: Creating output files...")
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        product_code = matched_row['row_data']['product_code']
-        docx_filename = f"{product_code}_regulatory_doc_{timestamp}.docx"
-        pdf_filename = f"{product_code}_regulatory_doc_{timestamp}.pdf"
-        
-        docx_path = os.path.join(tempfile.gettempdir(), docx_filename)
-        pdf_path = os.path.join(tempfile.gettempdir(), pdf_filename)
-        
-        logger.info(f"DOCX path: {docx_path}")
-        logger.info(f"PDF path: {pdf_path}")
-        
-        # Save DOCX content to file
-        with open(docx_path, 'wb') as f:
-            f.write(docx_content)
-        logger.info("SUCCESS: DOCX file created")
-        
-        # Convert DOCX to PDF
-        logger.info("Converting DOCX to PDF...")
-        pdf_success = convert_docx_to_pdf_for_upload(docx_path)
-        if pdf_success and os.path.exists(pdf_success):
-            # Move the PDF to the expected location
-            import shutil
-            shutil.move(pdf_success, pdf_path)
-            logger.info("SUCCESS: PDF file created")
-        else:
-            logger.error("FAILED: Could not convert DOCX to PDF")
-            return {"error": "Failed to convert to PDF"}
-        
-        # Memory cleanup after PDF conversion
-        logger.info("🧹 Cleaning up memory after PDF conversion...")
-        cleanup_memory()
-        
-        # Step 6: Upload to Egnyte
-        logger.info("Step 6: Uploading files to Egnyte...")
-        
-        # Find the target folder dynamically
-        molecule_code = matched_row['row_data'].get('molecule_code', 'THPG001')
-        campaign_number = matched_row['row_data'].get('campaign_number', '4')
-        
-        logger.info(f"Looking for target folder for molecule: {molecule_code}, campaign: {campaign_number}")
-        target_folder_id = find_egnyte_target_folder(access_token, molecule_code, campaign_number)
-        
-        if not target_folder_id:
-            logger.warning("Could not find target folder, using fallback folder")
-            # Fallback to a known folder - you might want to update this
-            target_folder_id = "4a85f5e6-bb31-4bd1-b011-6fc75bdcb2d7"
-        
-        logger.info(f"Target folder ID: {target_folder_id}")
-        
-        upload_result = upload_generated_files_to_egnyte(access_token, docx_path, pdf_path, target_folder_id)
-        
-        # Clean up temp files
-        logger.info("Cleaning up temporary files...")
-        os.unlink(docx_path)
-        os.unlink(pdf_path)
+    
+    if not docx_content:
+        logger.error("FAILED: Could not generate document with OpenAI")
+        item['result'] = {"error": "Failed to generate document"}
+        return
+    item['docx_content'] = docx_content
+    logger.info(f"SUCCESS: Document generated ({len(docx_content)} bytes)")
+
+def generation_stage_convert(item):
+    """Stage 3 (CPU): write the DOCX and convert it to PDF"""
+    logger.info("Step 5: Creating output files...")
+    product_code = item['matched_row']['row_data']['product_code']
+    basename = _claim_output_basename(product_code)
+    docx_filename = f"{basename}.docx"
+    pdf_filename = f"{basename}.pdf"
+    
+    # A private directory per item so concurrent rows never share a temp path
+    item['work_dir'] = tempfile.mkdtemp(prefix="regdoc_")
+    docx_path = os.path.join(item['work_dir'], docx_filename)
+    pdf_path = os.path.join(item['work_dir'], pdf_filename)
+    
+    logger.info(f"DOCX path: {docx_path}")
+    logger.info(f"PDF path: {pdf_path}")
+    
+    # Save DOCX content to file
+    with open(docx_path, 'wb') as f:
+        f.write(item.pop('docx_content'))
+    logger.info("SUCCESS: DOCX file created")
+    
+    # Convert DOCX to PDF
+    logger.info("Converting DOCX to PDF...")
+    pdf_success = convert_docx_to_pdf_for_upload(docx_path)
+    if pdf_success and os.path.exists(pdf_success):
+        # Move the PDF to the expected location
+        shutil.move(pdf_success, pdf_path)
+        logger.info("SUCCESS: PDF file created")
+    else:
+        logger.error("FAILED: Could not convert DOCX to PDF")
+        item['result'] = {"error": "Failed to convert to PDF"}
+        return
+    
+    item.update(docx_filename=docx_filename, pdf_filename=pdf_filename, docx_path=docx_path, pdf_path=pdf_path)
+
+def generation_stage_upload(item):
+    """Stage 4 (Egnyte I/O): find the campaign's reg doc folder and upload the DOCX and PDF"""
+    logger.info("Step 6: Uploading files to Egnyte...")
+    access_token = item['access_token']
+    row_data = item['matched_row']['row_data']
+    
+    # Find the target folder dynamically
+    molecule_code = row_data.get('molecule_code', 'THPG001')
+    campaign_number = row_data.get('campaign_number', '4')
+    
+    logger.info(f"Looking for target folder for molecule: {molecule_code}, campaign: {campaign_number}")
+    target_folder_id = find_egnyte_target_folder(access_token, molecule_code, campaign_number)
+    
+    if not target_folder_id:
+        logger.warning("Could not find target folder, using fallback folder")
+        # Fallback to a known folder - you might want to update this
+        target_folder_id = "4a85f5e6-bb31-4bd1-b011-6fc75bdcb2d7"
+    
+    logger.info(f"Target folder ID: {target_folder_id}")
+    
+    upload_result = upload_generated_files_to_egnyte(access_token, item['docx_path'], item['pdf_path'], target_folder_id)
+    if upload_result and not upload_result['docx_uploaded'] and not upload_result['pdf_uploaded']:
+        # The indexed folder may have been moved or deleted; force a fresh walk next time
+        remove_indexed_folder(molecule_code, '', REG_DOC_NODE)
+    
+    if not upload_result:
+        logger.error("FAILED: Could not upload files to Egnyte")
+        item['result'] = {"error": "Failed to upload files to Egnyte"}
+        return
+    
+    logger.info(f"SUCCESS: Files uploaded to Egnyte - {upload_result}")
+    logger.info("=" * 80)
+    logger.info("DOCUMENT GENERATION PROCESS COMPLETED SUCCESSFULLY")
+    logger.info("=" * 80)
+    
+    item['result'] = {
+        "success": True,
+        "docx_filename": item['docx_filename'],
+        "pdf_filename": item['pdf_filename'],
+        "upload_result": upload_result
+    }
+
+GENERATION_STAGES = [
+    ("download", generation_stage_download),
+    ("llm", generation_stage_llm),
+    ("convert", generation_stage_convert),
+    ("upload", generation_stage_upload)
+]
+
+def _remove_generation_downloads(item):
+    for key in ('template_temp_path', 'source_temp_path'):
+        path = item.pop(key, None)
+        if path and os.path.exists(path):
+            os.unlink(path)
+
+def cleanup_generation_files(item):
+    """Delete whatever temp files an item still holds (downloads and its output directory)"""
+    _remove_generation_downloads(item)
+    item.pop('docx_content', None)
+    work_dir = item.pop('work_dir', None)
+    if work_dir:
+        shutil.rmtree(work_dir, ignore_errors=True)
         logger.info("Temporary files cleaned up")
-        
-        # Final memory cleanup after upload
-        logger.info("🧹 Final memory cleanup after upload...")
-        cleanup_memory()
-        cleanup_temp_files()
-        
-        if not upload_result:
-            logger.error("FAILED: Could not upload files to Egnyte")
-            return {"error": "Failed to upload files to Egnyte"}
-        
-        logger.info(f"SUCCESS: Files uploaded to Egnyte - {upload_result}")
-        logger.info("=" * 80)
-        logger.info("DOCUMENT GENERATION PROCESS COMPLETED SUCCESSFULLY")
-        logger.info("=" * 80)
-        
-        return {
-            "success": True,
-            "docx_filename": docx_filename,
-            "pdf_filename": pdf_filename,
-            "upload_result": upload_result
-        }
+
+def process_document_generation(matched_row):
+    """Main function to process document generation for a matched row (all stages, one after another)"""
+    item = {'matched_row': matched_row}
+    try:
+        for _, stage in GENERATION_STAGES:
+            stage(item)
+            if 'result' in item:
+                break
+        return item['result']
         
     except Exception as e:
         logger.error("=" * 80)
@@ -3350,6 +5604,20 @@ def process_document_generation(matched_row):
         logger.error(f"Full traceback:\n{traceback.format_exc()}")
         logger.error("=" * 80)
         return {"error": str(e)}
+    finally:
+        cleanup_generation_files(item)
+
+def _finish_bulk_generation(item):
+    cleanup_generation_files(item)
+    cleanup_memory()
+    cleanup_temp_files()
+
+# Shared by every bulk job in this process; threads start with the first submitted item
+bulk_generation_pipeline = StagedPipeline("bulk-generation", [
+    {"name": name, "func": func, "workers": workers, "queue_size": BULK_PIPELINE_QUEUE_SIZE}
+    for (name, func), workers in zip(GENERATION_STAGES, (BULK_DOWNLOAD_WORKERS, BULK_LLM_WORKERS,
+                                                         BULK_CONVERT_WORKERS, BULK_UPLOAD_WORKERS))
+], finalize=_finish_bulk_generation)
 
 # Memory management functions
 import gc
@@ -0,0 +1,181 @@
+"""
+Declarative project/campaign folder tree and a backend-agnostic diff-and-apply planner.
+
+The tree is plain data (see campaign_folder_spec). plan_folder_tree lists only folders that
+already exist, one listing per existing parent, to find what is missing; apply_folder_plan
+then creates the missing folders level by level (breadth-first), optionally in parallel.
+Both take the storage calls as arguments so Egnyte (flask_api) and Google Drive (app.py)
+share the same tree and logic.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+# Folder names used by every campaign
+CAMPAIGN_PHASES = ["Pre", "Post"]
+CAMPAIGN_DEPARTMENTS = ["mfg", "Anal", "Stability", "CTM"]
+FOLDER_STATUSES = ["Draft", "Review", "Approved"]
+REG_DOC_FOLDER_NAME = "Draft AI Reg Document"
+REG_DOC_TYPES = ["IND", "IMPD", "Canada"]
+
+# Logical node names stored in the Egnyte folder index. Project-level nodes (the project folder
+# and the Draft AI Reg Document tree) use an empty campaign number because they are shared by
+# every campaign of a molecule.
+PROJECT_NODE = "project"
+CAMPAIGN_NODE = "campaign"
+REG_DOC_NODE = "reg_doc"
+
+
+def folder_node(name, children=(), index=None):
+    """One folder in a spec: its name, child nodes and optional (campaign_number, node) index key"""
+    return {"name": name, "children": list(children), "index": index}
+
+
+def project_folder_name(molecule_code):
+    return f"Project; Molecule {molecule_code}"
+
+
+def campaign_folder_name(molecule_code, campaign_number):
+    return f"Project {molecule_code} (Campaign #{campaign_number})"
+
+
+def campaign_folder_spec(molecule_code, campaign_number):
+    """The full folder tree for one campaign, as the list of nodes under the root folder"""
+    campaign = str(campaign_number)
+    phases = [
+        folder_node(phase, [
+            folder_node(dept, [
+                folder_node(status, index=(campaign, f"{phase}/{dept}/{status}"))
+                for status in FOLDER_STATUSES
+            ], index=(campaign, f"{phase}/{dept}"))
+            for dept in CAMPAIGN_DEPARTMENTS
+        ], index=(campaign, phase))
+        for phase in CAMPAIGN_PHASES
+    ]
+    reg_types = [
+        folder_node(reg_type, [
+            folder_node(status, index=('', f"{REG_DOC_NODE}/{reg_type}/{status}"))
+            for status in FOLDER_STATUSES
+        ], index=('', f"{REG_DOC_NODE}/{reg_type}"))
+        for reg_type in REG_DOC_TYPES
+    ]
+    return [
+        folder_node(project_folder_name(molecule_code), [
+            folder_node(campaign_folder_name(molecule_code, campaign), phases, index=(campaign, CAMPAIGN_NODE)),
+            folder_node(REG_DOC_FOLDER_NAME, reg_types, index=('', REG_DOC_NODE)),
+        ], index=('', PROJECT_NODE))
+    ]
+
+
+def count_folder_spec(spec):
+    """Total number of folders in a spec"""
+    return sum(1 + count_folder_spec(node["children"]) for node in spec)
+
+
+def _join(prefix, name):
+    return f"{prefix}/{name}" if prefix else name
+
+
+def _map(func, items, max_workers):
+    if max_workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(func, items))
+
+
+def plan_folder_tree(root_id, spec, list_children, id_key, max_workers=1):
+    """
+    Work out which folders of a spec already exist under root_id.
+
+    list_children(folder_id) must return {name: folder} for the sub-folders of a folder (or None
+    on failure, which raises RuntimeError). Only existing folders are listed: everything below a
+    missing folder is missing too.
+
+    Returns:
+        dict with 'existing' ({relative path: folder}) and 'missing' (entries with path, parent,
+        name, depth and node, ordered breadth-first)
+    """
+    existing = {}
+    missing = []
+    listings = 0
+
+    def mark_missing(nodes, prefix, depth):
+        for node in nodes:
+            path = _join(prefix, node["name"])
+            missing.append({"path": path, "parent": prefix, "name": node["name"], "depth": depth, "node": node})
+            mark_missing(node["children"], path, depth + 1)
+
+    frontier = [(root_id, "", spec, 0)]
+    while frontier:
+        results = _map(lambda entry: list_children(entry[0]), frontier, max_workers)
+        listings += len(frontier)
+        next_frontier = []
+        for (parent_id, prefix, children, depth), listing in zip(frontier, results):
+            if listing is None:
+                raise RuntimeError(f"Could not list folder '{prefix or root_id}'")
+            for node in children:
+                path = _join(prefix, node["name"])
+                folder = listing.get(node["name"])
+                if folder:
+                    existing[path] = folder
+                    if node["children"]:
+                        next_frontier.append((folder[id_key], path, node["children"], depth + 1))
+                else:
+                    mark_missing([node], prefix, depth)
+        frontier = next_frontier
+
+    missing.sort(key=lambda entry: entry["depth"])
+    return {"existing": existing, "missing": missing, "listings": listings}
+
+
+def apply_folder_plan(root_id, plan, create_folder, id_key, max_workers=1, on_level_done=None):
+    """
+    Create the missing folders of a plan breadth-first, one level at a time.
+
+    create_folder(parent_id, name) returns the new folder or None. Folders whose parent could
+    not be created are reported as failed without being attempted. on_level_done(created,
+    total) is called after each level for progress reporting.
+
+    Returns:
+        dict with 'folders' ({relative path: folder} for the whole tree), 'created' and 'failed'
+        (relative paths)
+    """
+    folders = dict(plan["existing"])
+    created = []
+    failed = []
+    total = len(plan["missing"])
+
+    levels = {}
+    for entry in plan["missing"]:
+        levels.setdefault(entry["depth"], []).append(entry)
+
+    for depth in sorted(levels):
+        runnable = []
+        for entry in levels[depth]:
+            parent_id = root_id if not entry["parent"] else (folders.get(entry["parent"]) or {}).get(id_key)
+            if parent_id:
+                runnable.append((parent_id, entry))
+            else:
+                failed.append(entry["path"])
+
+        results = _map(lambda item: create_folder(item[0], item[1]["name"]), runnable, max_workers)
+        for (_, entry), folder in zip(runnable, results):
+            if folder and folder.get(id_key):
+                folders[entry["path"]] = folder
+                created.append(entry["path"])
+            else:
+                failed.append(entry["path"])
+
+        if on_level_done:
+            on_level_done(len(created), total)
+
+    return {"folders": folders, "created": created, "failed": failed}
+
+
+def iter_indexed_folders(spec, folders, prefix=""):
+    """Yield (index_key, folder) for every node of the spec that has an index key and a folder"""
+    for node in spec:
+        path = _join(prefix, node["name"])
+        folder = folders.get(path)
+        if folder and node["index"]:
+            yield node["index"], folder
+        yield from iter_indexed_folders(node["children"], folders, path)
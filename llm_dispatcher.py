@@ -0,0 +1,190 @@
+"""
+Concurrency and rate budgets for LLM calls, per provider and deployment.
+
+LLMDispatcher.run(func, estimated_tokens) runs one API call in a slot. Calls wait in FIFO order
+until all of these hold:
+- a concurrency slot is free;
+- the requests-per-minute bucket has a request left;
+- the tokens-per-minute bucket covers the estimate;
+- no Retry-After pause is in force.
+Once the call returns, the token bucket is corrected with the real usage.
+
+The concurrency limit adapts with AIMD: every successful call raises it by 1/limit (about +1
+per round of calls), up to max_concurrency. A 429 halves it (at most once per cooldown, so one
+burst of 429s counts once) and pauses new calls for the Retry-After interval. Other failures
+(timeouts, 5xx) leave the limit where it is.
+
+Provider-specific parts (reading usage from a response, classifying a failure) are passed in as
+callables, so this module does not import any SDK.
+"""
+
+import collections
+import itertools
+import threading
+import time
+
+
+class LLMQueueTimeout(Exception):
+    """A call waited longer than the dispatcher's queue timeout for a slot or budget"""
+
+
+class _Bucket:
+    """Token bucket refilled continuously at capacity per minute; capacity 0 means unlimited"""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute or 0)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def refill(self, now):
+        if self.capacity:
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.capacity / 60.0)
+        self._updated = now
+
+    def seconds_until(self, amount):
+        if not self.capacity or self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) * 60.0 / self.capacity
+
+    def take(self, amount):
+        if self.capacity:
+            self.tokens -= amount
+
+    def adjust(self, amount):
+        """Charge (positive) or refund (negative) after the real cost is known"""
+        if self.capacity:
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class LLMDispatcher:
+    """Admit LLM calls under an adaptive concurrency limit and RPM/TPM budgets"""
+
+    def __init__(self, name, max_concurrency=4, rpm=0, tpm=0, min_concurrency=1, decrease_factor=0.5,
+                 cooldown=5.0, queue_timeout=600.0):
+        self.name = name
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.min_concurrency = max(1, min(int(min_concurrency), self.max_concurrency))
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.queue_timeout = queue_timeout
+        self._limit = float(self.max_concurrency)
+        self._requests = _Bucket(rpm)
+        self._tokens = _Bucket(tpm)
+        self._cond = threading.Condition()
+        self._tickets = itertools.count()
+        self._waiting = collections.deque()
+        self._active = 0
+        self._paused_until = 0.0
+        self._last_cut = 0.0
+        self._stats = {"calls": 0, "failed": 0, "throttled": 0, "limit_cuts": 0, "queue_timeouts": 0, "tokens_used": 0,
+                       "total_wait_seconds": 0.0, "max_wait_seconds": 0.0}
+
+    def _acquire(self, estimated_tokens):
+        # A single call larger than the whole per-minute budget may still go once the bucket is full
+        needed_tokens = min(estimated_tokens, self._tokens.capacity) if self._tokens.capacity else 0
+        started = time.monotonic()
+        deadline = started + self.queue_timeout
+        with self._cond:
+            ticket = next(self._tickets)
+            self._waiting.append(ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._requests.refill(now)
+                    self._tokens.refill(now)
+                    wait = None
+                    if self._waiting[0] == ticket and self._active < int(self._limit):
+                        wait = max(self._paused_until - now, self._requests.seconds_until(1),
+                                   self._tokens.seconds_until(needed_tokens))
+                        if wait <= 0:
+                            break
+                    if now >= deadline:
+                        self._stats["queue_timeouts"] += 1
+                        raise LLMQueueTimeout(f"{self.name}: no LLM capacity within {self.queue_timeout:.0f}s")
+                    self._cond.wait(timeout=min(wait if wait is not None else deadline - now, deadline - now))
+                self._waiting.popleft()
+                self._active += 1
+                self._requests.take(1)
+                self._tokens.take(needed_tokens)
+                waited = time.monotonic() - started
+                self._stats["total_wait_seconds"] += waited
+                self._stats["max_wait_seconds"] = max(self._stats["max_wait_seconds"], waited)
+                return needed_tokens
+            finally:
+                if ticket in self._waiting:
+                    self._waiting.remove(ticket)
+                self._cond.notify_all()
+
+    def _release(self, charged_tokens, actual_tokens, succeeded, throttled=False, retry_after=None):
+        """actual_tokens None keeps the estimate charged; 0 refunds it"""
+        with self._cond:
+            now = time.monotonic()
+            self._active -= 1
+            self._stats["calls"] += 1
+            if not succeeded:
+                self._stats["failed"] += 1
+            if actual_tokens is not None:
+                self._stats["tokens_used"] += actual_tokens
+                self._tokens.refill(now)
+                self._tokens.adjust(actual_tokens - charged_tokens)
+            if throttled:
+                self._stats["throttled"] += 1
+                if retry_after:
+                    self._paused_until = max(self._paused_until, now + retry_after)
+                if now - self._last_cut >= self.cooldown:
+                    self._limit = max(float(self.min_concurrency), self._limit * self.decrease_factor)
+                    self._last_cut = now
+                    self._stats["limit_cuts"] += 1
+            elif succeeded:
+                self._limit = min(float(self.max_concurrency), self._limit + 1.0 / self._limit)
+            self._cond.notify_all()
+
+    def run(self, func, estimated_tokens=0, tokens_used=None, failure_info=None):
+        """Run func() once admitted.
+
+        tokens_used(result) returns the real token count (or None). failure_info(exc) returns
+        (throttled, retry_after_seconds, tokens_used) for a failed call, with tokens_used 0 when
+        the provider did no work (refund the estimate) and None when it may have (keep it).
+        Exceptions from func are re-raised.
+        """
+        charged = self._acquire(estimated_tokens)
+        try:
+            result = func()
+        except Exception as e:
+            throttled, retry_after, used = False, None, None
+            if failure_info:
+                try:
+                    throttled, retry_after, used = failure_info(e)
+                except Exception:
+                    pass
+            self._release(charged, used, False, throttled, retry_after)
+            raise
+        actual = None
+        if tokens_used:
+            try:
+                actual = tokens_used(result)
+            except Exception:
+                actual = None
+        self._release(charged, actual, True)
+        return result
+
+    def stats(self):
+        with self._cond:
+            now = time.monotonic()
+            self._requests.refill(now)
+            self._tokens.refill(now)
+            stats = dict(self._stats)
+            stats.update({
+                "concurrency_limit": round(self._limit, 2),
+                "max_concurrency": self.max_concurrency,
+                "active": self._active,
+                "queued": len(self._waiting),
+                "rpm_budget": self._requests.capacity or None,
+                "rpm_available": round(self._requests.tokens, 1) if self._requests.capacity else None,
+                "tpm_budget": self._tokens.capacity or None,
+                "tpm_available": round(self._tokens.tokens) if self._tokens.capacity else None,
+                "paused_for_seconds": round(max(0.0, self._paused_until - now), 1),
+                "total_wait_seconds": round(stats["total_wait_seconds"], 3),
+                "max_wait_seconds": round(stats["max_wait_seconds"], 3)
+            })
+            return stats
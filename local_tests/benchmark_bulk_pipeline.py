@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark bulk document generation throughput (documents per minute) against the fake Egnyte server.
+
+Starts local_tests/fake_egnyte_server.py in-process and points flask_api at it. The LLM call is
+replaced by a stand-in that sleeps --llm-seconds and returns a small DOCX, so no OpenAI quota is
+used. Each run posts --docs distinct rows to /reg-docs-bulk-request twice: once with ?mode=sync
+(stages one after another, row after row) and once as a background job through the staged
+pipeline. It prints docs/min and the pipeline's per-stage averages.
+
+Run from the repository root:
+  python local_tests/benchmark_bulk_pipeline.py --docs 12 --llm-seconds 2 --llm-workers 4
+"""
+
+import argparse
+import io
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_egnyte_server import ROOT_FOLDER_ID, start_fake_egnyte_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=8)
+    parser.add_argument('--llm-seconds', type=float, default=1.0, help='simulated LLM latency per document')
+    parser.add_argument('--latency-ms', type=float, default=40.0, help='fake Egnyte latency per call')
+    parser.add_argument('--download-workers', type=int, default=2)
+    parser.add_argument('--llm-workers', type=int, default=2)
+    parser.add_argument('--convert-workers', type=int, default=1)
+    parser.add_argument('--upload-workers', type=int, default=2)
+    args = parser.parse_args()
+
+    server = start_fake_egnyte_server(port=0, latency_ms=args.latency_ms, jitter_ms=0, qps=0, daily_quota=0,
+                                      synthetic_templates=8, synthetic_sources=2 * args.docs)
+    work_dir = tempfile.mkdtemp(prefix="egnyte_bench_")
+    os.environ.update({
+        'EGNYTE_DOMAIN': f"127.0.0.1:{server.server_address[1]}",
+        'EGNYTE_SCHEME': 'http',
+        'EGNYTE_ROOT_FOLDER': ROOT_FOLDER_ID,
+        'EGNYTE_CLIENT_ID': 'bench', 'EGNYTE_CLIENT_SECRET': 'bench',
+        'EGNYTE_USERNAME': 'bench', 'EGNYTE_PASSWORD': 'bench',
+        'EGNYTE_QPS': '100', 'EGNYTE_BURST': '100',
+        'EGNYTE_TOKEN_CACHE_FILE': os.path.join(work_dir, 'token.json'),
+        'EGNYTE_QUOTA_LEDGER_DB': os.path.join(work_dir, 'ledger.db'),
+        'EGNYTE_FOLDER_INDEX_DB': os.path.join(work_dir, 'index.db'),
+        'EGNYTE_MIRROR_DB': os.path.join(work_dir, 'mirror.db'),
+        'EGNYTE_BLOB_CACHE_DIR': os.path.join(work_dir, 'blobs'),
+        'BULK_JOB_DB': os.path.join(work_dir, 'jobs.db'),
+        'BULK_DOWNLOAD_WORKERS': str(args.download_workers),
+        'BULK_LLM_WORKERS': str(args.llm_workers),
+        'BULK_CONVERT_WORKERS': str(args.convert_workers),
+        'BULK_UPLOAD_WORKERS': str(args.upload_workers),
+        'LOG_LEVEL': 'CRITICAL',
+    })
+    logging.disable(logging.ERROR)
+    import flask_api
+    from docx import Document
+
+    # credentials.py, when present, wins over the environment; force the fake server anyway
+    flask_api.egnyte_api.domain = os.environ['EGNYTE_DOMAIN']
+    flask_api.EGNYTE_AVAILABLE = True
+
+    def simulated_llm(prompt, template_path, source_document_path):
+        time.sleep(args.llm_seconds)
+        document = Document()
+        document.add_paragraph("Simulated regulatory section")
+        buffer = io.BytesIO()
+        document.save(buffer)
+        return buffer.getvalue()
+
+    flask_api.upload_files_prompt_to_openai = simulated_llm
+    flask_api.upload_files_prompt_to_azure_openai = simulated_llm
+    client = flask_api.app.test_client()
+
+    def bulk_rows(first_source):
+        # Each run uses its own source documents so the second one does not start with a warm blob cache
+        return [{
+            "product_code": f"THPG{1000 + first_source + i:06d}",
+            "reg_doc_version_active": "IND_3.2.P.1 v1.0",
+            "reg_doc_version_placebo": None,
+            "section": "3.2.P.1",
+            "molecule_code": "BENCH",
+            "campaign_number": "1"
+        } for i in range(args.docs)]
+
+    print("=" * 60)
+    print("BULK GENERATION PIPELINE BENCHMARK (fake Egnyte, simulated LLM)")
+    print("=" * 60)
+    print(f"{args.docs} documents, {args.llm_seconds}s LLM latency, {args.latency_ms}ms Egnyte latency")
+    print()
+
+    started = time.time()
+    response = client.post("/reg-docs-bulk-request?mode=sync", json=bulk_rows(0))
+    elapsed = time.time() - started
+    report = response.get_json()['total_match_report']
+    generated = sum(1 for result in report['detailed_results'] if result['generation_result'].get('success'))
+    print(f"{'sequential':>12}: {generated} docs in {elapsed:6.2f}s = {generated * 60 / elapsed:7.2f} docs/min")
+
+    started = time.time()
+    job_id = client.post("/reg-docs-bulk-request", json=bulk_rows(args.docs)).get_json()['job_id']
+    while True:
+        job = client.get(f"/reg-docs-bulk-status/{job_id}?rows=false").get_json()
+        if job['status'] not in ('queued', 'running'):
+            break
+        time.sleep(0.1)
+    elapsed = time.time() - started
+    pipeline = job['total_match_report']['pipeline']
+    print(f"{'pipelined':>12}: {pipeline['documents_generated']} docs in {elapsed:6.2f}s = "
+          f"{pipeline['documents_per_minute']:7.2f} docs/min")
+    print(f"{'':>12}  workers {pipeline['workers']}")
+    print(f"{'':>12}  avg seconds per stage {pipeline['avg_stage_seconds']}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark Egnyte campaign folder scaffolding against the local fake Egnyte server.
+
+Starts local_tests/fake_egnyte_server.py in-process, points flask_api at it and creates the
+folder tree for several campaigns, first from scratch and then again over the existing tree
+(which should only list). Reports wall time, Egnyte calls and throttling per campaign.
+No production Egnyte quota is used.
+
+Run from the repository root:
+  python local_tests/benchmark_folder_scaffolding.py --campaigns 5 --qps 2 --latency-ms 80
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_egnyte_server import ROOT_FOLDER_ID, start_fake_egnyte_server
+
+
+def fake_stats(base_url):
+    with urllib.request.urlopen(f"{base_url}/_fake/stats") as response:
+        return json.loads(response.read())
+
+
+def reset_fake(base_url):
+    urllib.request.urlopen(urllib.request.Request(f"{base_url}/_fake/reset", method="POST")).close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--campaigns', type=int, default=3)
+    parser.add_argument('--qps', type=float, default=2.0, help='fake server QPS limit (also used for the client limiter)')
+    parser.add_argument('--client-qps', type=float, help='client-side EGNYTE_QPS (default: same as --qps)')
+    parser.add_argument('--latency-ms', type=float, default=80.0)
+    parser.add_argument('--concurrency', type=int, default=4, help='EGNYTE_FOLDER_CREATE_CONCURRENCY')
+    args = parser.parse_args()
+
+    server = start_fake_egnyte_server(port=0, latency_ms=args.latency_ms, jitter_ms=args.latency_ms / 2,
+                                      qps=args.qps, daily_quota=0)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    work_dir = tempfile.mkdtemp(prefix="egnyte_bench_")
+    os.environ.update({
+        'EGNYTE_DOMAIN': f"127.0.0.1:{server.server_address[1]}",
+        'EGNYTE_SCHEME': 'http',
+        'EGNYTE_ROOT_FOLDER': ROOT_FOLDER_ID,
+        'EGNYTE_CLIENT_ID': 'bench', 'EGNYTE_CLIENT_SECRET': 'bench',
+        'EGNYTE_USERNAME': 'bench', 'EGNYTE_PASSWORD': 'bench',
+        'EGNYTE_QPS': str(args.client_qps or args.qps),
+        'EGNYTE_FOLDER_CREATE_CONCURRENCY': str(args.concurrency),
+        'EGNYTE_TOKEN_CACHE_FILE': os.path.join(work_dir, 'token.json'),
+        'EGNYTE_QUOTA_LEDGER_DB': os.path.join(work_dir, 'ledger.db'),
+        'EGNYTE_FOLDER_INDEX_DB': os.path.join(work_dir, 'index.db'),
+    })
+    logging.disable(logging.WARNING)
+    import flask_api
+
+    # credentials.py, when present, wins over the environment; force the fake server anyway
+    flask_api.egnyte_api.domain = os.environ['EGNYTE_DOMAIN']
+    flask_api.ROOT_FOLDER = ROOT_FOLDER_ID
+    flask_api.EGNYTE_AVAILABLE = True
+
+    print("=" * 60)
+    print("EGNYTE FOLDER SCAFFOLDING BENCHMARK (fake Egnyte)")
+    print("=" * 60)
+    print(f"Server: {base_url}, {args.qps} qps, {args.latency_ms}ms latency, "
+          f"create concurrency {args.concurrency}")
+    print()
+    print(f"{'run':>10} {'campaign':>9} {'seconds':>8} {'calls':>6} {'429s':>5}  status")
+
+    for run in ("fresh", "existing"):
+        for campaign in range(1, args.campaigns + 1):
+            reset_fake(base_url)
+            started = time.time()
+            flask_api.background_create_egnyte_folders("BENCH", str(campaign))
+            elapsed = time.time() - started
+            stats = fake_stats(base_url)
+            status = flask_api.job_status.get(f"egnyte_BENCH_{campaign}", {})
+            print(f"{run:>10} {campaign:>9} {elapsed:>8.2f} {stats['quota_used']:>6} "
+                  f"{stats['counters'].get('rejected_over_qps', 0):>5}  {status.get('message')}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark the bulk matcher's template/source lookups: per-row substring scans vs NameIndex.
+
+Builds a synthetic templates listing (one template per document type and section) and a
+source-documents listing, then matches request rows both ways. Fails if the results differ.
+
+Run from the repository root:
+  python local_tests/benchmark_name_matching.py --rows 1000 --sources 5000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from name_index import NameIndex
+
+SECTIONS = [f"3.2.{part}.{number}" for part in "PS" for number in range(1, 12)]
+DOC_TYPES = ["IND", "IMPD", "Canada"]
+
+
+def scan_match(rows, templates, source_docs):
+    """The matcher's original per-row loops"""
+    results = []
+    for active_root, placebo_root, product_code in rows:
+        matching_templates = [
+            t for t in templates
+            if (active_root and active_root in t['name'].lower()) or (placebo_root and placebo_root in t['name'].lower())
+        ]
+        matching_source_docs = [d for d in source_docs if product_code in d['name'].lower()]
+        results.append((matching_templates, matching_source_docs))
+    return results
+
+
+def index_match(rows, templates, source_docs, template_index, source_index):
+    results = []
+    for active_root, placebo_root, product_code in rows:
+        active_hits = template_index.positions(active_root) if active_root else ()
+        placebo_hits = template_index.positions(placebo_root) if placebo_root else ()
+        matching_templates = [templates[p] for p in sorted(set(active_hits).union(placebo_hits))]
+        results.append((matching_templates, [source_docs[p] for p in source_index.positions(product_code)]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--sources', type=int, default=5000)
+    parser.add_argument('--product-codes', type=int, default=4000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    templates = [{"entry_id": f"t{i}", "name": f"{doc_type}_{section}_Template.docx"}
+                 for i, (doc_type, section) in enumerate((d, s) for d in DOC_TYPES for s in SECTIONS)]
+    source_docs = [{"entry_id": f"s{i}", "name": f"THPG{rng.randrange(args.product_codes):06d} Product Code {i}.pdf"}
+                   for i in range(args.sources)]
+    rows = [(f"{rng.choice(DOC_TYPES)}_{rng.choice(SECTIONS)}".lower(),
+             f"{rng.choice(DOC_TYPES)}_{rng.choice(SECTIONS)}".lower(),
+             f"thpg{rng.randrange(args.product_codes):06d}") for _ in range(args.rows)]
+
+    started = time.perf_counter()
+    expected = scan_match(rows, templates, source_docs)
+    scan_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    template_index, source_index = NameIndex(templates), NameIndex(source_docs)
+    build_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    cold = index_match(rows, templates, source_docs, template_index, source_index)
+    cold_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    warm = index_match(rows, templates, source_docs, template_index, source_index)
+    warm_seconds = time.perf_counter() - started
+
+    print(f"{args.rows} rows x {len(templates)} templates + {len(source_docs)} source documents")
+    print(f"  substring scan:        {scan_seconds * 1000:8.1f} ms")
+    print(f"  index build:           {build_seconds * 1000:8.1f} ms (once per listing snapshot)")
+    print(f"  index match (cold):    {cold_seconds * 1000:8.1f} ms")
+    print(f"  index match (memoized):{warm_seconds * 1000:8.1f} ms")
+    if cold != expected or warm != expected:
+        print("MISMATCH: index results differ from the substring scan")
+        sys.exit(1)
+    print("  results identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark Egnyte auth calls as the number of gunicorn-style workers grows.
+
+Each worker is a separate process that imports flask_api and hammers get_egnyte_token()
+from several threads. The real /puboauth/token exchange is replaced by a counter so no
+Egnyte quota is used; token lifetime is compressed to a few seconds so one run covers
+several refresh cycles.
+
+Modes:
+  shared   - all workers use one token file (the shared token store)
+  isolated - every worker has its own token file (the old per-worker behaviour)
+
+Run from the repository root:
+  python local_tests/benchmark_token_store.py --workers 1 2 4 8
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+AUTH_LATENCY = 0.2   # seconds a real /puboauth/token round-trip roughly takes
+
+
+def worker(token_file, auth_counter, duration, token_lifetime, threads_per_worker):
+    """One worker process: patch out the network call and request tokens for `duration` seconds"""
+    os.environ['EGNYTE_TOKEN_CACHE_FILE'] = token_file
+    logging.disable(logging.WARNING)
+    import flask_api
+
+    def fake_auth():
+        with auth_counter.get_lock():
+            auth_counter.value += 1
+        time.sleep(AUTH_LATENCY)
+        flask_api._egnyte_token_cache['token'] = f"token-{os.getpid()}-{time.time()}"
+        flask_api._egnyte_token_cache['expires_at'] = time.time() + token_lifetime
+        flask_api.save_token_to_file(flask_api._egnyte_token_cache)
+        return flask_api._egnyte_token_cache['token']
+
+    flask_api.EGNYTE_AVAILABLE = True
+    flask_api._request_new_egnyte_token = fake_auth
+    flask_api.EGNYTE_TOKEN_REFRESH_MARGIN = token_lifetime * 0.2
+
+    deadline = time.time() + duration
+
+    def request_loop():
+        while time.time() < deadline:
+            flask_api.get_egnyte_token()
+            time.sleep(random.uniform(0.01, 0.05))
+
+    pool = [threading.Thread(target=request_loop) for _ in range(threads_per_worker)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+
+
+def run(mode, workers, duration, token_lifetime, threads_per_worker):
+    """Run one configuration and return the number of auth calls made"""
+    auth_counter = multiprocessing.Value('i', 0)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        processes = []
+        for i in range(workers):
+            name = 'shared' if mode == 'shared' else f'worker{i}'
+            token_file = os.path.join(temp_dir, f'egnyte_token_cache_{name}.json')
+            processes.append(multiprocessing.Process(
+                target=worker, args=(token_file, auth_counter, duration, token_lifetime, threads_per_worker)))
+        for p in processes:
+            p.start()
+        for p in processes:
+            p.join()
+    return auth_counter.value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--duration', type=float, default=20.0, help='seconds per run')
+    parser.add_argument('--token-lifetime', type=float, default=5.0,
+                        help='seconds a token stays valid; stands in for one hour')
+    parser.add_argument('--threads', type=int, default=4, help='request threads per worker')
+    args = parser.parse_args()
+
+    lifetimes = args.duration / args.token_lifetime
+
+    print("=" * 60)
+    print("EGNYTE TOKEN STORE BENCHMARK")
+    print("=" * 60)
+    print(f"Run length: {args.duration}s, token lifetime: {args.token_lifetime}s "
+          f"(each lifetime counts as one hour), {args.threads} threads/worker")
+    print()
+    print(f"{'workers':>8} {'isolated auth/h':>16} {'shared auth/h':>14}")
+
+    for workers in args.workers:
+        isolated = run('isolated', workers, args.duration, args.token_lifetime, args.threads)
+        shared = run('shared', workers, args.duration, args.token_lifetime, args.threads)
+        print(f"{workers:>8} {isolated / lifetimes:>16.1f} {shared / lifetimes:>14.1f}")
+
+    print()
+    print("✅ Shared store should stay near one auth call per hour regardless of worker count")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark reg-doc version parsing for bulk requests: row-by-row .apply vs parse_version_columns.
+
+Generates a request with --rows rows whose active/placebo version strings are drawn from
+--distinct different strings (plus some missing values). It parses both columns with the old
+per-row function and with reg_doc_versions.parse_version_columns, reports rows per second, and
+fails if the roots or latest versions differ.
+
+Run from the repository root:
+  python local_tests/benchmark_version_parsing.py --rows 100000 --distinct 200
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from reg_doc_versions import parse_version_columns
+
+COLUMNS = ['reg_doc_version_active', 'reg_doc_version_placebo']
+
+
+def apply_extract_root_and_latest(version_str):
+    """The bulk endpoint's original per-row parser"""
+    if not version_str or not isinstance(version_str, str):
+        return None, None
+    parts = version_str.split('v')
+    root = parts[0].strip() if parts[0] else None
+    import re
+    versions = re.findall(r'v(\d+\.?\d*)', version_str)
+    if not versions:
+        return root, None
+    try:
+        latest_version = max(float(v) for v in versions)
+        return root, f"v{latest_version}"
+    except ValueError:
+        return root, None
+
+
+def version_strings(rng, distinct):
+    strings = []
+    for i in range(distinct):
+        doc_type = rng.choice(["IND", "IMPD", "Canada"])
+        section = f"3.2.{rng.choice('PS')}.{rng.randint(1, 11)}"
+        versions = " ".join(f"v{rng.randint(0, 12)}.{rng.randint(0, 9)}" for _ in range(rng.randint(0, 3)))
+        strings.append(f"{doc_type}_{section}_{i} {versions}".strip())
+    return strings + [None, "", float('nan')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--distinct', type=int, default=200, help='distinct version strings in the request')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pool = version_strings(rng, args.distinct)
+    request_df = pd.DataFrame({column: [rng.choice(pool) for _ in range(args.rows)] for column in COLUMNS})
+
+    started = time.perf_counter()
+    expected = {column: request_df[column].apply(apply_extract_root_and_latest).tolist() for column in COLUMNS}
+    apply_seconds = time.perf_counter() - started
+
+    parsed_df = request_df.copy()
+    started = time.perf_counter()
+    parse_version_columns(parsed_df, COLUMNS)
+    batch_seconds = time.perf_counter() - started
+
+    print(f"{args.rows} rows, {len(pool)} distinct values per column")
+    print(f"  .apply (both columns):       {apply_seconds * 1000:8.1f} ms  {args.rows / apply_seconds:12,.0f} rows/s")
+    print(f"  parse_version_columns:       {batch_seconds * 1000:8.1f} ms  {args.rows / batch_seconds:12,.0f} rows/s")
+    for column in COLUMNS:
+        actual = list(zip(parsed_df[f"{column}_root"], parsed_df[f"{column}_latest"]))
+        if actual != expected[column]:
+            print(f"MISMATCH in {column}")
+            sys.exit(1)
+    print("  results identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,709 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Egnyte public API, for load and performance testing without
+touching production Egnyte or its daily quota.
+
+Implements the endpoints flask_api.py uses:
+  POST /puboauth/token                              password grant, returns a bearer token
+  GET  /pubapi/v1/fs/ids/folder/<id>                folder details + paged listing (offset/count)
+  POST /pubapi/v1/fs/ids/folder/<id>                {"action": "add_folder", "name": ...}
+  GET  /pubapi/v1/fs/<path>                         folder listing or file metadata by path
+  POST /pubapi/v1/fs/<path>                         {"action": "add_folder"} at a path
+  GET  /pubapi/v1/fs-content/ids/file/<id>          download by entry id or group id (Range supported)
+  GET  /pubapi/v1/fs-content/<path>                 download by path
+  POST /pubapi/v1/fs-content/ids/folder/<id>        multipart upload ("file" field)
+  POST /pubapi/v1/fs-content/<path>                 raw body upload
+  POST /pubapi/v1/fs-content-chunked/<path>         chunked upload (X-Egnyte-Chunk-Num / Upload-Id / Last-Chunk)
+  GET  /pubapi/v2/events/cursor                     latest event id
+  GET  /pubapi/v2/events?id=<cursor>&count=<n>      file system events after the cursor (204 when none)
+
+Every API call gets configurable latency and is subject to a QPS limit (429 + Retry-After
+and X-Mashery-Error-Code ERR_403_DEVELOPER_OVER_QPS) and a daily quota (403 +
+ERR_403_DEVELOPER_OVER_RATE), like the real service. Files and folders live in memory.
+The templates and source-documents folders are created with the folder ids flask_api.py
+reads from, so /reg-docs-bulk-request works unchanged.
+
+Unthrottled helper endpoints for benchmarks:
+  GET  /_fake/stats          call counters, quota usage and tree size
+  POST /_fake/reset          reset counters and quota (the tree is kept)
+
+Run from the repository root, then point the API at it:
+  python local_tests/fake_egnyte_server.py --port 8765 --qps 2 --latency-ms 80 --synthetic-sources 50
+  EGNYTE_DOMAIN=127.0.0.1:8765 EGNYTE_SCHEME=http EGNYTE_ROOT_FOLDER=fake-root ... python flask_api.py
+
+Only the standard library is used so the server runs without the app's dependencies.
+"""
+
+import argparse
+import collections
+import datetime
+import email.parser
+import email.policy
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import urllib.parse
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Folder ids hard-wired in flask_api.py for the bulk regulatory-document flow
+TEMPLATES_FOLDER_ID = "966281ab-54c3-47ea-b20f-b38ed2ef9b30"
+SOURCE_DOCS_FOLDER_ID = "56545792-6b5d-4fc3-8e78-31d401bd7088"
+GENERATED_DOCS_FOLDER_ID = "4a85f5e6-bb31-4bd1-b011-6fc75bdcb2d7"
+ROOT_FOLDER_ID = "fake-root"
+
+SYNTHETIC_SECTIONS = ["3.2.P.1", "3.2.P.2", "3.2.P.3", "3.2.P.5", "3.2.P.7", "3.2.P.8", "3.2.S.1", "3.2.S.2"]
+
+
+def _http_date(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).strftime('%a, %d %b %Y %H:%M:%S GMT')
+
+
+def _seconds_until_midnight_utc():
+    now = datetime.datetime.now(datetime.timezone.utc)
+    tomorrow = (now + datetime.timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return int((tomorrow - now).total_seconds())
+
+
+class FakeEgnyteStore:
+    """In-memory folder tree with versioned files"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.folders = {}       # folder_id -> folder dict
+        self.groups = {}        # group_id -> list of versions, newest last
+        self.entries = {}       # entry_id -> version dict
+        self.uploads = {}       # upload_id -> chunked upload session
+        self.events = collections.deque(maxlen=10000)   # oldest events fall off, like Egnyte's retention window
+        self.last_event_id = 0
+        self.add_folder(None, "", folder_id=ROOT_FOLDER_ID, path="/Shared")
+
+    def add_folder(self, parent_id, name, folder_id=None, path=None):
+        """Create a folder; returns (folder, created) and (existing folder, False) if the name is taken"""
+        with self.lock:
+            parent = self.folders.get(parent_id) if parent_id else None
+            if parent is not None:
+                existing = parent["children"].get(name)
+                if existing:
+                    return self.folders[existing], False
+            folder_id = folder_id or str(uuid.uuid4())
+            folder = {
+                "folder_id": folder_id,
+                "name": name or path.rsplit('/', 1)[-1],
+                "path": path or f"{parent['path']}/{name}",
+                "parent_id": parent_id,
+                "children": {},
+                "files": {},
+                "last_modified": time.time()
+            }
+            self.folders[folder_id] = folder
+            if parent is not None:
+                parent["children"][folder["name"]] = folder_id
+                self.add_event("create", folder["path"], folder_id, None, True)
+            return folder, True
+
+    def add_event(self, action, path, target_id, group_id, is_folder):
+        with self.lock:
+            self.last_event_id += 1
+            self.events.append({
+                "id": self.last_event_id,
+                "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "actor": 1,
+                "type": "file_system",
+                "action": action,
+                "action_source": "PublicAPI",
+                "data": {"target_path": path, "target_id": target_id, "target_group_id": group_id,
+                         "is_folder": is_folder}
+            })
+
+    def events_after(self, event_id, count):
+        """Events newer than event_id; None if event_id has fallen out of the retention window"""
+        with self.lock:
+            oldest = self.events[0]["id"] if self.events else self.last_event_id + 1
+            if event_id < oldest - 1:
+                return None
+            return [e for e in self.events if e["id"] > event_id][:count]
+
+    def resolve_path(self, path):
+        """Return ('folder', folder) or ('file', latest version) for an absolute path, or (None, None)"""
+        path = '/' + path.strip('/')
+        with self.lock:
+            folder = self.folders[ROOT_FOLDER_ID]
+            if path == folder["path"]:
+                return 'folder', folder
+            if not path.startswith(folder["path"] + '/'):
+                return None, None
+            parts = path[len(folder["path"]) + 1:].split('/')
+            for i, part in enumerate(parts):
+                child = folder["children"].get(part)
+                if child:
+                    folder = self.folders[child]
+                    continue
+                group_id = folder["files"].get(part)
+                if group_id and i == len(parts) - 1:
+                    return 'file', self.groups[group_id][-1]
+                return None, None
+            return 'folder', folder
+
+    def put_file(self, folder_id, name, content):
+        """Store a new version of folder/name and return its metadata"""
+        with self.lock:
+            folder = self.folders[folder_id]
+            group_id = folder["files"].get(name)
+            if not group_id:
+                group_id = str(uuid.uuid4())
+                folder["files"][name] = group_id
+                self.groups[group_id] = []
+            version = {
+                "entry_id": str(uuid.uuid4()),
+                "group_id": group_id,
+                "name": name,
+                "path": f"{folder['path']}/{name}",
+                "folder_id": folder_id,
+                "content": bytes(content),
+                "checksum": hashlib.sha512(content).hexdigest(),
+                "last_modified": time.time()
+            }
+            self.groups[group_id].append(version)
+            self.entries[version["entry_id"]] = version
+            folder["last_modified"] = version["last_modified"]
+            self.add_event("create" if len(self.groups[group_id]) == 1 else "update", version["path"],
+                           version["entry_id"], group_id, False)
+            return version
+
+    def get_file(self, file_id):
+        """Latest version for a group id, or the exact version for an entry id"""
+        with self.lock:
+            if file_id in self.entries:
+                return self.entries[file_id]
+            versions = self.groups.get(file_id)
+            return versions[-1] if versions else None
+
+    @staticmethod
+    def file_json(version):
+        return {
+            "is_folder": False,
+            "name": version["name"],
+            "path": version["path"],
+            "entry_id": version["entry_id"],
+            "group_id": version["group_id"],
+            "parent_id": version["folder_id"],
+            "size": len(version["content"]),
+            "checksum": version["checksum"],
+            "last_modified": _http_date(version["last_modified"]),
+            "uploaded_by": "fake.user",
+            "num_versions": 1
+        }
+
+    @staticmethod
+    def folder_json(folder):
+        return {
+            "is_folder": True,
+            "name": folder["name"],
+            "path": folder["path"],
+            "folder_id": folder["folder_id"],
+            "parent_id": folder["parent_id"],
+            "lastModified": int(folder["last_modified"] * 1000)
+        }
+
+    def listing(self, folder, offset=0, count=None):
+        """Folder details with one page of sub-folders then files, like Egnyte's list_content"""
+        with self.lock:
+            sub_folders = [self.folder_json(self.folders[fid]) for _, fid in sorted(folder["children"].items())]
+            files = [self.file_json(self.groups[gid][-1]) for _, gid in sorted(folder["files"].items())]
+        entries = sub_folders + files
+        total = len(entries)
+        page = entries[offset:offset + count] if count else entries[offset:]
+        result = self.folder_json(folder)
+        result.update({
+            "total_count": total,
+            "offset": offset,
+            "count": len(page),
+            "folders": [e for e in page if e["is_folder"]],
+            "files": [e for e in page if not e["is_folder"]]
+        })
+        return result
+
+    def size(self):
+        with self.lock:
+            return {
+                "folders": len(self.folders),
+                "files": len(self.groups),
+                "versions": len(self.entries),
+                "bytes": sum(len(v["content"]) for v in self.entries.values())
+            }
+
+
+class FakeEgnyteLimits:
+    """Latency, QPS limit, daily quota and injected errors applied to every API call"""
+
+    def __init__(self, latency_ms=80.0, jitter_ms=40.0, qps=2.0, daily_quota=1000, error_rate=0.0,
+                 throttle_status=429):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.qps = qps
+        self.daily_quota = daily_quota
+        self.error_rate = error_rate
+        self.throttle_status = throttle_status
+        self._lock = threading.Lock()
+        self._recent = collections.deque()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._recent.clear()
+            self.day = datetime.datetime.now(datetime.timezone.utc).date()
+            self.stats = collections.Counter()
+
+    def delay(self):
+        """Sleep for one request's simulated network and server latency"""
+        latency = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if latency > 0:
+            time.sleep(latency / 1000.0)
+
+    def admit(self, kind):
+        """Return None to serve the call, or (status, headers, body) to reject it"""
+        now = time.monotonic()
+        with self._lock:
+            today = datetime.datetime.now(datetime.timezone.utc).date()
+            if today != self.day:
+                self.day = today
+                self.stats["quota_used"] = 0
+            self.stats["requests"] += 1
+
+            if self.daily_quota and self.stats["quota_used"] >= self.daily_quota:
+                self.stats["rejected_over_rate"] += 1
+                reset_in = _seconds_until_midnight_utc()
+                return 403, {
+                    "X-Mashery-Error-Code": "ERR_403_DEVELOPER_OVER_RATE",
+                    "Retry-After": f"{reset_in}, 30"    # same two-value shape Egnyte sends
+                }, b"<h1>Developer Over Rate</h1>"
+
+            if self.qps:
+                while self._recent and now - self._recent[0] >= 1.0:
+                    self._recent.popleft()
+                if len(self._recent) >= self.qps:
+                    self.stats["rejected_over_qps"] += 1
+                    wait = max(0.0, 1.0 - (now - self._recent[0]))
+                    return self.throttle_status, {
+                        "X-Mashery-Error-Code": "ERR_403_DEVELOPER_OVER_QPS",
+                        "Retry-After": str(max(1, int(round(wait + 0.5))))
+                    }, b"<h1>Developer Over Qps</h1>"
+                self._recent.append(now)
+
+            self.stats["quota_used"] += 1
+            self.stats[f"calls:{kind}"] += 1
+            if self.error_rate and random.random() < self.error_rate:
+                self.stats["injected_errors"] += 1
+                return random.choice((500, 502, 503)), {}, b'{"errorMessage": "Injected failure"}'
+        return None
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+        return {
+            "day": self.day.isoformat(),
+            "quota_used": stats.pop("quota_used", 0),
+            "daily_quota": self.daily_quota,
+            "qps": self.qps,
+            "latency_ms": self.latency_ms,
+            "error_rate": self.error_rate,
+            "counters": stats
+        }
+
+
+class FakeEgnyteHandler(BaseHTTPRequestHandler):
+    """Routes Egnyte API paths onto the shared store and limits (set on the server object)"""
+
+    protocol_version = "HTTP/1.1"
+
+    ROUTES = [
+        ("POST", re.compile(r"^/puboauth/token$"), "token", "_token"),
+        ("GET", re.compile(r"^/pubapi/v1/fs/ids/folder/(?P<id>[^/]+)$"), "list", "_get_folder_by_id"),
+        ("POST", re.compile(r"^/pubapi/v1/fs/ids/folder/(?P<id>[^/]+)$"), "create_folder", "_add_folder_by_id"),
+        ("GET", re.compile(r"^/pubapi/v1/fs-content/ids/file/(?P<id>[^/]+)$"), "download", "_download_by_id"),
+        ("POST", re.compile(r"^/pubapi/v1/fs-content/ids/folder/(?P<id>[^/]+)$"), "upload", "_upload_multipart"),
+        ("POST", re.compile(r"^/pubapi/v1/fs-content-chunked(?P<path>/.+)$"), "upload_chunk", "_upload_chunk"),
+        ("GET", re.compile(r"^/pubapi/v1/fs-content(?P<path>/.+)$"), "download", "_download_by_path"),
+        ("POST", re.compile(r"^/pubapi/v1/fs-content(?P<path>/.+)$"), "upload", "_upload_raw"),
+        ("GET", re.compile(r"^/pubapi/v1/fs(?P<path>/.+)$"), "list", "_get_path"),
+        ("POST", re.compile(r"^/pubapi/v1/fs(?P<path>/.+)$"), "create_folder", "_add_folder_by_path"),
+        ("GET", re.compile(r"^/pubapi/v2/events/cursor$"), "events", "_events_cursor"),
+        ("GET", re.compile(r"^/pubapi/v2/events$"), "events", "_events"),
+    ]
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            sys.stderr.write(f"[fake-egnyte] {self.address_string()} {format % args}\n")
+
+    @property
+    def store(self):
+        return self.server.store
+
+    @property
+    def limits(self):
+        return self.server.limits
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method):
+        parsed = urllib.parse.urlsplit(self.path)
+        self.query = dict(urllib.parse.parse_qsl(parsed.query))
+        path = urllib.parse.unquote(parsed.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        self.body = self.rfile.read(length) if length else b""
+
+        if path.startswith("/_fake/"):
+            return self._admin(method, path)
+
+        for route_method, pattern, kind, handler in self.ROUTES:
+            match = pattern.match(path)
+            if route_method == method and match:
+                break
+        else:
+            return self._send_json(404, {"errorMessage": f"No fake route for {method} {path}"})
+
+        self.limits.delay()
+        rejection = self.limits.admit(kind)
+        if rejection:
+            status, headers, body = rejection
+            return self._send(status, body, "text/html", headers)
+
+        if kind != "token" and self.server.strict_auth and not self._authorized():
+            return self._send_json(401, {"errorMessage": "Invalid or expired token"})
+        try:
+            getattr(self, handler)(**match.groupdict())
+        except Exception as e:
+            self._send_json(500, {"errorMessage": f"Fake server error: {e}"})
+
+    # Responses
+
+    def _send(self, status, body=b"", content_type="application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _send_json(self, status, payload, headers=None):
+        self._send(status, json.dumps(payload).encode(), "application/json", headers)
+
+    def _authorized(self):
+        auth = self.headers.get("Authorization", "")
+        return auth.startswith("Bearer ") and auth[7:] in self.server.tokens
+
+    # Auth
+
+    def _token(self):
+        form = dict(urllib.parse.parse_qsl(self.body.decode()))
+        if form.get("grant_type") != "password" or not form.get("client_id") or not form.get("username"):
+            return self._send_json(400, {"error": "invalid_request"})
+        token = uuid.uuid4().hex
+        self.server.tokens.add(token)
+        self._send_json(200, {"access_token": token, "token_type": "bearer", "expires_in": self.server.token_ttl})
+
+    # Folders
+
+    def _paging(self):
+        offset = int(self.query.get("offset", 0))
+        count = int(self.query["count"]) if self.query.get("count") else None
+        return offset, count
+
+    def _get_folder_by_id(self, id):
+        folder = self.store.folders.get(id)
+        if not folder:
+            return self._send_json(404, {"errorMessage": "Folder not found"})
+        self._send_json(200, self.store.listing(folder, *self._paging()))
+
+    def _get_path(self, path):
+        kind, item = self.store.resolve_path(path)
+        if kind == "folder":
+            return self._send_json(200, self.store.listing(item, *self._paging()))
+        if kind == "file":
+            return self._send_json(200, self.store.file_json(item))
+        self._send_json(404, {"errorMessage": "Item not found"})
+
+    def _create_folder(self, parent, name):
+        if not name or '/' in name:
+            return self._send_json(400, {"errorMessage": "Invalid folder name"})
+        if name in parent["files"]:
+            return self._send_json(409, {"errorMessage": "A file with this name already exists"})
+        folder, created = self.store.add_folder(parent["folder_id"], name)
+        if not created:
+            return self._send_json(409, {"errorMessage": "Folder already exists at this location"})
+        self._send_json(201, self.store.folder_json(folder))
+
+    def _add_folder_by_id(self, id):
+        parent = self.store.folders.get(id)
+        payload = json.loads(self.body or b"{}")
+        if not parent:
+            return self._send_json(404, {"errorMessage": "Parent folder not found"})
+        if payload.get("action") != "add_folder":
+            return self._send_json(400, {"errorMessage": "Unsupported action"})
+        self._create_folder(parent, payload.get("name"))
+
+    def _add_folder_by_path(self, path):
+        payload = json.loads(self.body or b"{}")
+        if payload.get("action") != "add_folder":
+            return self._send_json(400, {"errorMessage": "Unsupported action"})
+        parent_path, _, name = path.rstrip('/').rpartition('/')
+        kind, parent = self.store.resolve_path(parent_path)
+        if kind != "folder":
+            return self._send_json(404, {"errorMessage": "Parent folder not found"})
+        self._create_folder(parent, name)
+
+    # Downloads
+
+    def _serve_file(self, version):
+        if not version:
+            return self._send_json(404, {"errorMessage": "File not found"})
+        content = version["content"]
+        headers = {
+            "ETag": f'"{version["entry_id"]}"',
+            "Last-Modified": _http_date(version["last_modified"]),
+            "X-Sha512-Checksum": version["checksum"],
+            "Accept-Ranges": "bytes",
+            "Content-Disposition": f'attachment; filename="{version["name"]}"'
+        }
+        range_match = re.match(r"bytes=(\d*)-(\d*)$", self.headers.get("Range", ""))
+        if range_match and content:
+            start, end = range_match.groups()
+            if start:
+                start, end = int(start), min(int(end) if end else len(content) - 1, len(content) - 1)
+            else:
+                start, end = max(0, len(content) - int(end or 0)), len(content) - 1
+            if start > end:
+                headers["Content-Range"] = f"bytes */{len(content)}"
+                return self._send(416, b"", "application/octet-stream", headers)
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(content)}"
+            return self._send(206, content[start:end + 1], "application/octet-stream", headers)
+        self._send(200, content, "application/octet-stream", headers)
+
+    def _download_by_id(self, id):
+        self._serve_file(self.store.get_file(id))
+
+    def _download_by_path(self, path):
+        kind, item = self.store.resolve_path(path)
+        self._serve_file(item if kind == "file" else None)
+
+    # Uploads
+
+    def _upload_result(self, version):
+        self._send_json(200, {
+            "checksum": version["checksum"],
+            "group_id": version["group_id"],
+            "entry_id": version["entry_id"],
+            "name": version["name"],
+            "path": version["path"],
+            "size": len(version["content"])
+        })
+
+    def _upload_multipart(self, id):
+        if id not in self.store.folders:
+            return self._send_json(404, {"errorMessage": "Folder not found"})
+        header = f"Content-Type: {self.headers.get('Content-Type', '')}\r\n\r\n".encode()
+        message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(header + self.body)
+        for part in message.iter_parts() if message.is_multipart() else []:
+            if part.get_param("name", header="content-disposition") == "file":
+                name = part.get_filename()
+                return self._upload_result(self.store.put_file(id, name, part.get_payload(decode=True) or b""))
+        self._send_json(400, {"errorMessage": "Missing file field"})
+
+    def _upload_raw(self, path):
+        parent_path, _, name = path.rstrip('/').rpartition('/')
+        kind, parent = self.store.resolve_path(parent_path)
+        if kind != "folder":
+            return self._send_json(404, {"errorMessage": "Parent folder not found"})
+        self._upload_result(self.store.put_file(parent["folder_id"], name, self.body))
+
+    def _upload_chunk(self, path):
+        parent_path, _, name = path.rstrip('/').rpartition('/')
+        kind, parent = self.store.resolve_path(parent_path)
+        if kind != "folder":
+            return self._send_json(404, {"errorMessage": "Parent folder not found"})
+
+        chunk_num = int(self.headers.get("X-Egnyte-Chunk-Num") or 0)
+        checksum = self.headers.get("X-Egnyte-Chunk-Sha512-Checksum")
+        if chunk_num < 1:
+            return self._send_json(400, {"errorMessage": "Missing X-Egnyte-Chunk-Num"})
+        if checksum and checksum.lower() != hashlib.sha512(self.body).hexdigest():
+            return self._send_json(400, {"errorMessage": "Chunk checksum mismatch"})
+
+        upload_id = self.headers.get("X-Egnyte-Upload-Id")
+        with self.store.lock:
+            if chunk_num == 1 and not upload_id:
+                upload_id = uuid.uuid4().hex
+                self.store.uploads[upload_id] = {"path": path, "chunks": {}, "started": time.time()}
+            session = self.store.uploads.get(upload_id)
+            if not session or session["path"] != path:
+                return self._send_json(404, {"errorMessage": "Unknown or expired upload id"})
+            if time.time() - session["started"] > self.server.upload_ttl:
+                self.store.uploads.pop(upload_id, None)
+                return self._send_json(410, {"errorMessage": "Upload session expired"})
+            session["chunks"][chunk_num] = self.body
+
+            if (self.headers.get("X-Egnyte-Last-Chunk") or "").lower() != "true":
+                return self._send(200, b"", "application/json", {"X-Egnyte-Upload-Id": upload_id})
+
+            expected = list(range(1, chunk_num + 1))
+            if sorted(session["chunks"]) != expected:
+                return self._send_json(400, {"errorMessage": "Missing chunks"}, {"X-Egnyte-Upload-Id": upload_id})
+            content = b"".join(session["chunks"][n] for n in expected)
+            self.store.uploads.pop(upload_id, None)
+        version = self.store.put_file(parent["folder_id"], name, content)
+        self._send_json(200, {
+            "checksum": version["checksum"],
+            "group_id": version["group_id"],
+            "entry_id": version["entry_id"],
+            "name": version["name"],
+            "path": version["path"]
+        }, {"X-Egnyte-Upload-Id": upload_id})
+
+    # Events
+
+    def _events_cursor(self):
+        with self.store.lock:
+            oldest = self.store.events[0]["id"] if self.store.events else self.store.last_event_id
+            latest = self.store.last_event_id
+        self._send_json(200, {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "oldest_event_id": oldest,
+            "latest_event_id": latest
+        })
+
+    def _events(self):
+        try:
+            event_id = int(self.query.get("id", ""))
+        except ValueError:
+            return self._send_json(400, {"errorMessage": "id is required"})
+        count = min(int(self.query.get("count", 100)), 100)
+        events = self.store.events_after(event_id, count)
+        if events is None:
+            return self._send_json(400, {"errorMessage": "Event id is outside the retention window"})
+        if not events:
+            return self._send(204)
+        self._send_json(200, {
+            "count": len(events),
+            "oldest_id": events[0]["id"],
+            "latest_id": events[-1]["id"],
+            "events": events
+        })
+
+    # Benchmark helpers
+
+    def _admin(self, method, path):
+        if method == "GET" and path == "/_fake/stats":
+            payload = self.limits.snapshot()
+            payload["tree"] = self.store.size()
+            payload["tokens_issued"] = len(self.server.tokens)
+            return self._send_json(200, payload)
+        if method == "POST" and path == "/_fake/reset":
+            self.limits.reset()
+            return self._send_json(200, {"status": "reset"})
+        self._send_json(404, {"errorMessage": "Unknown helper endpoint"})
+
+
+def seed_store(store, synthetic_templates=0, synthetic_sources=0, templates_dir=None, sources_dir=None):
+    """Create the folders flask_api.py expects and fill them with local or synthetic files"""
+    store.add_folder(ROOT_FOLDER_ID, "Templates", folder_id=TEMPLATES_FOLDER_ID)
+    store.add_folder(ROOT_FOLDER_ID, "Source Documents", folder_id=SOURCE_DOCS_FOLDER_ID)
+    store.add_folder(ROOT_FOLDER_ID, "Generated Documents", folder_id=GENERATED_DOCS_FOLDER_ID)
+
+    for directory, folder_id in ((templates_dir, TEMPLATES_FOLDER_ID), (sources_dir, SOURCE_DOCS_FOLDER_ID)):
+        if directory:
+            for name in sorted(os.listdir(directory)):
+                full_path = os.path.join(directory, name)
+                if os.path.isfile(full_path):
+                    with open(full_path, 'rb') as f:
+                        store.put_file(folder_id, name, f.read())
+
+    for i in range(synthetic_templates):
+        section = SYNTHETIC_SECTIONS[i % len(SYNTHETIC_SECTIONS)]
+        suffix = f"_v{i // len(SYNTHETIC_SECTIONS) + 1}" if i >= len(SYNTHETIC_SECTIONS) else ""
+        store.put_file(TEMPLATES_FOLDER_ID, f"IND_{section}_Template{suffix}.docx", os.urandom(32 * 1024))
+    for i in range(synthetic_sources):
+        store.put_file(SOURCE_DOCS_FOLDER_ID, f"THPG{1000 + i:06d} Product Code.pdf", os.urandom(64 * 1024))
+    return store
+
+
+def start_fake_egnyte_server(host="127.0.0.1", port=0, latency_ms=80.0, jitter_ms=40.0, qps=2.0,
+                             daily_quota=1000, error_rate=0.0, throttle_status=429, token_ttl=3600,
+                             upload_ttl=3600, strict_auth=False, verbose=False, **seed):
+    """Start the server on a background thread; returns the server (server.server_address has the port)"""
+    server = ThreadingHTTPServer((host, port), FakeEgnyteHandler)
+    server.daemon_threads = True
+    server.store = FakeEgnyteStore()
+    server.limits = FakeEgnyteLimits(latency_ms, jitter_ms, qps, daily_quota, error_rate, throttle_status)
+    server.tokens = set()
+    server.token_ttl = token_ttl
+    server.upload_ttl = upload_ttl
+    server.strict_auth = strict_auth
+    server.verbose = verbose
+    seed_store(server.store, **seed)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=80.0, help='mean added latency per call')
+    parser.add_argument('--jitter-ms', type=float, default=40.0, help='latency varies by +/- this much')
+    parser.add_argument('--qps', type=float, default=2.0, help='calls per second before 429s (0 = unlimited)')
+    parser.add_argument('--daily-quota', type=int, default=1000, help='calls per UTC day (0 = unlimited)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of calls answered with a 5xx')
+    parser.add_argument('--throttle-status', type=int, default=429, choices=[429, 403],
+                        help='status for over-QPS responses (older Egnyte tenants send 403)')
+    parser.add_argument('--token-ttl', type=int, default=3600, help='expires_in of issued tokens (-1 = never)')
+    parser.add_argument('--upload-ttl', type=int, default=3600, help='seconds a chunked upload session stays open')
+    parser.add_argument('--strict-auth', action='store_true', help='only accept tokens issued by this server')
+    parser.add_argument('--synthetic-templates', type=int, default=8)
+    parser.add_argument('--synthetic-sources', type=int, default=20)
+    parser.add_argument('--templates-dir', help='load real template files from this directory')
+    parser.add_argument('--sources-dir', help='load real source documents from this directory')
+    parser.add_argument('--verbose', action='store_true', help='log every request')
+    args = parser.parse_args()
+
+    server = start_fake_egnyte_server(
+        args.host, args.port, args.latency_ms, args.jitter_ms, args.qps, args.daily_quota, args.error_rate,
+        args.throttle_status, args.token_ttl, args.upload_ttl, args.strict_auth, args.verbose,
+        synthetic_templates=args.synthetic_templates, synthetic_sources=args.synthetic_sources,
+        templates_dir=args.templates_dir, sources_dir=args.sources_dir
+    )
+    host, port = server.server_address[:2]
+
+    print("=" * 60)
+    print("FAKE EGNYTE SERVER")
+    print("=" * 60)
+    print(f"Listening on http://{host}:{port}  ({args.qps} qps, {args.daily_quota} calls/day, {args.latency_ms}ms latency)")
+    print(f"Tree: {server.store.size()}")
+    print()
+    print("Point the API at it with:")
+    print(f"  EGNYTE_DOMAIN={host}:{port} EGNYTE_SCHEME=http EGNYTE_ROOT_FOLDER={ROOT_FOLDER_ID}")
+    print("  EGNYTE_CLIENT_ID=x EGNYTE_CLIENT_SECRET=x EGNYTE_USERNAME=x EGNYTE_PASSWORD=x")
+    print(f"  EGNYTE_DAILY_QUOTA={args.daily_quota} EGNYTE_QPS={args.qps}")
+    print()
+    print(f"Stats: curl http://{host}:{port}/_fake/stats")
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -91,6 +91,17 @@ def check_api_availability():
         print(f"   Make sure the Flask app is running on {BASE_URL}")
         return False
 
+def wait_for_bulk_job(poll_url, timeout=1800, interval=5):
+    """Poll a background bulk job until it leaves queued/running; returns the final job status"""
+    deadline = time.time() + timeout
+    while True:
+        job = requests.get(f"{BASE_URL}{poll_url}?rows=false", timeout=30).json()
+        progress = job.get("progress", {})
+        print(f"   Job {job.get('job_id', '')}: {job.get('status')} {progress}")
+        if job.get("status") not in ("queued", "running") or time.time() > deadline:
+            return job
+        time.sleep(interval)
+
 def test_bulk_request():
     """Test the reg_docs_bulk_request endpoint"""
     print("=" * 80)
@@ -131,12 +142,18 @@ def test_bulk_request():
         print(f"Response received in {processing_time:.2f} seconds")
         print(f"Status Code: {response.status_code}")
         
-        if response.status_code == 200:
+        if response.status_code in (200, 202):
             print("✅ Bulk request successful!")
             
             # Parse and display results
             result = response.json()
             
+            # Generation runs as a background job by default; poll it for the report
+            if response.status_code == 202:
+                print(f"⏳ Job {result.get('job_id')} accepted, polling {result.get('poll_url')}...")
+                result = wait_for_bulk_job(result["poll_url"])
+                print(f"Job finished with status '{result.get('status')}' after {time.time() - start_time:.2f} seconds")
+            
             if "total_match_report" in result:
                 report = result["total_match_report"]
                 
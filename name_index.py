@@ -0,0 +1,62 @@
+"""
+Substring lookups over a folder listing's file names, built once per listing snapshot.
+
+The bulk matcher asks "which files contain this section root / product code?" for every
+request row. The answer must stay a plain case-insensitive substring test. NameIndex lowercases
+every name once and keeps an inverted index from each character trigram to the files
+containing it. A lookup intersects the posting lists of the pattern's trigrams and confirms
+the few remaining candidates with `in`. Results are listing positions, in listing order, and
+are memoized per pattern, so later requests against the same snapshot reuse them. Patterns
+shorter than a trigram fall back to a scan.
+
+The index keeps only the lowercased names, never the file dicts. A cached index is keyed by
+(entry_id, name) alone, so callers resolve positions against their current listing to get
+up-to-date checksum, path and last_modified values.
+"""
+
+import threading
+
+GRAM = 3
+
+
+def listing_fingerprint(files):
+    """Identity of a listing snapshot: the (entry_id, name) of every file, in order"""
+    return hash(tuple((f.get('entry_id'), f.get('name')) for f in files))
+
+
+class NameIndex:
+    """Case-insensitive substring index over the 'name' of each file in a listing"""
+
+    def __init__(self, files):
+        self.names = [(f.get('name') or '').lower() for f in files]
+        self._postings = {}
+        for position, name in enumerate(self.names):
+            for gram in {name[i:i + GRAM] for i in range(len(name) - GRAM + 1)}:
+                self._postings.setdefault(gram, set()).add(position)
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    def positions(self, pattern):
+        """Listing positions of the files whose lowercased name contains pattern (lowercased)"""
+        pattern = pattern.lower()
+        hits = self._memo.get(pattern)
+        if hits is not None:
+            return hits
+        if len(pattern) < GRAM:
+            hits = tuple(p for p, name in enumerate(self.names) if pattern in name)
+        else:
+            grams = {pattern[i:i + GRAM] for i in range(len(pattern) - GRAM + 1)}
+            postings = sorted((self._postings.get(gram, ()) for gram in grams), key=len)
+            # Start from the rarest trigram; set intersection costs the size of the smaller side
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                if not candidates:
+                    break
+                candidates &= posting
+            hits = tuple(p for p in sorted(candidates) if pattern in self.names[p])
+        with self._lock:
+            self._memo[pattern] = hits
+        return hits
+
+    def stats(self):
+        return {"files": len(self.names), "grams": len(self._postings), "memoized_patterns": len(self._memo)}
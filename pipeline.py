@@ -0,0 +1,154 @@
+"""
+A staged worker pipeline with bounded queues between the stages.
+
+Each stage has its own worker threads and an input queue of limited size. While one item waits
+on a slow stage (e.g. the LLM), the next item can already run an earlier one (e.g. its download),
+and a full queue pushes back on the stage before it instead of piling up work in memory.
+
+A stage function takes the item (a dict) and returns nothing. It stores its outputs on the item.
+To stop an item early, the function sets item["result"]. Exceptions are caught and stored the
+same way, as {"error": ...}. When an item leaves the pipeline, its `on_done(item)` callback runs.
+item["timings"] records the seconds each stage spent on the item.
+"""
+
+import contextvars
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineStage:
+    def __init__(self, name, func, workers=1, queue_size=2):
+        self.name = name
+        self.func = func
+        self.workers = max(1, int(workers))
+        self.queue = queue.Queue(maxsize=max(1, int(queue_size)))
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.active = 0
+
+
+class StagedPipeline:
+    """Run items through named stages, each with its own worker count and bounded input queue"""
+
+    def __init__(self, name, stages, finalize=None):
+        """stages: list of dicts with name, func, workers and queue_size; finalize(item) runs once for
+        every item as it leaves the pipeline, however far it got (e.g. to delete its temp files)"""
+        self.name = name
+        self.stages = [PipelineStage(**stage) for stage in stages]
+        self.finalize = finalize
+        self._lock = threading.Lock()
+        self._started = False
+        self._submitted = 0
+        self._completed = 0
+
+    def _start(self):
+        with self._lock:
+            if self._started:
+                return
+            for index, stage in enumerate(self.stages):
+                for worker in range(stage.workers):
+                    threading.Thread(target=self._work, args=(index,), name=f"{self.name}-{stage.name}-{worker}",
+                                     daemon=True).start()
+            self._started = True
+
+    def submit(self, item, on_done=None):
+        """Queue an item; blocks while the first stage's queue is full"""
+        self._start()
+        item.setdefault("timings", {})
+        item["_on_done"] = on_done
+        # Stage workers run the item in the submitter's context (e.g. a per-request debug log switch)
+        item["_context"] = contextvars.copy_context()
+        item["_queued_at"] = time.monotonic()
+        with self._lock:
+            self._submitted += 1
+        self.stages[0].queue.put(item)
+
+    def _work(self, index):
+        stage = self.stages[index]
+        while True:
+            item = stage.queue.get()
+            try:
+                self._run_stage(index, stage, item)
+            except BaseException as e:
+                # Never let the worker thread die: the stage would silently lose capacity and
+                # the item's job would wait for it forever
+                logger.error(f"❌ Pipeline {self.name} stage {stage.name} worker error: {e!r}")
+                item.setdefault("result", {"error": repr(e)})
+                self._finish(item)
+
+    def _run_stage(self, index, stage, item):
+        started = time.monotonic()
+        with self._lock:
+            stage.wait_seconds += started - item.get("_queued_at", started)
+            stage.active += 1
+        try:
+            item["_context"].copy().run(stage.func, item)
+        except BaseException as e:
+            logger.error(f"❌ Pipeline {self.name} stage {stage.name} failed: {e!r}")
+            item["result"] = {"error": str(e) or repr(e)}
+        finally:
+            elapsed = time.monotonic() - started
+            item["timings"][stage.name] = round(elapsed, 3)
+            with self._lock:
+                stage.active -= 1
+                stage.processed += 1
+                stage.busy_seconds += elapsed
+                if "result" in item and index < len(self.stages) - 1:
+                    stage.failed += 1
+
+        if "result" not in item and index < len(self.stages) - 1:
+            item["_queued_at"] = time.monotonic()
+            self.stages[index + 1].queue.put(item)
+        else:
+            self._finish(item)
+
+    def _finish(self, item):
+        # Runs at most once per item, even if a worker error interrupts the first attempt
+        if item.get("_finished"):
+            return
+        item["_finished"] = True
+        try:
+            if self.finalize:
+                item["_context"].copy().run(self.finalize, item)
+        except BaseException as e:
+            logger.error(f"❌ Pipeline {self.name} finalize failed: {e!r}")
+            item["result"] = {"error": str(e)}
+        with self._lock:
+            self._completed += 1
+        on_done = item.pop("_on_done", None)
+        if on_done:
+            try:
+                on_done(item)
+            except BaseException as e:
+                logger.error(f"❌ Pipeline {self.name} completion callback failed: {e!r}")
+
+    def stats(self):
+        """Per-stage worker counts, queue depth, throughput and time split between work and waiting"""
+        with self._lock:
+            return {
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "stages": {
+                    stage.name: {
+                        "workers": stage.workers,
+                        "active": stage.active,
+                        "queued": stage.queue.qsize(),
+                        "queue_capacity": stage.queue.maxsize,
+                        "processed": stage.processed,
+                        "stopped_items": stage.failed,
+                        "busy_seconds": round(stage.busy_seconds, 3),
+                        "avg_seconds": round(stage.busy_seconds / stage.processed, 3) if stage.processed else 0.0,
+                        "avg_queue_wait_seconds": round(stage.wait_seconds / stage.processed, 3) if stage.processed else 0.0
+                    } for stage in self.stages
+                }
+            }
+
+
+def documents_per_minute(documents, elapsed_seconds):
+    return round(documents * 60 / elapsed_seconds, 2) if elapsed_seconds > 0 else 0.0
@@ -0,0 +1,66 @@
+"""
+Parsing of reg-doc version strings such as "IND_3.2.P.1 v1.0 v2.0" from bulk requests.
+
+The root is the text before the first "v", stripped. The versions are every "v<number>", and
+the latest one is rendered as "v<float>" (so "v2" becomes "v2.0"). parse_version_columns does
+this for several DataFrame columns in one pass. The columns are stacked and factorized, each
+distinct string is parsed once with the compiled pattern, and the results are scattered back
+to the rows by integer code. Bulk requests repeat the same few version strings across many
+rows, so the parsing cost follows the number of distinct strings rather than the row count.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+VERSION_PATTERN = re.compile(r'v(\d+\.?\d*)')
+
+
+def parse_version_string(version_str):
+    """Return (root, latest version, all versions) for one string; all None if it is empty"""
+    if not version_str or not isinstance(version_str, str):
+        return None, None, None
+    head = version_str.split('v', 1)[0]
+    root = head.strip() if head else None
+    versions = tuple(f"v{v}" for v in VERSION_PATTERN.findall(version_str))
+    if not versions:
+        return root, None, versions
+    return root, f"v{max(float(v[1:]) for v in versions)}", versions
+
+
+def extract_root_and_latest(version_str):
+    """Return (root, latest version) for one version string, or (None, None) if it is empty"""
+    root, latest, _ = parse_version_string(version_str)
+    return root, latest
+
+
+def parse_version_columns(df, columns):
+    """Add <column>_root, <column>_latest and <column>_versions for each column, in place.
+
+    Missing values (None, NaN, non-strings, empty strings) give None for all three. Strings
+    without a version give an empty tuple of versions. The new columns are object dtype and
+    hold None, never NaN, so `is None` checks downstream keep working.
+    """
+    rows = len(df)
+    if not columns:
+        return df
+    values = np.concatenate([df[column].to_numpy(dtype=object) for column in columns])
+    # JSON cells can be lists or dicts, which factorize cannot hash; like every non-string they parse to None
+    values = np.array([value if isinstance(value, str) else None for value in values], dtype=object)
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+
+    # One slot per distinct value, plus a trailing all-None slot that code -1 (missing) lands on
+    parsed = [parse_version_string(value) for value in uniques] + [(None, None, None)]
+    roots = np.empty(len(parsed), dtype=object)
+    latest = np.empty(len(parsed), dtype=object)
+    versions = np.empty(len(parsed), dtype=object)
+    for slot, (root, newest, found) in enumerate(parsed):
+        roots[slot], latest[slot], versions[slot] = root, newest, found
+
+    for k, column in enumerate(columns):
+        column_codes = codes[k * rows:(k + 1) * rows]
+        df[f"{column}_root"] = pd.Series(roots[column_codes], index=df.index, dtype=object)
+        df[f"{column}_latest"] = pd.Series(latest[column_codes], index=df.index, dtype=object)
+        df[f"{column}_versions"] = pd.Series(versions[column_codes], index=df.index, dtype=object)
+    return df
@@ -0,0 +1,228 @@
+"""
+One retry policy for every outbound call (Egnyte, OpenAI, Azure OpenAI, Google Drive).
+
+A RetryPolicy retries transient failures with exponential backoff and jitter, honours
+Retry-After (including Egnyte's "2665, 30" form), stops at a per-call deadline and gives up
+straight away when the server asks for a longer wait than is worth sleeping through. Each
+policy keeps per-attempt counters that the Flask app exposes on /retry-stats, and can report
+each call's outcome to a circuit breaker (circuit_breaker.py).
+
+Outcomes are inspected duck-typed so this module needs none of the client libraries:
+responses with .status_code (requests), exceptions with .status_code or .response
+(requests.HTTPError, openai.APIStatusError) and exceptions with .resp (googleapiclient HttpError).
+"""
+
+import email.utils
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth another attempt: timeouts, throttling and server-side hiccups
+RETRYABLE_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+_policies = {}
+_policies_lock = threading.Lock()
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After value: '30', '2.5', Egnyte's '2665, 30' (first value) or an HTTP date"""
+    if value is None:
+        return None
+    text = str(value).strip()
+    if not text:
+        return None
+    try:
+        return max(0.0, float(text.split(',')[0].strip()))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(text).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def status_and_headers(outcome):
+    """Pull (HTTP status, headers) out of a response or client exception; (None, None) if there is none"""
+    status = getattr(outcome, 'status_code', None)
+    headers = getattr(outcome, 'headers', None)
+    response = getattr(outcome, 'response', None)
+    if response is not None:
+        if status is None:
+            status = getattr(response, 'status_code', None)
+        if headers is None:
+            headers = getattr(response, 'headers', None)
+    resp = getattr(outcome, 'resp', None)   # googleapiclient HttpError
+    if status is None and resp is not None:
+        status = getattr(resp, 'status', None)
+        headers = resp
+    try:
+        status = int(status) if status is not None else None
+    except (TypeError, ValueError):
+        status = None
+    return status, headers
+
+
+class RetryPolicy:
+    """Retry transient failures of one backend with backoff, jitter, Retry-After and a deadline"""
+
+    def __init__(self, name, max_attempts=4, base_delay=0.5, max_delay=30.0, deadline=120.0,
+                 max_retry_after=60.0, retry_statuses=RETRYABLE_STATUSES, retry_exceptions=(),
+                 is_retryable=None, breaker=None, trips_breaker=None):
+        self.name = name
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.max_retry_after = max_retry_after
+        self.retry_statuses = frozenset(retry_statuses)
+        self.retry_exceptions = tuple(retry_exceptions)
+        # Optional backend-specific override: return True/False to force a decision, None for the default
+        self.is_retryable = is_retryable
+        # Optional circuit breaker told about each logical call; trips_breaker(outcome, status, headers)
+        # flags non-retryable outcomes that still mean the backend is unusable (e.g. quota exhausted)
+        self.breaker = breaker
+        self.trips_breaker = trips_breaker
+        self._lock = threading.Lock()
+        self._stats = {
+            "calls": 0, "attempts": 0, "retries": 0, "succeeded": 0, "succeeded_after_retry": 0,
+            "failed": 0, "gave_up": 0, "sleep_seconds": 0.0
+        }
+        self._reasons = {}
+        self._gave_up_because = {}
+        with _policies_lock:
+            _policies[name] = self
+
+    def _classify(self, outcome, is_error):
+        """Decide whether an outcome is worth retrying; returns (retry, reason, retry_after seconds)"""
+        status, headers = status_and_headers(outcome)
+        retry_after = None
+        if headers is not None:
+            # httplib2 (Google) lower-cases header names; requests/httpx headers are case-insensitive
+            retry_after = parse_retry_after(headers.get('Retry-After') or headers.get('retry-after'))
+        reason = str(status) if status is not None else type(outcome).__name__
+
+        if self.is_retryable is not None:
+            decision = self.is_retryable(outcome, status, headers)
+            if decision is not None:
+                return decision, reason, retry_after
+
+        if status is not None:
+            return status in self.retry_statuses, reason, retry_after
+        if is_error:
+            return isinstance(outcome, self.retry_exceptions), reason, retry_after
+        return False, reason, retry_after
+
+    def _backoff(self, attempt):
+        """Exponential backoff with equal jitter: half the step is fixed, half random"""
+        step = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return step / 2 + random.uniform(0, step / 2)
+
+    def run(self, attempt_fn, before_retry=None):
+        """
+        Call attempt_fn() until it succeeds, fails permanently or runs out of attempts/time.
+
+        Exceptions are re-raised and responses returned as-is once retrying stops, so callers keep
+        their own error handling. before_retry(outcome) runs before each new attempt (e.g. to close
+        a throttled response or rewind an upload body).
+        """
+        # Raises CircuitOpenError while the backend is known to be down; the token ties this call's
+        # outcome to the breaker state it was admitted under
+        breaker_token = self.breaker.before_call() if self.breaker else None
+        started = time.monotonic()
+        attempt = 0
+        with self._lock:
+            self._stats["calls"] += 1
+
+        while True:
+            attempt += 1
+            with self._lock:
+                self._stats["attempts"] += 1
+            try:
+                outcome = attempt_fn()
+                error = None
+            except Exception as e:
+                outcome = error = e
+
+            retry, reason, retry_after = self._classify(outcome, error is not None)
+            if not retry:
+                status, headers = status_and_headers(outcome)
+                if self.breaker:
+                    if self.trips_breaker and self.trips_breaker(outcome, status, headers):
+                        self.breaker.record_failure(reason, retry_after, token=breaker_token)
+                    elif error is not None and status is None:
+                        self.breaker.release(token=breaker_token)   # a local error says nothing about the backend
+                    else:
+                        self.breaker.record_success(token=breaker_token)
+                with self._lock:
+                    if error is None and (status is None or status < 400):
+                        self._stats["succeeded"] += 1
+                        if attempt > 1:
+                            self._stats["succeeded_after_retry"] += 1
+                    else:
+                        self._stats["failed"] += 1
+                if error is not None:
+                    raise error
+                return outcome
+
+            with self._lock:
+                self._reasons[reason] = self._reasons.get(reason, 0) + 1
+
+            give_up = None
+            delay = 0.0
+            if attempt >= self.max_attempts:
+                give_up = "attempts"
+            elif retry_after is not None and retry_after > self.max_retry_after:
+                give_up = "retry_after_too_long"
+            else:
+                delay = retry_after + random.uniform(0, self.base_delay) if retry_after is not None else self._backoff(attempt)
+                if time.monotonic() - started + delay > self.deadline:
+                    give_up = "deadline"
+
+            if give_up:
+                logger.warning(f"[{self.name}] giving up after {attempt} attempt(s) ({reason}, {give_up})")
+                with self._lock:
+                    self._stats["gave_up"] += 1
+                    self._gave_up_because[give_up] = self._gave_up_because.get(give_up, 0) + 1
+                if self.breaker:
+                    self.breaker.record_failure(reason, retry_after, token=breaker_token)
+                if error is not None:
+                    raise error
+                return outcome
+
+            logger.warning(f"[{self.name}] attempt {attempt} failed ({reason}), retrying in {delay:.2f}s")
+            with self._lock:
+                self._stats["retries"] += 1
+                self._stats["sleep_seconds"] += delay
+            if before_retry:
+                before_retry(outcome)
+            time.sleep(delay)
+
+    def call(self, func, *args, **kwargs):
+        """Retry func(*args, **kwargs) under this policy"""
+        return self.run(lambda: func(*args, **kwargs))
+
+    def stats(self):
+        """Return a snapshot of this policy's configuration and counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["sleep_seconds"] = round(stats["sleep_seconds"], 3)
+            stats["retry_reasons"] = dict(self._reasons)
+            stats["gave_up_because"] = dict(self._gave_up_because)
+        stats["config"] = {
+            "max_attempts": self.max_attempts,
+            "base_delay_seconds": self.base_delay,
+            "max_delay_seconds": self.max_delay,
+            "deadline_seconds": self.deadline,
+            "max_retry_after_seconds": self.max_retry_after
+        }
+        return stats
+
+
+def retry_stats():
+    """Stats for every policy created in this process, keyed by policy name"""
+    with _policies_lock:
+        policies = list(_policies.values())
+    return {policy.name: policy.stats() for policy in policies}
@@ -0,0 +1,204 @@
+"""
+Structured, low-overhead logging for hot paths.
+
+- configure_logging() sends every record through a bounded queue, so request threads never
+  block on log I/O. Like logging.basicConfig, it leaves an already configured root logger
+  alone. A QueueListener thread formats the records and writes them, as text or JSON lines.
+  When the queue is full, records are dropped and counted rather than waited on.
+- log_event(logger, level, event, **fields) emits one structured record. Nothing is
+  formatted unless the level is enabled, and callable field values are only evaluated then.
+- sampled_event(...) keeps every Nth occurrence of an event and/or at most M per second. The
+  next record that gets through carries the number suppressed since the last one.
+- debug_event(...) is for verbose diagnostics. They are off unless DEBUG is enabled, or the
+  per-request switch (set_request_debug) is on for the current request, in which case they are
+  logged at INFO and tagged debug=true.
+"""
+
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+
+_request_debug = contextvars.ContextVar('request_debug', default=False)
+
+_listener = None
+_listener_lock = threading.Lock()
+_stats = {"dropped": 0, "suppressed": 0}
+_stats_lock = threading.Lock()
+
+_samplers = {}
+_samplers_lock = threading.Lock()
+
+
+class StructuredFormatter(logging.Formatter):
+    """Render a record's message plus its structured fields as 'key=value' text or one JSON object"""
+
+    def __init__(self, fmt='text'):
+        super().__init__('%(asctime)s %(levelname)s %(name)s: %(message)s')
+        self.json = fmt == 'json'
+
+    def format(self, record):
+        fields = getattr(record, 'fields', None) or {}
+        if self.json:
+            payload = {
+                "ts": self.formatTime(record),
+                "level": record.levelname,
+                "logger": record.name,
+                "message": record.getMessage()
+            }
+            payload.update(fields)
+            if record.exc_info:
+                payload["exc_info"] = self.formatException(record.exc_info)
+            return json.dumps(payload, default=str)
+        line = super().format(record)
+        if fields:
+            line += ' ' + ' '.join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that counts and drops records when the queue is full instead of blocking"""
+
+    def prepare(self, record):
+        # Leave message formatting to the listener thread instead of the caller
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with _stats_lock:
+                _stats["dropped"] += 1
+
+
+def configure_logging(level=logging.INFO, fmt='text', queue_size=10000, stream=None, force=False):
+    """Route the root logger through a background queue listener (idempotent).
+
+    Like logging.basicConfig, this does nothing when the root logger already has handlers, so an
+    embedding app or test harness keeps its own logging setup; force=True replaces them.
+    Returns whether the queue listener is installed.
+    """
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            logging.getLogger().setLevel(level)
+            return True
+        root = logging.getLogger()
+        if root.handlers and not force:
+            return False
+        output = logging.StreamHandler(stream or sys.stderr)
+        output.setFormatter(StructuredFormatter(fmt))
+        log_queue = queue.Queue(maxsize=queue_size)
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(DroppingQueueHandler(log_queue))
+        root.setLevel(level)
+        _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+        return True
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def _resolve(fields):
+    return {key: value() if callable(value) else value for key, value in fields.items()}
+
+
+def log_event(logger, level, event, **fields):
+    """Log a structured event; costs one level check when the level is disabled"""
+    if not logger.isEnabledFor(level):
+        return
+    logger.log(level, event, extra={"event": event, "fields": _resolve(fields)}, stacklevel=2)
+
+
+def set_request_debug(enabled):
+    """Turn debug_event() output on or off for the current request; returns a token for reset"""
+    return _request_debug.set(bool(enabled))
+
+
+def reset_request_debug(token):
+    _request_debug.reset(token)
+
+
+def debug_enabled(logger):
+    """Whether debug_event() would emit anything right now (check once before a hot loop)"""
+    return _request_debug.get() or logger.isEnabledFor(logging.DEBUG)
+
+
+def debug_event(logger, event, **fields):
+    """Verbose diagnostic: logged only with DEBUG enabled or the per-request debug switch on"""
+    if _request_debug.get():
+        fields["debug"] = True
+        logger.log(logging.INFO, event, extra={"event": event, "fields": _resolve(fields)}, stacklevel=2)
+    elif logger.isEnabledFor(logging.DEBUG):
+        logger.log(logging.DEBUG, event, extra={"event": event, "fields": _resolve(fields)}, stacklevel=2)
+
+
+class EventSampler:
+    """Let through every `every`-th call and at most `per_second` calls per second"""
+
+    def __init__(self, every=1, per_second=None):
+        self.every = max(1, int(every))
+        self.per_second = per_second
+        self._lock = threading.Lock()
+        self._seen = 0
+        self._suppressed = 0
+        self._tokens = float(per_second) if per_second else 0.0
+        self._updated = time.monotonic()
+
+    def allow(self):
+        """Return (allowed, suppressed since the last allowed call)"""
+        with self._lock:
+            self._seen += 1
+            allowed = (self._seen - 1) % self.every == 0
+            if allowed and self.per_second:
+                now = time.monotonic()
+                self._tokens = min(float(self.per_second), self._tokens + (now - self._updated) * self.per_second)
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                else:
+                    allowed = False
+            if not allowed:
+                self._suppressed += 1
+                return False, 0
+            suppressed, self._suppressed = self._suppressed, 0
+            return True, suppressed
+
+
+def sampled_event(logger, level, event, every=1, per_second=None, **fields):
+    """log_event() thinned by a per-event sampler created on first use"""
+    if not logger.isEnabledFor(level):
+        return
+    sampler = _samplers.get(event)
+    if sampler is None:
+        with _samplers_lock:
+            sampler = _samplers.setdefault(event, EventSampler(every, per_second))
+    allowed, suppressed = sampler.allow()
+    if not allowed:
+        with _stats_lock:
+            _stats["suppressed"] += 1
+        return
+    if suppressed:
+        fields["suppressed"] = suppressed
+    logger.log(level, event, extra={"event": event, "fields": _resolve(fields)}, stacklevel=2)
+
+
+def logging_stats():
+    """Dropped and suppressed record counts plus the current queue depth"""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["queue_depth"] = _listener.queue.qsize() if _listener is not None else 0
+    stats["listener_running"] = _listener is not None
+    return stats